@@ -0,0 +1,2825 @@
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from captions import CaptionBuffer
+from capture import LatestFrameGrabber
+from features import FEATURE_VECTOR_SIZE, HAND_LANDMARK_COUNT, HandFeatureExtractor, build_feature_vector
+from inference import ClassificationEngine
+from latency import LATENCY_STAGES, LATENCY_WINDOW, LatencyTracker
+from ipc import (
+    CONNECT_TIMEOUT_MS,
+    CONTROL_CLEAR,
+    CONTROL_SETTINGS,
+    DISCONNECT_TIMEOUT_MS,
+    FRAME_HEADER,
+    MESSAGE_DELIMITER,
+    MSG_CAPTION,
+    MSG_CAPTION_DELTA,
+    WRITE_TIMEOUT_MS,
+    OverlayConnection,
+    OverlayServer,
+    Outbox,
+    decode_json,
+    encode_frame,
+)
+
+REPLAY_FPS = 30
+REPLAY_DRIVER_BUFFER_DEPTH = 4
+REPLAY_FRAME_SHAPE = (480, 640, 3)
+REPLAY_DURATION_S = 5.0
+REPLAY_WORK_MS = 45.0
+FEATURE_BENCH_FRAMES = 5000
+FEATURE_BENCH_SEED = 7
+STUB_CLASSES = [chr(ord("A") + i) for i in range(26)]
+STUB_TRAINING_SAMPLES = 2600
+STUB_SEED = 11
+INFERENCE_BENCH_CALLS = 300
+INFERENCE_PARITY_SAMPLES = 1000
+# Largest probability difference allowed between the compiled engine and scikit-learn.
+INFERENCE_PARITY_TOLERANCE = 1e-9
+IPC_BENCH_SERVER_NAME = "signflow_benchmark_ipc"
+IPC_BENCH_MESSAGES = 2000
+IPC_BENCH_CAPTION = "THE QUICK BROWN FOX JUMPS OVER"
+IPC_BENCH_TIMEOUT_MS = 30000
+OUTBOX_BENCH_PHASE_S = 4.0
+OUTBOX_BENCH_CAPTION_EVERY = 4
+OUTBOX_BENCH_CAPTION_BYTES = 8192
+OVERLAY_BENCH_FRAMED_UPDATES = 5000
+OVERLAY_BENCH_LINE_UPDATES = 500
+LAYOUT_BENCH_UPDATES = 3000
+LAYOUT_BENCH_WORDS = ("HELLO", "MY", "NAME", "IS", "SIGNFLOW", "NICE", "TO", "MEET", "YOU", "THANK")
+LAYOUT_BENCH_CAPTION_CHARS = 400
+LAYOUT_BENCH_REPEAT_CYCLE = 50
+CAPTION_BENCH_CHECKPOINTS = (1000, 5000, 20000)
+CAPTION_BENCH_WINDOW = 200
+CAPTION_BENCH_DROP_EVERY = 97
+CAPTION_BENCH_RESTART_AFTER = 10
+LATENCY_BENCH_SAMPLES = 20000
+LATENCY_BENCH_SEED = 5
+PIPELINE_BENCH_FRAMES = 600
+PIPELINE_BENCH_WARMUP_FRAMES = 20
+PIPELINE_BENCH_SEED = 13
+PIPELINE_STAGE_NAMES = ("detect", "features", "classify", "commit", "total")
+IMAGE_SUFFIXES = (".bmp", ".jpeg", ".jpg", ".png")
+REPLAY_BENCH_FRAMES = 20000
+REPLAY_BENCH_NO_HAND_EVERY = 10
+ROI_BENCH_FRAMES = 300
+ROI_BENCH_FRAME_SHAPE = (720, 1280, 3)
+ROI_BENCH_BLOB_SIZE = 140
+SCHEDULE_BENCH_SIGNS = 400
+SCHEDULE_BENCH_POSES = 8
+SCHEDULE_BENCH_JITTER = 0.0008
+SCHEDULE_BENCH_SEED = 17
+# MediaPipe Hands p50 on 640x480 frames, from `benchmark.py pipeline --detector mediapipe`.
+SCHEDULE_BENCH_DETECT_MS = 17.0
+PAUSE_BENCH_PHASE_S = 3.0
+PAUSE_BENCH_RESUMES = 5
+PAUSE_BENCH_FRAME_SHAPE = (720, 1280, 3)
+PAUSE_BENCH_TIMEOUT_S = 5.0
+PREPROCESS_BENCH_FRAMES = 300
+PREPROCESS_BENCH_SIZE = (1280, 720)
+PREPROCESS_BENCH_MAX_SIDE = 640
+PREPROCESS_PARITY_FRAMES = 200
+# Landmarks are float32, as MediaPipe's are, so mirroring them rounds differently
+# from detecting on a flipped frame: by up to one float32 step, which joint angles
+# close to straight amplify. Downscaling moves the detected dots themselves.
+PREPROCESS_PARITY_LANDMARK_TOLERANCE = 1e-7
+PREPROCESS_PARITY_FULL_TOLERANCE = 1e-2
+PREPROCESS_PARITY_DOWNSCALED_TOLERANCE = 0.05
+# Landmark dots for the parity check: (B, G, R) = (0, code, 255) with one code per
+# landmark (a multiple of 4), far enough apart that neighbouring dots do not touch.
+DOT_RADIUS = 6
+STARTUP_BENCH_RUNS = 3
+SWAP_BENCH_DURATION_S = 12.0
+SWAP_BENCH_EVERY_S = 2.0
+SWAP_BENCH_MEDIUM_TREES = 400
+SWAP_BENCH_FRAME_SHAPE = (120, 160, 3)
+WORKERS_BENCH_FRAMES = 300
+WORKERS_BENCH_COUNTS = "0,1,2,4"
+WORKERS_BENCH_SIZE = (1280, 720)
+WORKERS_BENCH_DISTINCT_FRAMES = 32
+STREAMS_BENCH_COUNTS = "1,2,4,8"
+STREAMS_BENCH_DURATION_S = 4.0
+STREAMS_BENCH_SIZE = (640, 360)
+STREAMS_BENCH_SIGNS = 60
+WINDOW_BENCH_FRAMES = 3000
+WINDOW_BENCH_LENGTHS = "15,30,60"
+WINDOW_BENCH_DRIFT_FRAMES = 20000
+WINDOW_BENCH_SEQUENCES = 30
+WINDOW_BENCH_SEQUENCE_FRAMES = 45
+WINDOW_BENCH_SEED = 23
+COMMIT_BENCH_SIGNS = 300
+COMMIT_BENCH_FPS = "15,30,60"
+COMMIT_BENCH_GLITCH_RATE = 0.08
+COMMIT_BENCH_JITTER = 0.002
+COMMIT_BENCH_SEED = 29
+PREFERENCES_BENCH_TICKS = 120
+PREFERENCES_BENCH_TICK_MS = 16
+SETTINGS_BENCH_RUNS = 3
+SETTINGS_BENCH_CAPTION = "HELLO MY NAME IS"
+SETTINGS_BENCH_TIMEOUT_S = 60.0
+SETTINGS_BENCH_REPAINT_TIMEOUT_S = 2.0
+CONTROL_BENCH_SERVER_NAME = "signflow_benchmark_control"
+CONTROL_BENCH_COMMANDS = 60
+CONTROL_BENCH_EVERY_S = 0.1
+CONTROL_BENCH_TIMEOUT_S = 5.0
+CONTROL_BENCH_PAUSE_POLL_S = 0.05
+CONTROL_BENCH_CAPTION = "HELLO"
+# Label, pose and motion of the synthetic signs: each pose once held still and once
+# traced through the air, so only motion tells the pairs apart.
+MOTION_BENCH_SIGNS = (("I", 0, "static"), ("J", 0, "hook"), ("D", 1, "static"), ("Z", 1, "zigzag"))
+STARTUP_BENCH_TIMEOUT_S = 120.0
+# Blended edge pixels below this red level are too faint to tell their code apart.
+DOT_MIN_COVERAGE = 96
+DOT_SPACING = 0.05
+DOT_CODES = (np.arange(HAND_LANDMARK_COUNT) * 4 + 20, np.arange(HAND_LANDMARK_COUNT) * 4 + 120)
+
+
+class StampedFrame(np.ndarray):
+    glass_time = 0.0
+
+
+def _percentile_ms(samples, percentile):
+    if not samples:
+        return 0.0
+    return float(np.percentile(np.asarray(samples), percentile) * 1000.0)
+
+
+def _print_rows(title, rows):
+    print(title)
+    width = max(len(name) for name, _value in rows)
+    for name, value in rows:
+        print(f"  {name.ljust(width)}  {value}")
+
+
+def _require(ok, message):
+    # Correctness checks end the run with a non-zero exit instead of only printing.
+    if not ok:
+        raise SystemExit(f"FAILED: {message}")
+
+
+HandLandmarks = collections.namedtuple("HandLandmarks", "landmark")
+Handedness = collections.namedtuple("Handedness", "classification")
+
+
+class Landmark:
+    # Mutable like the protobuf message: the pipeline remaps and mirrors landmarks in place.
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class Category:
+    __slots__ = ("label",)
+
+    def __init__(self, label):
+        self.label = label
+
+
+class SyntheticHands:
+    # Shaped like a MediaPipe Hands result; uses the protobuf types when mediapipe is installed.
+    def __init__(self, points, labels):
+        try:
+            from mediapipe.framework.formats import classification_pb2, landmark_pb2
+        except ImportError:
+            classification_pb2 = landmark_pb2 = None
+
+        self.multi_hand_landmarks = []
+        self.multi_handedness = []
+        for hand_points, label in zip(points, labels):
+            if landmark_pb2 is None:
+                hand = HandLandmarks([Landmark(*point) for point in hand_points])
+                handedness = Handedness([Category(label)])
+            else:
+                hand = landmark_pb2.NormalizedLandmarkList()
+                for x, y, z in hand_points:
+                    hand.landmark.add(x=float(x), y=float(y), z=float(z))
+                handedness = classification_pb2.ClassificationList()
+                handedness.classification.add(label=label)
+            self.multi_hand_landmarks.append(hand)
+            self.multi_handedness.append(handedness)
+
+
+def synthetic_hand_results(count, seed):
+    rng = np.random.default_rng(seed)
+    label_choices = (("Right",), ("Left",), ("Right", "Left"), ("Left", "Right"))
+    results = []
+    for _ in range(count):
+        labels = label_choices[rng.integers(len(label_choices))]
+        points = rng.random((len(labels), HAND_LANDMARK_COUNT, 3)) * 0.5 + 0.25
+        results.append(SyntheticHands(points, labels))
+    return results
+
+
+def _time_per_frame(fn, inputs):
+    start = time.perf_counter()
+    for item in inputs:
+        fn(item)
+    return (time.perf_counter() - start) / len(inputs)
+
+
+def _peak_bytes_per_frame(fn, inputs):
+    peaks = []
+    tracemalloc.start()
+    for item in inputs:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn(item)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return float(np.mean(peaks))
+
+
+def synthetic_feature_set(count, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.random((len(STUB_CLASSES), FEATURE_VECTOR_SIZE))
+    targets = rng.integers(len(STUB_CLASSES), size=count)
+    samples = centers[targets] + rng.normal(0.0, 0.25, (count, FEATURE_VECTOR_SIZE))
+    return samples.astype(np.float32), np.asarray(STUB_CLASSES)[targets]
+
+
+def build_stub_models(names=None):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    samples, targets = synthetic_feature_set(STUB_TRAINING_SAMPLES, STUB_SEED)
+    models = {
+        "random_forest": RandomForestClassifier(n_estimators=100, random_state=STUB_SEED),
+        "scaled_logistic": make_pipeline(StandardScaler(), LogisticRegression(max_iter=500)),
+        "mlp": MLPClassifier(hidden_layer_sizes=(128, 64), max_iter=300, random_state=STUB_SEED),
+    }
+    if names is not None:
+        models = {name: models[name] for name in names}
+    for model in models.values():
+        model.fit(samples, targets)
+    return models
+
+
+def load_replay_frames(video_path, limit):
+    if not video_path:
+        return [np.zeros(REPLAY_FRAME_SHAPE, dtype=np.uint8)]
+
+    import cv2
+
+    video = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = video.read()
+        if not ret:
+            break
+        frames.append(frame)
+    video.release()
+    if not frames:
+        raise SystemExit(f"No frames could be read from {video_path}")
+    return frames
+
+
+class ReplayCamera:
+    # Emulates a webcam driver: frames hit the glass at a fixed rate and queue in a
+    # small driver buffer; when the buffer is full new frames are discarded.
+    def __init__(self, frames, fps, buffer_depth, duration_s):
+        self.frames = frames
+        self.interval = 1.0 / fps
+        self.total_frames = int(duration_s * fps)
+        self.buffer_depth = buffer_depth
+        self.driver_dropped = 0
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._finished = False
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _produce(self):
+        start = time.monotonic()
+        for index in range(self.total_frames):
+            due = start + index * self.interval
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            frame = self.frames[index % len(self.frames)].view(StampedFrame)
+            frame.glass_time = time.monotonic()
+            with self._cond:
+                if len(self._queue) >= self.buffer_depth:
+                    self.driver_dropped += 1
+                else:
+                    self._queue.append(frame)
+                    self._cond.notify_all()
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def read(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or self._finished)
+            if not self._queue:
+                return False, None
+            return True, self._queue.popleft()
+
+    def release(self):
+        pass
+
+
+def _run_replay(frames, args, use_grabber):
+    camera = ReplayCamera(frames, args.fps, args.buffer_depth, args.duration).start()
+    source = LatestFrameGrabber(camera).start() if use_grabber else None
+    latencies = []
+    work_s = args.work_ms / 1000.0
+
+    while True:
+        if source is not None:
+            ret, frame, _captured_at = source.read()
+        else:
+            ret, frame = camera.read()
+        if not ret:
+            break
+        time.sleep(work_s)
+        latencies.append(time.monotonic() - frame.glass_time)
+
+    grabber_dropped = 0
+    if source is not None:
+        source.stop()
+        grabber_dropped = source.dropped_frames
+
+    return [
+        ("captions", str(len(latencies))),
+        ("glass-to-caption p50", f"{_percentile_ms(latencies, 50):.1f} ms"),
+        ("glass-to-caption p95", f"{_percentile_ms(latencies, 95):.1f} ms"),
+        ("glass-to-caption max", f"{_percentile_ms(latencies, 100):.1f} ms"),
+        ("driver dropped", str(camera.driver_dropped)),
+        ("grabber dropped", str(grabber_dropped)),
+    ]
+
+
+def bench_grabber(args):
+    frames = load_replay_frames(args.video, int(args.duration * args.fps))
+    print(
+        f"Replaying {args.duration:.1f}s at {args.fps} FPS, driver buffer {args.buffer_depth}, "
+        f"{args.work_ms:.0f} ms of work per frame"
+    )
+    _print_rows("Direct cap.read():", _run_replay(frames, args, use_grabber=False))
+    _print_rows("LatestFrameGrabber:", _run_replay(frames, args, use_grabber=True))
+
+
+def bench_features(args):
+    results = synthetic_hand_results(args.frames, FEATURE_BENCH_SEED)
+    extractor = HandFeatureExtractor()
+
+    def legacy(result):
+        return build_feature_vector(result.multi_hand_landmarks, result.multi_handedness)
+
+    def batched(result):
+        return extractor.extract(result.multi_hand_landmarks, result.multi_handedness)
+
+    mismatches = 0
+    for result in results:
+        if not np.array_equal(batched(result), legacy(result).astype(extractor.features.dtype)):
+            mismatches += 1
+
+    rows = []
+    for name, fn in (("build_feature_vector", legacy), ("HandFeatureExtractor", batched)):
+        rows.append((f"{name} time", f"{_time_per_frame(fn, results) * 1e6:.1f} us/frame"))
+        rows.append((f"{name} allocated", f"{_peak_bytes_per_frame(fn, results[:500]):.0f} B/frame"))
+    rows.append(("mismatched frames", f"{mismatches}/{len(results)}"))
+    _print_rows(f"Feature extraction over {len(results)} synthetic frames:", rows)
+    _require(not mismatches, f"HandFeatureExtractor differs from build_feature_vector on {mismatches} frames")
+
+
+def bench_inference(args):
+    if args.model:
+        import joblib
+
+        models = {args.model: joblib.load(args.model)}
+    else:
+        models = build_stub_models()
+
+    samples, _targets = synthetic_feature_set(INFERENCE_PARITY_SAMPLES, STUB_SEED + 1)
+    single = [samples[i:i + 1] for i in range(min(args.calls, len(samples)))]
+
+    for name, model in models.items():
+        sklearn_engine = ClassificationEngine(model)
+        compiled_engine = ClassificationEngine(model, compiled=True)
+
+        def double_call(features):
+            model.predict_proba(features)
+            return model.predict(features)
+
+        rows = [("predict_proba + predict", f"{_time_per_frame(double_call, single) * 1e6:.1f} us/call")]
+        rows.append(("engine (sklearn)", f"{_time_per_frame(sklearn_engine.classify, single) * 1e6:.1f} us/call"))
+        if compiled_engine.mode == "compiled":
+            rows.append(("engine (compiled)", f"{_time_per_frame(compiled_engine.classify, single) * 1e6:.1f} us/call"))
+            reference = model.predict_proba(samples)
+            compiled = compiled_engine.predict_proba(samples)
+            predicted = [str(label).strip() for label in model.predict(samples)]
+            compiled_labels = [compiled_engine.labels[i] for i in np.argmax(compiled, axis=1)]
+            mismatches = sum(a != b for a, b in zip(predicted, compiled_labels))
+            max_difference = float(np.max(np.abs(reference - compiled)))
+            rows.append(("compiled max |dp|", f"{max_difference:.3g} (tolerance {INFERENCE_PARITY_TOLERANCE:g})"))
+            rows.append(("compiled label mismatches", f"{mismatches}/{len(samples)}"))
+        else:
+            rows.append(("engine (compiled)", f"unsupported estimator {type(model).__name__}"))
+        single_pass_mismatches = sum(
+            sklearn_engine.classify(features).label != str(model.predict(features)[0]).strip() for features in single
+        )
+        rows.append(("single-pass label mismatches", f"{single_pass_mismatches}/{len(single)}"))
+        _print_rows(f"{name}:", rows)
+        if compiled_engine.mode == "compiled":
+            _require(
+                max_difference <= INFERENCE_PARITY_TOLERANCE,
+                f"{name}: compiled probabilities differ from scikit-learn by {max_difference:.3g}",
+            )
+            _require(not mismatches, f"{name}: {mismatches} compiled labels differ from scikit-learn")
+        _require(not single_pass_mismatches, f"{name}: {single_pass_mismatches} single-pass labels differ from predict()")
+
+
+def _ipc_sink(server_name, expected, results):
+    from PyQt5.QtCore import QCoreApplication, QTimer
+
+    app = QCoreApplication([])
+    server = OverlayServer(server_name)
+    server.listen()
+    finished = {"at": 0.0}
+
+    def on_message(_message):
+        if expected is not None and server.received >= expected:
+            finished["at"] = time.monotonic()
+            app.quit()
+
+    server.message_received.connect(on_message)
+    QTimer.singleShot(IPC_BENCH_TIMEOUT_MS, app.quit)
+    QTimer.singleShot(0, lambda: results.put("listening"))
+    app.exec_()
+    server.close()
+    results.put((server.received, finished["at"]))
+
+
+def send_caption_per_connection(server_name, caption_text):
+    # The original realtime_sender.send_caption: one connection per caption.
+    from PyQt5.QtNetwork import QLocalSocket
+
+    socket = QLocalSocket()
+    socket.connectToServer(server_name)
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+    if socket.write((caption_text + MESSAGE_DELIMITER).encode("utf-8")) < 0:
+        return False
+    if not socket.waitForBytesWritten(WRITE_TIMEOUT_MS):
+        return False
+    socket.disconnectFromServer()
+    if socket.state() != QLocalSocket.UnconnectedState:
+        socket.waitForDisconnected(DISCONNECT_TIMEOUT_MS)
+    return True
+
+
+def _run_ipc_throughput(framed, count):
+    from PyQt5.QtCore import QCoreApplication
+
+    # Keeps Qt from warning about socket notifiers used outside an application.
+    _app = QCoreApplication.instance() or QCoreApplication([])
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    sink = context.Process(target=_ipc_sink, args=(IPC_BENCH_SERVER_NAME, count, results))
+    sink.start()
+    results.get(timeout=IPC_BENCH_TIMEOUT_MS / 1000.0)
+
+    connection = OverlayConnection(IPC_BENCH_SERVER_NAME)
+    failures = 0
+    start = time.monotonic()
+    for _ in range(count):
+        if framed:
+            sent = connection.send_caption(IPC_BENCH_CAPTION)
+        else:
+            sent = send_caption_per_connection(IPC_BENCH_SERVER_NAME, IPC_BENCH_CAPTION)
+        failures += 0 if sent else 1
+    received, finished_at = results.get(timeout=IPC_BENCH_TIMEOUT_MS / 1000.0)
+    connection.close()
+    sink.join()
+
+    elapsed = max(finished_at - start, 1e-9) if received >= count else float("nan")
+    return [
+        ("delivered", f"{received}/{count}"),
+        ("send failures", str(failures)),
+        ("throughput", f"{count / elapsed:,.0f} msg/s"),
+        ("per message", f"{elapsed / count * 1e6:.1f} us"),
+        ("connections opened", str(connection.connects if framed else count)),
+    ]
+
+
+def _start_ipc_sink():
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    sink = context.Process(target=_ipc_sink, args=(IPC_BENCH_SERVER_NAME, None, results), daemon=True)
+    sink.start()
+    results.get(timeout=IPC_BENCH_TIMEOUT_MS / 1000.0)
+    return sink
+
+
+def _run_frame_loop_phases(send, args):
+    sink = _start_ipc_sink()
+    phases = [("overlay alive", None)]
+    if hasattr(signal, "SIGSTOP"):
+        phases.append(("overlay frozen", signal.SIGSTOP))
+    phases.append(("overlay killed", signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM))
+
+    interval = 1.0 / args.fps
+    work_s = args.work_ms / 1000.0
+    caption = "A" * args.caption_bytes
+    rows = []
+    for name, sink_signal in phases:
+        if sink_signal is not None:
+            os.kill(sink.pid, sink_signal)
+        durations = []
+        next_frame = time.perf_counter()
+        for index in range(int(args.phase_seconds * args.fps)):
+            start = time.perf_counter()
+            time.sleep(work_s)
+            if index % OUTBOX_BENCH_CAPTION_EVERY == 0:
+                send(caption)
+            finished = time.perf_counter()
+            durations.append(finished - start)
+            next_frame += interval
+            if next_frame > finished:
+                time.sleep(next_frame - finished)
+            else:
+                next_frame = finished
+        rows.append(
+            (
+                name,
+                f"frame p50 {_percentile_ms(durations, 50):.1f} ms, "
+                f"p99 {_percentile_ms(durations, 99):.1f} ms, max {_percentile_ms(durations, 100):.1f} ms",
+            )
+        )
+    sink.join(timeout=1.0)
+    return rows
+
+
+def bench_outbox(args):
+    from PyQt5.QtCore import QCoreApplication
+
+    _app = QCoreApplication.instance() or QCoreApplication([])
+    print(
+        f"{args.phase_seconds:.0f}s per phase at {args.fps} FPS, {args.work_ms:.0f} ms work per frame, "
+        f"{args.caption_bytes} B caption every {OUTBOX_BENCH_CAPTION_EVERY} frames"
+    )
+
+    connection = OverlayConnection(IPC_BENCH_SERVER_NAME)
+    _print_rows("Inline OverlayConnection.send_caption:", _run_frame_loop_phases(connection.send_caption, args))
+
+    outbox = Outbox(IPC_BENCH_SERVER_NAME).start()
+    rows = _run_frame_loop_phases(outbox.post_caption, args)
+    outbox.stop()
+    stats = outbox.stats()
+    rows.append(("counters", ", ".join(f"{key} {value}" for key, value in stats.items())))
+    rows.append(("breaker trips", str(outbox.breaker.trips)))
+    _print_rows("Outbox.post_caption:", rows)
+
+
+def _caption_burst_client(server_name, framed_count, line_count):
+    from PyQt5.QtCore import QCoreApplication
+    from PyQt5.QtNetwork import QLocalSocket
+
+    _app = QCoreApplication([])
+    line_socket = QLocalSocket()
+    line_socket.connectToServer(server_name)
+    if line_socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        for index in range(line_count):
+            line_socket.write(f"LINE CAPTION {index}{MESSAGE_DELIMITER}".encode("utf-8"))
+        while line_socket.bytesToWrite() > 0 and line_socket.waitForBytesWritten(WRITE_TIMEOUT_MS):
+            pass
+        line_socket.disconnectFromServer()
+
+    connection = OverlayConnection(server_name)
+    for index in range(framed_count):
+        connection.send_caption(f"FRAMED CAPTION {index}")
+    connection.close()
+
+
+def _offscreen_overlay_window():
+    # Runs the real OverlayWindow on the offscreen platform with preferences kept in a temp dir.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    import overlay
+
+    app = QApplication.instance() or QApplication([])
+    preferences_dir = tempfile.mkdtemp(prefix="signflow-bench-")
+    overlay.USER_PREFERENCES_PATH = Path(preferences_dir) / "user_preferences.json"
+    window = overlay.OverlayWindow(dict(overlay.DEFAULT_SETTINGS), dict(overlay.DEFAULT_SETTINGS))
+    return app, window
+
+
+class PaintCounter:
+    def __init__(self, widget):
+        from PyQt5.QtCore import QEvent, QObject
+
+        counter = self
+
+        class _Filter(QObject):
+            def eventFilter(self, _watched, event):
+                if event.type() == QEvent.Paint:
+                    counter.paints += 1
+                return False
+
+        self.paints = 0
+        self._filter = _Filter()
+        widget.installEventFilter(self._filter)
+
+
+def _run_overlay_burst(args, coalesce):
+    # Returns the report rows and (messages received, caption repaints, seconds, final caption).
+    from PyQt5.QtCore import QTimer
+
+    app, window = _offscreen_overlay_window()
+    paints = PaintCounter(window.primary_panel.caption_label)
+    applied = []
+    apply_caption = window.set_caption_text
+
+    def counting_set_caption_text(text):
+        applied.append(text)
+        apply_caption(text)
+
+    window.set_caption_text = counting_set_caption_text
+    if not coalesce:
+        window.queue_caption_text = counting_set_caption_text
+    window.start_caption_server(IPC_BENCH_SERVER_NAME)
+    window.show()
+
+    expected = args.framed + args.lines
+    context = multiprocessing.get_context("spawn")
+    client = context.Process(target=_caption_burst_client, args=(IPC_BENCH_SERVER_NAME, args.framed, args.lines))
+    start = time.monotonic()
+    client.start()
+
+    def check_done():
+        settled = window.pending_caption_text is None and not window.caption_coalesce_timer.isActive()
+        if window.caption_server.received >= expected and settled:
+            app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(check_done)
+    poll.start(5)
+    QTimer.singleShot(IPC_BENCH_TIMEOUT_MS, app.quit)
+    app.exec_()
+    elapsed = time.monotonic() - start
+    poll.stop()
+    client.join()
+    window.caption_server.close()
+    window.close()
+
+    rows = [
+        ("messages received", f"{window.caption_server.received}/{expected} in {elapsed:.2f} s"),
+        ("set_caption_text calls", str(len(applied))),
+        ("caption repaints", str(paints.paints)),
+        ("final caption", window.caption_text),
+    ]
+    return rows, (window.caption_server.received, paints.paints, elapsed, window.caption_text)
+
+
+def bench_overlay_ipc(args):
+    import overlay
+
+    expected = args.framed + args.lines
+    # The client sends the newline-delimited captions first.
+    last_caption = f"FRAMED CAPTION {args.framed - 1}" if args.framed else f"LINE CAPTION {args.lines - 1}"
+    for title, coalesce in (("Apply every update:", False), ("Coalesced updates:", True)):
+        rows, (received, paints, elapsed, final_caption) = _run_overlay_burst(args, coalesce)
+        _print_rows(title, rows)
+        _require(received == expected, f"{title} the overlay received {received} of {expected} messages")
+        _require(final_caption == last_caption, f"{title} showing {final_caption!r} instead of {last_caption!r}")
+        if coalesce:
+            # At most one repaint per coalescing interval, plus the first and the last.
+            bound = int(elapsed * 1000.0 / overlay.CAPTION_COALESCE_MS) + 2
+            _require(paints <= bound, f"{paints} repaints coalescing {expected} captions in {elapsed:.2f} s, over {bound}")
+
+
+def long_captions(count, max_chars):
+    captions = []
+    sentence = ""
+    for index in range(count):
+        sentence = f"{sentence} {LAYOUT_BENCH_WORDS[index % len(LAYOUT_BENCH_WORDS)]}".strip()
+        if len(sentence) > max_chars:
+            sentence = sentence[len(sentence) - max_chars:]
+        captions.append(sentence)
+    return captions
+
+
+def _run_layout_updates(window, captions, full_relayout):
+    panel = window.primary_panel
+    refreshes = {"count": 0}
+    refresh_geometry = window._refresh_window_geometry
+
+    def counting_refresh(reposition):
+        refreshes["count"] += 1
+        refresh_geometry(reposition)
+
+    window._refresh_window_geometry = counting_refresh
+    start = time.perf_counter()
+    for caption in captions:
+        if full_relayout:
+            # What every update cost before layout caching: measure, resize, mask and move.
+            panel.layout_cache.clear()
+            panel.caption_height = panel.panel_height = None
+            window.caption_text = caption
+            panel.set_caption_text(caption)
+            window._refresh_window_geometry(reposition=True)
+        else:
+            window.set_caption_text(caption)
+    elapsed = time.perf_counter() - start
+    window._refresh_window_geometry = refresh_geometry
+    return [
+        ("updates per second", f"{len(captions) / elapsed:,.0f}"),
+        ("window geometry refreshes", str(refreshes["count"])),
+    ]
+
+
+def bench_overlay_layout(args):
+    app, window = _offscreen_overlay_window()
+    window.show()
+    app.processEvents()
+    captions = long_captions(args.updates, args.caption_chars)
+    print(f"{len(captions)} caption updates, up to {args.caption_chars} characters")
+    _print_rows("Full relayout per update:", _run_layout_updates(window, captions, full_relayout=True))
+    _print_rows("Cached layout:", _run_layout_updates(window, captions, full_relayout=False))
+    repeated = captions[-LAYOUT_BENCH_REPEAT_CYCLE:] * (len(captions) // LAYOUT_BENCH_REPEAT_CYCLE)
+    _print_rows(
+        f"Cached layout, {LAYOUT_BENCH_REPEAT_CYCLE} captions repeated:",
+        _run_layout_updates(window, repeated, full_relayout=False),
+    )
+    window.close()
+
+
+def _run_caption_session(checkpoints, window, incremental):
+    # Times the sender's per-commit work (build the update and frame it) plus the
+    # overlay's decode, over the last `window` commits before each checkpoint.
+    sender = CaptionBuffer()
+    receiver = CaptionBuffer()
+    sentence = ""
+    timed = {commit for checkpoint in checkpoints for commit in range(checkpoint - window + 1, checkpoint + 1)}
+    rows = []
+    elapsed = 0.0
+    payload_bytes = 0
+    for commit in range(1, checkpoints[-1] + 1):
+        label = LAYOUT_BENCH_WORDS[commit % len(LAYOUT_BENCH_WORDS)][0]
+        start = time.perf_counter()
+        if incremental:
+            frame = encode_frame(MSG_CAPTION_DELTA, commit, sender.append(label))
+            receiver.apply(decode_json(frame[FRAME_HEADER.size:]))
+            visible = receiver.visible
+        else:
+            sentence += label
+            frame = encode_frame(MSG_CAPTION, commit, sentence)
+            visible = frame[FRAME_HEADER.size:].decode("utf-8")
+        if commit in timed:
+            elapsed += time.perf_counter() - start
+            payload_bytes += len(frame)
+        if commit in checkpoints:
+            held = len(sender.scrollback()) if incremental else len(sentence)
+            rows.append(
+                (
+                    f"after {commit:,} commits",
+                    f"{elapsed / window * 1e6:7.2f} us/update, {payload_bytes / window:8.1f} B/frame, "
+                    f"{held:,} chars held, {len(visible):,} shown",
+                )
+            )
+            elapsed = 0.0
+            payload_bytes = 0
+    return rows
+
+
+def _caption_recovery_check(commits, drop_every):
+    sender = CaptionBuffer()
+    receiver = CaptionBuffer()
+    diverged = 0
+    for commit in range(1, commits + 1):
+        delta = sender.append(LAYOUT_BENCH_WORDS[commit % len(LAYOUT_BENCH_WORDS)])
+        if commit % drop_every:
+            receiver.apply(delta)
+        if receiver.visible != sender.visible:
+            diverged += 1
+    return [
+        ("commits", f"{commits:,} (every {drop_every}th delta dropped)"),
+        ("commits with a stale overlay", f"{diverged:,}"),
+        ("in sync at the end", str(receiver.visible == sender.visible)),
+    ]
+
+
+def _caption_restart_check(commits):
+    # The overlay keeps its lane while the sender restarts; the new sender counts
+    # revisions from 0 again, starting with the keyframe it sends on connect.
+    old_sender = CaptionBuffer()
+    receiver = CaptionBuffer()
+    for commit in range(commits):
+        receiver.apply(old_sender.append(LAYOUT_BENCH_WORDS[commit % len(LAYOUT_BENCH_WORDS)]))
+    sender = CaptionBuffer()
+    ignored = sum(not receiver.apply(delta) for delta in [sender.keyframe()] + [sender.append(label) for label in "ABC"])
+    shown = receiver.visible
+    ignored += not receiver.apply(sender.clear())
+    return (
+        [
+            ("old sender commits", f"{commits:,}"),
+            ("new sender deltas ignored", f"{ignored} of 5"),
+            ("shown before the clear", repr(shown)),
+            ("shown after the clear", repr(receiver.visible)),
+        ],
+        not ignored and shown == "ABC" and receiver.visible == "",
+    )
+
+
+def bench_captions(args):
+    checkpoints = tuple(sorted(args.checkpoints))
+    _print_rows("Full sentence per commit:", _run_caption_session(checkpoints, args.window, incremental=False))
+    _print_rows("Caption deltas:", _run_caption_session(checkpoints, args.window, incremental=True))
+    _print_rows("Recovery from lost deltas:", _caption_recovery_check(checkpoints[-1], CAPTION_BENCH_DROP_EVERY))
+    rows, followed = _caption_restart_check(CAPTION_BENCH_RESTART_AFTER)
+    _print_rows("Restarted sender:", rows)
+    _require(followed, "the overlay ignored captions from a restarted sender")
+
+
+def synthetic_stage_stamps(count, seed):
+    rng = np.random.default_rng(seed)
+    durations = rng.gamma(2.0, 0.004, size=(count, len(LATENCY_STAGES) - 1))
+    starts = np.arange(count, dtype=np.float64)
+    stamps = np.concatenate((starts[:, None], starts[:, None] + np.cumsum(durations, axis=1)), axis=1)
+    return stamps.tolist()
+
+
+class GrowingLatencyLog:
+    # The obvious alternative: keep every sample and ask numpy for percentiles.
+    def __init__(self):
+        self.samples = [[] for _stage in LATENCY_STAGES[1:]]
+
+    def record(self, stamps):
+        for index in range(1, len(stamps)):
+            self.samples[index - 1].append(stamps[index] - stamps[index - 1])
+
+    def summary(self):
+        return [
+            tuple(float(np.percentile(samples[-LATENCY_WINDOW:], p, method="inverted_cdf")) for p in (50, 95))
+            for samples in self.samples
+        ]
+
+
+def _run_latency_recorder(recorder, stamps):
+    # Time the first half; the second half runs under tracemalloc to see what stays allocated.
+    half = len(stamps) // 2
+    start = time.perf_counter()
+    for item in stamps[:half]:
+        recorder.record(item)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for item in stamps[half:]:
+        recorder.record(item)
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    summary_start = time.perf_counter()
+    recorder.summary()
+    summary_elapsed = time.perf_counter() - summary_start
+    return [
+        ("record", f"{elapsed / half * 1e6:.2f} us/caption"),
+        ("bytes retained per record", f"{retained / (len(stamps) - half):.1f}"),
+        ("summary", f"{summary_elapsed * 1e3:.3f} ms"),
+    ]
+
+
+def bench_latency(args):
+    stamps = synthetic_stage_stamps(args.samples, LATENCY_BENCH_SEED)
+    print(f"{len(stamps)} captions, {len(LATENCY_STAGES)} stamps each, window {LATENCY_WINDOW}")
+    _print_rows("Growing sample lists + np.percentile:", _run_latency_recorder(GrowingLatencyLog(), stamps))
+    tracker = LatencyTracker()
+    _print_rows("Fixed histogram buffers:", _run_latency_recorder(tracker, stamps))
+    reference = GrowingLatencyLog()
+    for item in stamps:
+        reference.record(item)
+    worst = max(
+        abs(p - reference_p)
+        for (_name, *percentiles), reference_percentiles in zip(tracker.summary(), reference.summary())
+        for p, reference_p in zip(percentiles, (value * 1000.0 for value in reference_percentiles))
+    )
+    print(f"largest percentile difference vs exact: {worst:.3f} ms")
+
+
+class StandInDetector:
+    # Base for the mediapipe Hands stand-ins below, which hold nothing to release.
+    def close(self):
+        pass
+
+
+class StubHandDetector(StandInDetector):
+    # Stands in for mediapipe Hands: ignores the pixels and replays synthetic landmark
+    # results. The pipeline mirrors them in place, so every other pass over the list
+    # sees them mirrored; only throughput is measured with it.
+    def __init__(self, count, seed):
+        self.results = synthetic_hand_results(count, seed)
+        self.index = 0
+
+    def process(self, _rgb):
+        result = self.results[self.index % len(self.results)]
+        self.index += 1
+        return result
+
+
+class BlobHandDetector(StandInDetector):
+    # Stand-in detector for the ROI benchmark: finds the bright blob drawn by
+    # moving_blob_frames and spreads 21 landmarks over it. Like a real detector its
+    # cost grows with the number of input pixels it has to scan.
+    def process(self, rgb):
+        import cv2
+
+        gray = rgb[:, :, 0]
+        points = cv2.findNonZero((gray > 128).view(np.uint8))
+        if points is None:
+            return SyntheticHands([], [])
+        x, y, w, h = cv2.boundingRect(points)
+        height, width = gray.shape
+        grid = np.linspace(0.0, 1.0, HAND_LANDMARK_COUNT)
+        # z is relative depth in the same units as x, as MediaPipe reports it.
+        hand = np.column_stack(((x + grid * w) / width, (y + grid[::-1] ** 2 * h) / height, grid * 0.1 * w / width))
+        return SyntheticHands([hand], ["Right"])
+
+
+def moving_blob_frames(count, shape, size):
+    frames = []
+    height, width = shape[:2]
+    for index in range(count):
+        phase = 2.0 * np.pi * index / count
+        x = int((width - size) * (0.5 + 0.4 * np.sin(phase)))
+        y = int((height - size) * (0.5 + 0.4 * np.sin(2.0 * phase)))
+        frame = np.zeros(shape, dtype=np.uint8)
+        frame[y:y + size, x:x + size] = 255
+        frames.append(frame)
+    return frames
+
+
+def load_image_frames(folder, limit):
+    import cv2
+
+    paths = sorted(path for path in Path(folder).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+    frames = [frame for frame in (cv2.imread(str(path)) for path in paths[:limit]) if frame is not None]
+    if not frames:
+        raise SystemExit(f"No images could be read from {folder}")
+    return frames
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def _pipeline_source(args):
+    if args.video:
+        return f"video:{args.video}", load_replay_frames(args.video, args.frames)
+    if args.images:
+        return f"images:{args.images}", load_image_frames(args.images, args.frames)
+    return "synthetic", [np.zeros(REPLAY_FRAME_SHAPE, dtype=np.uint8)]
+
+
+def _pipeline_detector(args):
+    if args.detector == "mediapipe":
+        from pipeline import create_hands_detector
+
+        return create_hands_detector()
+    return StubHandDetector(FEATURE_BENCH_FRAMES, PIPELINE_BENCH_SEED)
+
+
+def _pipeline_model(args):
+    if args.model:
+        import joblib
+
+        return args.model, joblib.load(args.model)
+    return f"stub:{args.stub_model}", build_stub_models([args.stub_model])[args.stub_model]
+
+
+def run_pipeline_benchmark(args):
+    from pipeline import RecognitionPipeline
+
+    source, frames = _pipeline_source(args)
+    model_name, model = _pipeline_model(args)
+    engine = ClassificationEngine(model, compiled=args.compiled)
+    detector = _pipeline_detector(args)
+    pipeline = RecognitionPipeline(detector, engine)
+
+    for index in range(PIPELINE_BENCH_WARMUP_FRAMES):
+        pipeline.process(frames[index % len(frames)], time.perf_counter())
+
+    stage_samples = {name: [] for name in PIPELINE_STAGE_NAMES}
+    commits = 0
+    start = time.perf_counter()
+    for index in range(args.frames):
+        result = pipeline.process(frames[index % len(frames)], time.perf_counter())
+        finished_at = time.perf_counter()
+        captured_at, detected_at, extracted_at, classified_at = result.stamps
+        stage_samples["detect"].append(detected_at - captured_at)
+        stage_samples["features"].append(extracted_at - detected_at)
+        stage_samples["classify"].append(classified_at - extracted_at)
+        stage_samples["commit"].append(finished_at - classified_at)
+        stage_samples["total"].append(finished_at - captured_at)
+        commits += result.committed_label is not None
+    elapsed = time.perf_counter() - start
+    detector.close()
+
+    return {
+        "benchmark": "pipeline",
+        "source": source,
+        "detector": args.detector,
+        "model": model_name,
+        "engine": engine.mode,
+        "frames": args.frames,
+        "committed_labels": commits,
+        "fps": args.frames / elapsed,
+        "stages_ms": {
+            name: {"p50": _percentile_ms(samples, 50), "p99": _percentile_ms(samples, 99)}
+            for name, samples in stage_samples.items()
+        },
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def bench_pipeline(args):
+    report = run_pipeline_benchmark(args)
+    rows = [
+        ("source", report["source"]),
+        ("detector", report["detector"]),
+        ("model", f"{report['model']} ({report['engine']})"),
+        ("frames per second", f"{report['fps']:,.1f}"),
+        ("committed labels", str(report["committed_labels"])),
+    ]
+    for name, percentiles in report["stages_ms"].items():
+        rows.append((f"{name} p50/p99", f"{percentiles['p50']:.3f} / {percentiles['p99']:.3f} ms"))
+    peak_rss = report["peak_rss_bytes"]
+    rows.append(("peak RSS", f"{peak_rss / 2**20:.1f} MiB" if peak_rss is not None else "unavailable"))
+    _print_rows(f"Pipeline over {report['frames']} frames:", rows)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"wrote {args.json}")
+
+
+def write_synthetic_recording(path, count, seed):
+    from recording import LandmarkRecorder
+
+    results = synthetic_hand_results(count, seed)
+    empty = SyntheticHands([], [])
+    frames = [empty if index % REPLAY_BENCH_NO_HAND_EVERY == 0 else result for index, result in enumerate(results)]
+    start = time.perf_counter()
+    with LandmarkRecorder(path) as recorder:
+        for index, result in enumerate(frames):
+            recorder.record(index / REPLAY_FPS, result.multi_hand_landmarks, result.multi_handedness)
+    return frames, time.perf_counter() - start
+
+
+def bench_replay(args):
+    from pipeline import RecognitionPipeline
+    from recording import load_recording, record_labels
+
+    with tempfile.TemporaryDirectory() as folder:
+        frames = None
+        path = args.recording
+        if not path:
+            path = os.path.join(folder, "synthetic.sflr")
+            frames, record_s = write_synthetic_recording(path, args.frames, PIPELINE_BENCH_SEED)
+            print(f"recorded {len(frames)} synthetic frames in {record_s * 1e3:.0f} ms ({os.path.getsize(path) / 2**20:.1f} MiB)")
+
+        start = time.perf_counter()
+        records = load_recording(path)
+        rows = [
+            ("records", f"{len(records):,}"),
+            ("open + map", f"{(time.perf_counter() - start) * 1e3:.2f} ms"),
+        ]
+
+        if frames is not None:
+            live = HandFeatureExtractor()
+            replayed = HandFeatureExtractor()
+            mismatches = 0
+            for frame, record in zip(frames, records):
+                if not frame.multi_hand_landmarks:
+                    mismatches += int(record["hand_count"] != 0)
+                    continue
+                expected = live.extract(frame.multi_hand_landmarks, frame.multi_handedness)
+                actual = replayed.extract_points(record["landmarks"], record_labels(record))
+                mismatches += int(not np.array_equal(expected, actual))
+            rows.append(("feature mismatches vs live", f"{mismatches}/{len(frames)}"))
+
+        model_name, model = _pipeline_model(args)
+        engine = ClassificationEngine(model, compiled=args.compiled)
+        pipeline = RecognitionPipeline(None, engine)
+        commits = 0
+        start = time.perf_counter()
+        for record in records:
+            commits += pipeline.process_record(record).committed_label is not None
+        elapsed = time.perf_counter() - start
+        rows.append((f"replay {model_name} ({engine.mode})", f"{len(records) / elapsed:,.0f} frames/s"))
+        rows.append(("committed labels", str(commits)))
+        _print_rows("Landmark replay:", rows)
+        del records
+
+
+def _run_roi_pass(frames, detector, engine, roi_enabled):
+    from pipeline import RecognitionPipeline
+
+    pipeline = RecognitionPipeline(detector, engine, roi_enabled=roi_enabled)
+    detect_samples = []
+    pixels = cropped = 0
+    landmarks = []
+    for frame in frames:
+        result = pipeline.process(frame, time.perf_counter())
+        detect_samples.append(result.stamps[1] - result.stamps[0])
+        region = pipeline.region
+        if region is None:
+            pixels += frame.shape[0] * frame.shape[1]
+        else:
+            pixels += (region[2] - region[0]) * (region[3] - region[1])
+            cropped += 1
+        landmarks.append(pipeline.extractor.features.copy())
+    rows = [
+        ("detect p50/p99", f"{_percentile_ms(detect_samples, 50):.3f} / {_percentile_ms(detect_samples, 99):.3f} ms"),
+        ("detector input", f"{pixels / len(frames) / 1e6:.3f} Mpx/frame"),
+        ("frames cropped", f"{cropped}/{len(frames)}"),
+    ]
+    return rows, _percentile_ms(detect_samples, 50), np.concatenate(landmarks)
+
+
+def bench_roi(args):
+    if args.video or args.images:
+        _source, frames = _pipeline_source(args)
+        detector = _pipeline_detector(args)
+    else:
+        frames = moving_blob_frames(args.frames, ROI_BENCH_FRAME_SHAPE, ROI_BENCH_BLOB_SIZE)
+        detector = BlobHandDetector()
+    _model_name, model = _pipeline_model(args)
+    engine = ClassificationEngine(model, compiled=True)
+
+    full_rows, full_p50, full_features = _run_roi_pass(frames, detector, engine, roi_enabled=False)
+    roi_rows, roi_p50, roi_features = _run_roi_pass(frames, detector, engine, roi_enabled=True)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, detector {type(detector).__name__}")
+    _print_rows("Full frame:", full_rows)
+    roi_rows.append(("detection time saved (p50)", f"{full_p50 - roi_p50:.3f} ms/frame"))
+    roi_rows.append(("max feature difference", f"{np.max(np.abs(full_features - roi_features)):.3g}"))
+    _print_rows("Hand ROI:", roi_rows)
+    detector.close()
+
+
+def synthetic_signing_session(path, signs, seed):
+    # Writes a recording that alternates idle stretches, poses held still with small
+    # tracking jitter, and hand movement between poses. Returns the pose prototypes.
+    from recording import LandmarkRecorder
+
+    rng = np.random.default_rng(seed)
+    poses = rng.random((SCHEDULE_BENCH_POSES, HAND_LANDMARK_COUNT, 3)) * 0.3 + 0.35
+    empty = SyntheticHands([], [])
+    frame_index = 0
+    with LandmarkRecorder(path) as recorder:
+        def write(result):
+            nonlocal frame_index
+            recorder.record(frame_index / REPLAY_FPS, result.multi_hand_landmarks, result.multi_handedness)
+            frame_index += 1
+
+        previous = None
+        for _sign in range(signs):
+            pose = poses[rng.integers(len(poses))]
+            if previous is None or rng.random() < 0.4:
+                for _frame in range(int(rng.integers(15, 120))):
+                    write(empty)
+            else:
+                for step in np.linspace(0.0, 1.0, int(rng.integers(4, 10))):
+                    write(SyntheticHands([previous + (pose - previous) * step], ["Right"]))
+            for _frame in range(int(rng.integers(10, 40))):
+                write(SyntheticHands([pose + rng.normal(0.0, SCHEDULE_BENCH_JITTER, pose.shape)], ["Right"]))
+            previous = pose
+    return poses, frame_index
+
+
+def pose_model(poses, seed):
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(seed)
+    extractor = HandFeatureExtractor()
+    samples, targets = [], []
+    for label, pose in zip(STUB_CLASSES, poses):
+        for _sample in range(200):
+            jittered = (pose + rng.normal(0.0, SCHEDULE_BENCH_JITTER * 4, pose.shape)).astype(np.float32)
+            samples.append(extractor.extract_points(jittered[None], ["Right"])[0].copy())
+            targets.append(label)
+    return RandomForestClassifier(n_estimators=100, random_state=seed).fit(np.asarray(samples), targets)
+
+
+class CountingCommitter:
+    # Wraps the committer to log the frame ordinal of every commit.
+    def __init__(self, committer):
+        self.committer = committer
+        self.frames = 0
+        self.commits = []
+
+    def reset(self):
+        self.committer.reset()
+
+    def update(self, detected_label, prediction=None, stamp=None):
+        committed = self.committer.update(detected_label, prediction, stamp)
+        if committed:
+            self.commits.append((self.frames, committed))
+        self.frames += 1
+        return committed
+
+    def note_gap(self, stamp=None):
+        self.committer.note_gap(stamp)
+        self.frames += 1
+
+
+def _run_schedule_pass(records, engine, scheduler):
+    from pipeline import EvidenceCommitter, RecognitionPipeline
+
+    committer = CountingCommitter(EvidenceCommitter())
+    pipeline = RecognitionPipeline(None, engine, committer=committer, scheduler=scheduler)
+    cpu_start = time.process_time()
+    for record in records:
+        pipeline.process_record(record)
+    return committer, time.process_time() - cpu_start
+
+
+def bench_schedule(args):
+    from pipeline import DetectionScheduler
+    from recording import load_recording
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = args.recording
+        if path:
+            model = _pipeline_model(args)[1]
+        else:
+            path = os.path.join(folder, "session.sflr")
+            poses, _frames = synthetic_signing_session(path, args.signs, SCHEDULE_BENCH_SEED)
+            model = pose_model(poses, SCHEDULE_BENCH_SEED)
+        records = load_recording(path)
+        engine = ClassificationEngine(model, compiled=args.compiled)
+
+        baseline, baseline_cpu = _run_schedule_pass(records, engine, None)
+        scheduler = DetectionScheduler()
+        scheduled, scheduled_cpu = _run_schedule_pass(records, engine, scheduler)
+        del records
+
+    minutes = baseline.frames / REPLAY_FPS / 60.0
+    stats = scheduler.stats()
+    detect_saved_s = stats["skipped_detections"] * args.detect_ms / 1000.0
+    mismatches = sum(a != b for a, b in zip(baseline.commits, scheduled.commits))
+    mismatches += abs(len(baseline.commits) - len(scheduled.commits))
+    print(f"{baseline.frames:,} frames ({minutes:.1f} min at {REPLAY_FPS} FPS), engine {engine.mode}")
+    _print_rows(
+        "Adaptive scheduling:",
+        [
+            ("commits (every frame / scheduled)", f"{len(baseline.commits)} / {len(scheduled.commits)}"),
+            ("commits at a different frame or label", str(mismatches)),
+            ("detections skipped", f"{stats['skipped_detections']:,} ({stats['skipped_detections'] / baseline.frames:.0%})"),
+            ("held frames detected on catch-up", f"{stats['catch_up_detections']:,}"),
+            ("classifications reused", f"{stats['reused_classifications']:,}"),
+            ("features + classify CPU saved", f"{(baseline_cpu - scheduled_cpu) / minutes:.2f} s/min"),
+            (f"detection CPU saved at {args.detect_ms:.0f} ms", f"{detect_saved_s / minutes:.2f} s/min"),
+        ],
+    )
+
+
+class PacedCamera:
+    # cv2.VideoCapture stand-in that delivers frames at a fixed rate. grab() only
+    # waits for the next frame; retrieve() takes the pixels from next_frame(), so
+    # a supplier that decodes pays for it there like an MJPEG webcam driver would.
+    def __init__(self, fps, next_frame):
+        self.next_frame = next_frame
+        self.interval = 1.0 / fps
+        self._next_due = time.monotonic()
+
+    def grab(self):
+        delay = self._next_due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_due = max(self._next_due + self.interval, time.monotonic())
+        return True
+
+    def retrieve(self):
+        return True, self.next_frame()
+
+    def read(self):
+        self.grab()
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+def jpeg_frames(shape):
+    # Frame supplier that decodes the same noisy JPEG on every call.
+    import cv2
+
+    rng = np.random.default_rng(PIPELINE_BENCH_SEED)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, shape, dtype=np.uint8), (9, 9), 0)
+    jpeg = cv2.imencode(".jpg", frame)[1]
+    return lambda: cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+
+
+class HeldPoseDetector(StandInDetector):
+    # Reports the same signed pose on every frame and burns `detect_ms` of CPU the
+    # way a hand detector would. The pipeline mirrors what detection reports, so the
+    # pose is kept as the unmirrored camera sees it.
+    def __init__(self, pose, detect_ms, seed):
+        self.pose = pose * (-1.0, 1.0, 1.0) + (1.0, 0.0, 0.0)
+        self.detect_s = detect_ms / 1000.0
+        self.rng = np.random.default_rng(seed)
+
+    def process(self, _rgb):
+        deadline = time.process_time() + self.detect_s
+        while time.process_time() < deadline:
+            pass
+        return SyntheticHands([self.pose + self.rng.normal(0.0, SCHEDULE_BENCH_JITTER, self.pose.shape)], ["Left"])
+
+
+def _cpu_percent(seconds):
+    wall_start, cpu_start = time.monotonic(), time.process_time()
+    time.sleep(seconds)
+    return 100.0 * (time.process_time() - cpu_start) / (time.monotonic() - wall_start)
+
+
+def bench_pause(args):
+    import cv2
+
+    from pipeline import DetectionScheduler, RecognitionPipeline
+    from realtime_sender import Playback
+    from streams import CaptionStream, FrameSource, StreamScheduler
+
+    rng = np.random.default_rng(SCHEDULE_BENCH_SEED)
+    poses = rng.random((SCHEDULE_BENCH_POSES, HAND_LANDMARK_COUNT, 3)) * 0.3 + 0.35
+    engine = ClassificationEngine(pose_model(poses, SCHEDULE_BENCH_SEED), compiled=args.compiled)
+    detector = HeldPoseDetector(poses[0], args.detect_ms, SCHEDULE_BENCH_SEED)
+    pipeline = RecognitionPipeline(detector, engine, scheduler=DetectionScheduler())
+
+    if args.camera is None:
+        cap = PacedCamera(args.fps, jpeg_frames(PAUSE_BENCH_FRAME_SHAPE))
+        source = f"synthetic {PAUSE_BENCH_FRAME_SHAPE[1]}x{PAUSE_BENCH_FRAME_SHAPE[0]} MJPEG at {args.fps} FPS"
+    else:
+        cap = cv2.VideoCapture(args.camera)
+        if not cap.isOpened():
+            raise SystemExit(f"Camera {args.camera} could not be opened")
+        source = f"camera {args.camera}"
+
+    frame_seen = threading.Event()
+    caption_seen = threading.Event()
+    seen_at = {}
+
+    def publish(_stream, result):
+        if not frame_seen.is_set():
+            seen_at["frame"] = time.monotonic()
+            frame_seen.set()
+        if result.committed_label and not caption_seen.is_set():
+            seen_at["caption"] = time.monotonic()
+            caption_seen.set()
+
+    # The single-camera sender: one stream without a stream id.
+    stream = CaptionStream(None, FrameSource(cap), pipeline)
+    playback = Playback()
+    scheduler = StreamScheduler([stream], 1, publish, playback).start()
+
+    try:
+        if not caption_seen.wait(PAUSE_BENCH_TIMEOUT_S):
+            raise SystemExit("No caption was committed before the first pause")
+        playing_cpu = _cpu_percent(args.phase)
+        first_frame_s, first_caption_s, paused_cpu = [], [], []
+        for _resume in range(args.resumes):
+            playback.set_playing(False)
+            time.sleep(0.2)
+            paused_cpu.append(_cpu_percent(args.phase))
+            frame_seen.clear()
+            caption_seen.clear()
+            resumed_at = time.monotonic()
+            playback.set_playing(True)
+            if not frame_seen.wait(PAUSE_BENCH_TIMEOUT_S) or not caption_seen.wait(PAUSE_BENCH_TIMEOUT_S):
+                raise SystemExit("Recognition did not resume")
+            first_frame_s.append(seen_at["frame"] - resumed_at)
+            first_caption_s.append(seen_at["caption"] - resumed_at)
+            time.sleep(0.2)
+    finally:
+        scheduler.stop()
+
+    print(f"{source}, {args.detect_ms:.0f} ms of detection per frame, engine {engine.mode}")
+    _print_rows(
+        "Play / pause:",
+        [
+            ("process CPU while playing", f"{playing_cpu:.1f}%"),
+            ("process CPU while paused", f"{np.mean(paused_cpu):.1f}%"),
+            ("frames grabbed without decoding while paused", f"{stream.source.grabber.paused_grabs:,}"),
+            ("resume to first recognized frame p50", f"{_percentile_ms(first_frame_s, 50):.1f} ms"),
+            ("resume to first caption p50", f"{_percentile_ms(first_caption_s, 50):.1f} ms"),
+            ("resume to first caption max", f"{_percentile_ms(first_caption_s, 100):.1f} ms"),
+        ],
+    )
+
+
+def dot_hands(rng):
+    # Two hand-shaped landmark grids, one per half of the frame: the wrist below five
+    # four-joint fingers, thumb first. The second hand is mirrored, so the thumb sits
+    # on the other side.
+    hands = []
+    for hand, center_x in enumerate((0.27, 0.73)):
+        points = np.zeros((HAND_LANDMARK_COUNT, 2))
+        points[0] = (0.0, 0.0)
+        for finger in range(5):
+            for joint in range(4):
+                points[1 + finger * 4 + joint] = (finger - 2.0, -1.0 - joint)
+        points += rng.uniform(-0.25, 0.25, points.shape)
+        if hand:
+            points[:, 0] *= -1.0
+        hands.append(points * DOT_SPACING * (1.0, 16.0 / 9.0) + (center_x, 0.75))
+    return hands
+
+
+def render_landmark_dots(hands, size):
+    import cv2
+
+    width, height = size
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    for points, codes in zip(hands, DOT_CODES):
+        for (x, y), code in zip(points, codes):
+            cv2.circle(frame, (int(round(x * width)), int(round(y * height))), DOT_RADIUS, (0, int(code), 255), -1)
+    return frame
+
+
+class LandmarkDotDetector(StandInDetector):
+    # Parity stand-in for MediaPipe: finds the dots drawn by render_landmark_dots, so
+    # what it reports follows the pixels through flips, crops and downscaling. Dot
+    # edges blended with the black background keep G/R at the dot's code, and their
+    # red level gives the coverage, so area-weighted centroids survive INTER_AREA.
+    # Handedness is read off the image (thumb tip left of the pinky tip is "Right"),
+    # so like MediaPipe's it swaps when the frame is flipped.
+    def process(self, rgb):
+        height, width = rgb.shape[:2]
+        red = rgb[:, :, 0].astype(np.float64).ravel()
+        green = rgb[:, :, 1].astype(np.float64).ravel()
+        covered = red >= DOT_MIN_COVERAGE
+        codes = np.zeros(red.size, dtype=np.intp)
+        codes[covered] = np.rint(green[covered] * 255.0 / red[covered] / 4.0).astype(np.intp) * 4
+        codes = np.clip(codes, 0, 255)
+        weights = np.where(covered, red / 255.0, 0.0)
+        rows, columns = np.divmod(np.arange(red.size), width)
+        counts = np.bincount(codes, weights=weights, minlength=256)
+        sum_x = np.bincount(codes, weights=weights * columns, minlength=256)
+        sum_y = np.bincount(codes, weights=weights * rows, minlength=256)
+        points, labels = [], []
+        for hand_codes in DOT_CODES:
+            hand_counts = counts[hand_codes]
+            if not hand_counts.all():
+                continue
+            x = (sum_x[hand_codes] / hand_counts + 0.5) / width
+            y = (sum_y[hand_codes] / hand_counts + 0.5) / height
+            points.append(np.column_stack((x, y, np.zeros(HAND_LANDMARK_COUNT))))
+            labels.append("Right" if x[4] < x[20] else "Left")
+        return SyntheticHands(points, labels)
+
+
+def _preprocess_parity(frames, max_side):
+    # Features from the old path (flip the frame, convert at full resolution, detect)
+    # against the pipeline's detection on the unflipped, optionally downscaled frame.
+    import cv2
+
+    from pipeline import FramePreprocessor, RecognitionPipeline
+
+    detector = LandmarkDotDetector()
+    pipeline = RecognitionPipeline(detector, None, preprocessor=FramePreprocessor(max_side))
+    baseline_extractor = HandFeatureExtractor()
+    differences, landmark_differences, slot_mismatches, pixel_mismatches = [], [], 0, 0
+    for frame in frames:
+        flipped = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+        if max_side is None and not np.array_equal(pipeline.preprocessor.prepare(frame), cv2.flip(flipped, 1)):
+            pixel_mismatches += 1
+        baseline = detector.process(flipped)
+        expected = baseline_extractor.extract(baseline.multi_hand_landmarks, baseline.multi_handedness)
+        results = pipeline._detect(frame)
+        features = pipeline.extractor.extract(results.multi_hand_landmarks, results.multi_handedness)
+        if [category.classification[0].label for category in baseline.multi_handedness] != [
+            category.classification[0].label for category in results.multi_handedness
+        ]:
+            slot_mismatches += 1
+            continue
+        differences.append(float(np.abs(features - expected).max()))
+        landmark_differences += [
+            max(abs(a.x - b.x), abs(a.y - b.y))
+            for hand, expected_hand in zip(results.multi_hand_landmarks, baseline.multi_hand_landmarks)
+            for a, b in zip(hand.landmark, expected_hand.landmark)
+        ]
+    return max(differences, default=0.0), max(landmark_differences, default=0.0), slot_mismatches, pixel_mismatches
+
+
+def bench_preprocess(args):
+    import cv2
+
+    from pipeline import FramePreprocessor, mirror_landmarks
+
+    rng = np.random.default_rng(PIPELINE_BENCH_SEED)
+    size = (args.width, args.height)
+    camera_frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _index in range(8)]
+    inputs = [camera_frames[index % len(camera_frames)] for index in range(args.frames)]
+    hands = SyntheticHands([np.column_stack((points, np.zeros(len(points)))) for points in dot_hands(rng)], ["Right", "Left"])
+
+    def flip_and_convert(frame):
+        cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+
+    full = FramePreprocessor()
+    reduced = FramePreprocessor(args.max_side)
+
+    def preprocess_full(frame):
+        full.prepare(frame)
+        mirror_landmarks(hands.multi_hand_landmarks, hands.multi_handedness)
+
+    def preprocess_reduced(frame):
+        reduced.prepare(frame)
+        mirror_landmarks(hands.multi_hand_landmarks, hands.multi_handedness)
+
+    preprocess_full(inputs[0])
+    preprocess_reduced(inputs[0])
+    rows = []
+    for name, fn in (
+        ("flip + convert (before)", flip_and_convert),
+        ("convert + mirror landmarks", preprocess_full),
+        (f"downscale to {args.max_side} + convert + mirror", preprocess_reduced),
+    ):
+        rows.append((f"{name} time", f"{_time_per_frame(fn, inputs) * 1e6:.0f} us/frame"))
+        rows.append((f"{name} allocated", f"{_peak_bytes_per_frame(fn, inputs[:50]) / 1024:.0f} KiB/frame"))
+    try:
+        from pipeline import landmark_drawer
+
+        draw = landmark_drawer()
+    except ImportError:
+        draw = None
+    if draw is not None:
+        canvas = inputs[0].copy()
+        draw_s = _time_per_frame(lambda _frame: draw(canvas, hands.multi_hand_landmarks), inputs[:100])
+        rows.append(("drawing landmarks (now only with a preview)", f"{draw_s * 1e6:.0f} us/frame"))
+
+    parity_frames = [render_landmark_dots(dot_hands(rng), size) for _index in range(args.parity_frames)]
+    full_diff, full_landmark_diff, full_mismatches, pixel_mismatches = _preprocess_parity(parity_frames, None)
+    reduced_diff, _reduced_landmark_diff, reduced_mismatches, _pixels = _preprocess_parity(parity_frames, args.max_side)
+
+    print(f"{args.width}x{args.height} frames, detection resolution capped at {args.max_side}")
+    _print_rows("Preprocessing per frame:", rows)
+    _print_rows(
+        f"Feature parity against flip + convert ({args.parity_frames} frames, two hands):",
+        [
+            ("detector input differing, full resolution", f"{pixel_mismatches} frames"),
+            ("max landmark difference, full resolution", f"{full_landmark_diff:.2e} (tolerance {PREPROCESS_PARITY_LANDMARK_TOLERANCE:g})"),
+            ("max feature difference, full resolution", f"{full_diff:.2e} (tolerance {PREPROCESS_PARITY_FULL_TOLERANCE:g})"),
+            ("handedness mismatches, full resolution", str(full_mismatches)),
+            (
+                f"max feature difference, downscaled to {args.max_side}",
+                f"{reduced_diff:.2e} (tolerance {PREPROCESS_PARITY_DOWNSCALED_TOLERANCE:g})",
+            ),
+            (f"handedness mismatches, downscaled to {args.max_side}", str(reduced_mismatches)),
+        ],
+    )
+    _require(not pixel_mismatches, f"the detector saw different pixels than flip + convert on {pixel_mismatches} frames")
+    _require(not full_mismatches, f"handedness differs at full resolution on {full_mismatches} frames")
+    _require(
+        full_landmark_diff <= PREPROCESS_PARITY_LANDMARK_TOLERANCE,
+        f"landmarks differ by {full_landmark_diff:.2e} at full resolution",
+    )
+    _require(full_diff <= PREPROCESS_PARITY_FULL_TOLERANCE, f"features differ by {full_diff:.2e} at full resolution")
+    _require(not reduced_mismatches, f"handedness differs downscaled to {args.max_side} on {reduced_mismatches} frames")
+    _require(
+        reduced_diff <= PREPROCESS_PARITY_DOWNSCALED_TOLERANCE,
+        f"features differ by {reduced_diff:.2e} downscaled to {args.max_side}",
+    )
+
+
+def _emulated_camera(open_ms):
+    # A camera whose driver takes open_ms to open, the way DirectShow/MSMF devices
+    # often do; the wait releases the GIL like a real driver call.
+    time.sleep(open_ms / 1000.0)
+    return PacedCamera(REPLAY_FPS, jpeg_frames(REPLAY_FRAME_SHAPE))
+
+
+def _startup_process(model_path, camera_index, camera_open_ms, parallel, warm, results):
+    # Runs in a fresh interpreter so every start is cold.
+    import realtime_sender as sender
+    from capture import load_camera_settings
+    from features import FEATURE_LAYOUT_VERSION
+    from pipeline import create_hands_detector
+    from registry import ModelArtifact, load_engine, warm_up_engine
+
+    artifact = ModelArtifact("benchmark", model_path, FEATURE_LAYOUT_VERSION, None)
+    tasks = {
+        "model": (lambda: load_engine(artifact, sender.COMPILE_MODEL), warm_up_engine if warm else None),
+        "detector": (create_hands_detector, sender.warm_up_detector if warm else None),
+    }
+    if camera_index is not None:
+        settings = dict(load_camera_settings(), camera_index=camera_index)
+        tasks["camera"] = (lambda: sender.open_checked_camera(settings), sender.warm_up_camera if warm else None)
+    elif camera_open_ms:
+        tasks["camera"] = (lambda: _emulated_camera(camera_open_ms), sender.warm_up_camera if warm else None)
+
+    started_at = time.perf_counter()
+    components, timings, errors = sender.start_components(tasks, parallel=parallel)
+    ready_s = time.perf_counter() - started_at
+
+    frame_s = []
+    if not errors:
+        rng = np.random.default_rng(PIPELINE_BENCH_SEED)
+        frame = rng.integers(0, 256, sender.WARMUP_FRAME_SHAPE, dtype=np.uint8)
+        features = synthetic_feature_set(1, PIPELINE_BENCH_SEED)[0]
+        for _frame in range(2):
+            frame_started_at = time.perf_counter()
+            if "camera" in components:
+                components["camera"].read()
+            components["detector"].process(frame)
+            components["model"].classify(features)
+            frame_s.append(time.perf_counter() - frame_started_at)
+    if "camera" in components:
+        components["camera"].release()
+    if "detector" in components:
+        components["detector"].close()
+    results.put((ready_s, timings, errors, frame_s))
+
+
+def _run_startup(model_path, args, parallel, warm):
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _run in range(args.runs):
+        results = context.Queue()
+        process = context.Process(
+            target=_startup_process,
+            args=(model_path, args.camera, args.emulate_camera_open_ms, parallel, warm, results),
+        )
+        process.start()
+        runs.append(results.get(timeout=STARTUP_BENCH_TIMEOUT_S))
+        process.join()
+    errors = runs[-1][2]
+    if errors:
+        raise SystemExit("Startup failed: " + "; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+    rows = [("ready (median)", f"{np.median([run[0] for run in runs]) * 1000:.0f} ms")]
+    for name in runs[-1][1]:
+        load_ms = np.median([run[1][name][0] for run in runs]) * 1000
+        warm_ms = np.median([run[1][name][1] for run in runs]) * 1000
+        rows.append((f"{name} load + warm-up", f"{load_ms:.0f} + {warm_ms:.0f} ms"))
+    rows.append(("first frame", f"{np.median([run[3][0] for run in runs]) * 1000:.1f} ms"))
+    rows.append(("second frame", f"{np.median([run[3][1] for run in runs]) * 1000:.1f} ms"))
+    return rows
+
+
+def bench_startup(args):
+    import joblib
+
+    with tempfile.TemporaryDirectory() as folder:
+        model_path = args.model
+        if not model_path:
+            model_path = os.path.join(folder, "model.pkl")
+            joblib.dump(build_stub_models([args.stub_model])[args.stub_model], model_path)
+        if args.camera is not None:
+            source = f"camera {args.camera}"
+        elif args.emulate_camera_open_ms:
+            source = f"emulated camera taking {args.emulate_camera_open_ms:.0f} ms to open"
+        else:
+            source = "no camera"
+        print(f"{args.runs} cold starts per mode in fresh processes, MediaPipe Hands, {source}")
+        _print_rows("Sequential, no warm-up (before):", _run_startup(model_path, args, parallel=False, warm=False))
+        _print_rows("Parallel with warm-up:", _run_startup(model_path, args, parallel=True, warm=True))
+
+
+def _swap_models(folder):
+    from sklearn.ensemble import RandomForestClassifier
+
+    from features import FEATURE_LAYOUT_VERSION
+    from registry import ModelArtifact, save_registry
+    import joblib
+
+    samples, targets = synthetic_feature_set(STUB_TRAINING_SAMPLES, STUB_SEED)
+    models = {
+        "Local Small": build_stub_models(["random_forest"])["random_forest"],
+        "Local Medium": RandomForestClassifier(n_estimators=SWAP_BENCH_MEDIUM_TREES, random_state=STUB_SEED).fit(samples, targets),
+    }
+    registry = {}
+    for index, (name, model) in enumerate(models.items()):
+        path = Path(folder) / f"model_{index}.pkl"
+        joblib.dump(model, path)
+        registry[name] = ModelArtifact(name, path, FEATURE_LAYOUT_VERSION, [str(label) for label in model.classes_])
+    registry_path = Path(folder) / "registry.json"
+    save_registry(registry, registry_path)
+    return registry_path
+
+
+def bench_swap(args):
+    from pipeline import RecognitionPipeline
+    from registry import ModelSwitcher, find_artifact, load_engine, load_registry, warm_up_engine
+
+    with tempfile.TemporaryDirectory() as folder:
+        registry = load_registry(_swap_models(folder))
+        names = list(registry)
+        engine = load_engine(find_artifact(registry, names[0]), args.compiled)
+        warm_up_engine(engine)
+        pipeline = RecognitionPipeline(StubHandDetector(PIPELINE_BENCH_FRAMES, PIPELINE_BENCH_SEED), engine)
+        loads = []
+        switcher = ModelSwitcher(
+            pipeline,
+            registry,
+            current=names[0],
+            compiled=args.compiled,
+            on_swapped=lambda name, load_s: loads.append((name, load_s)),
+        ).start()
+
+        frame = np.zeros(SWAP_BENCH_FRAME_SHAPE, dtype=np.uint8)
+        interval = 1.0 / args.fps
+        frame_s, gaps, loading_frames, swap_latency_s = [], [], [], []
+        requested_at = None
+        next_swap_at = started_at = time.perf_counter()
+        previous_started_at = None
+        swap_index = 0
+        while time.perf_counter() - started_at < args.duration:
+            now = time.perf_counter()
+            if now >= next_swap_at and requested_at is None:
+                swap_index += 1
+                requested_at = now
+                switcher.request(names[swap_index % len(names)])
+                next_swap_at = now + args.every
+
+            frame_started_at = time.perf_counter()
+            engine_before = pipeline.engine
+            pipeline.process(frame, frame_started_at)
+            frame_s.append(time.perf_counter() - frame_started_at)
+            loading_frames.append(requested_at is not None)
+            if previous_started_at is not None:
+                gaps.append(frame_started_at - previous_started_at)
+            previous_started_at = frame_started_at
+            if requested_at is not None and pipeline.engine is not engine_before:
+                swap_latency_s.append(frame_started_at - requested_at)
+                requested_at = None
+
+            delay = frame_started_at + interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        switcher.stop()
+
+    steady = [duration for duration, during_load in zip(frame_s, loading_frames) if not during_load]
+    loading = [duration for duration, during_load in zip(frame_s, loading_frames) if during_load]
+    late = sum(gap > 2 * interval for gap in gaps)
+    print(f"{len(frame_s)} frames at {args.fps} FPS, swapping every {args.every:.0f} s, engine {engine.mode}")
+    rows = [
+        ("swaps", str(len(swap_latency_s))),
+        ("request to first frame on new model p50", f"{_percentile_ms(swap_latency_s, 50):.0f} ms"),
+        ("request to first frame on new model max", f"{_percentile_ms(swap_latency_s, 100):.0f} ms"),
+    ]
+    for name in names:
+        load_times = [load_s for loaded, load_s in loads if loaded == name]
+        if load_times:
+            rows.append((f"background load + warm-up, {name}", f"{np.median(load_times) * 1000:.0f} ms"))
+    rows += [
+        ("frame time, steady p50/max", f"{_percentile_ms(steady, 50):.2f} / {_percentile_ms(steady, 100):.2f} ms"),
+        ("frame time, while loading p50/max", f"{_percentile_ms(loading, 50):.2f} / {_percentile_ms(loading, 100):.2f} ms"),
+        ("largest gap between frames", f"{_percentile_ms(gaps, 100):.1f} ms (interval {interval * 1000:.1f} ms)"),
+        ("frames more than one interval late", str(late)),
+    ]
+    _print_rows("Model swaps during capture:", rows)
+
+
+def dot_detector():
+    # Module level so spawned detection workers can unpickle it.
+    return LandmarkDotDetector()
+
+
+def _workers_detector_factory(name):
+    if name == "mediapipe":
+        from pipeline import create_hands_detector
+
+        return create_hands_detector
+    return dot_detector
+
+
+def _run_in_process(frames, args, engine):
+    from pipeline import FramePreprocessor, RecognitionPipeline
+
+    detector = _workers_detector_factory(args.detector)()
+    pipeline = RecognitionPipeline(detector, engine, preprocessor=FramePreprocessor(args.max_side))
+    pipeline.process(frames[0], time.perf_counter())
+    pipeline.reset()
+    texts, latencies = [], []
+    interval = 1.0 / args.fps if args.fps else 0.0
+    started_at = time.perf_counter()
+    for index in range(args.frames):
+        captured_at = time.perf_counter()
+        result = pipeline.process(frames[index % len(frames)], captured_at)
+        latencies.append(time.perf_counter() - captured_at)
+        texts.append(result.text)
+        delay = started_at + (index + 1) * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    detector.close()
+    return texts, latencies, time.perf_counter() - started_at
+
+
+def _run_with_workers(frames, args, engine, workers):
+    from pipeline import RecognitionPipeline
+    from workers import DetectionPool
+
+    pool = DetectionPool(
+        workers,
+        detector_factory=_workers_detector_factory(args.detector),
+        max_side=args.max_side,
+        warm_up_shape=frames[0].shape,
+    ).start()
+    pool.wait_ready()
+    pipeline = RecognitionPipeline(None, engine)
+    texts, latencies = [], []
+
+    def recognize():
+        for record, detected_at in pool.results():
+            result = pipeline.process_detected(record, detected_at)
+            latencies.append(time.perf_counter() - result.stamps[0])
+            texts.append(result.text)
+
+    recognizer = threading.Thread(target=recognize, daemon=True)
+    recognizer.start()
+    interval = 1.0 / args.fps if args.fps else 0.0
+    started_at = time.perf_counter()
+    try:
+        for index in range(args.frames):
+            pool.submit(frames[index % len(frames)], time.perf_counter())
+            delay = started_at + (index + 1) * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        pool.close()
+        recognizer.join()
+    return texts, latencies, time.perf_counter() - started_at
+
+
+def bench_workers(args):
+    from inference import ClassificationEngine
+
+    rng = np.random.default_rng(PIPELINE_BENCH_SEED)
+    size = (args.width, args.height)
+    frames = [render_landmark_dots(dot_hands(rng), size) for _index in range(WORKERS_BENCH_DISTINCT_FRAMES)]
+    engine = ClassificationEngine(build_stub_models(["random_forest"])["random_forest"], compiled=True)
+    counts = [int(count) for count in args.workers.split(",")]
+    pace = f"{args.fps} FPS" if args.fps else "as fast as possible"
+    print(
+        f"{args.frames} {args.width}x{args.height} frames {pace}, {args.detector} detector at {args.max_side}, "
+        f"{os.cpu_count()} CPUs"
+    )
+
+    reference = None
+    rows = []
+    for workers in counts:
+        if workers:
+            texts, latencies, elapsed = _run_with_workers(frames, args, engine, workers)
+        else:
+            texts, latencies, elapsed = _run_in_process(frames, args, engine)
+        if reference is None:
+            reference = texts
+        label = f"{workers} workers" if workers else "in-process"
+        rows.append(
+            (
+                label,
+                f"{len(texts) / elapsed:6.1f} FPS  latency p50 {_percentile_ms(latencies, 50):6.1f} ms"
+                f"  p95 {_percentile_ms(latencies, 95):6.1f} ms  same results in order: {'yes' if texts == reference else 'no'}",
+            )
+        )
+    _print_rows("Detection workers:", rows)
+
+
+def _run_frame_streams(count, threads, frames, engine, args):
+    from pipeline import DetectionScheduler, FramePreprocessor, RecognitionPipeline
+    from streams import CaptionStream, FrameSource, StreamScheduler
+
+    latencies = []
+    lock = threading.Lock()
+
+    def publish(_stream, result):
+        latency = time.perf_counter() - result.stamps[0]
+        with lock:
+            latencies.append(latency)
+
+    streams = []
+    for index in range(count):
+        pipeline = RecognitionPipeline(
+            LandmarkDotDetector(),
+            engine,
+            scheduler=DetectionScheduler(),
+            preprocessor=FramePreprocessor(args.max_side),
+        )
+        pipeline.process(frames[0], time.perf_counter())
+        pipeline.reset()
+        # Each camera starts at a different frame, like independent signers.
+        camera = PacedCamera(args.fps, itertools.cycle(frames[index:] + frames[:index]).__next__)
+        streams.append(CaptionStream(str(index + 1), FrameSource(camera), pipeline))
+    scheduler = StreamScheduler(streams, threads, publish).start()
+    time.sleep(args.duration)
+    scheduler.stop()
+    if scheduler.error is not None:
+        raise RuntimeError(scheduler.error)
+    grabbed = sum(stream.source.grabber.grabbed_frames for stream in streams)
+    dropped = sum(stream.source.grabber.dropped_frames for stream in streams)
+    per_stream_fps = [stream.frames / args.duration for stream in streams]
+    return sum(per_stream_fps), min(per_stream_fps), dropped / max(1, grabbed), latencies
+
+
+def _replay_parity(count, threads, folder):
+    # Every stream's captions, replayed side by side, against the same recording
+    # recognized on its own.
+    from inference import ClassificationEngine
+    from pipeline import DetectionScheduler, RecognitionPipeline
+    from recording import load_recording
+    from streams import CaptionStream, RecordingSource, StreamScheduler
+
+    recordings, engine = [], None
+    for index in range(count):
+        path = Path(folder) / f"stream_{index}.sflr"
+        if not path.exists():
+            synthetic_signing_session(path, STREAMS_BENCH_SIGNS, SCHEDULE_BENCH_SEED + index)
+        recordings.append(load_recording(path))
+    poses, _frames = synthetic_signing_session(Path(folder) / "poses.sflr", 1, SCHEDULE_BENCH_SEED)
+    engine = ClassificationEngine(pose_model(poses, SCHEDULE_BENCH_SEED), compiled=True)
+
+    expected = []
+    for records in recordings:
+        pipeline = RecognitionPipeline(None, engine, scheduler=DetectionScheduler())
+        labels = [pipeline.process_record(record).committed_label for record in records]
+        expected.append([label for label in labels if label])
+
+    committed = {str(index + 1): [] for index in range(count)}
+
+    def publish(stream, result):
+        if result.committed_label:
+            committed[stream.stream_id].append(result.committed_label)
+
+    streams = [
+        CaptionStream(str(index + 1), RecordingSource(records, 0), RecognitionPipeline(None, engine, scheduler=DetectionScheduler()))
+        for index, records in enumerate(recordings)
+    ]
+    scheduler = StreamScheduler(streams, threads, publish).start()
+    scheduler.wait()
+    scheduler.stop()
+    return sum(committed[str(index + 1)] == labels for index, labels in enumerate(expected))
+
+
+def bench_streams(args):
+    from inference import ClassificationEngine
+
+    rng = np.random.default_rng(PIPELINE_BENCH_SEED)
+    frames = [render_landmark_dots(dot_hands(rng), (args.width, args.height)) for _index in range(WORKERS_BENCH_DISTINCT_FRAMES)]
+    engine = ClassificationEngine(build_stub_models(["random_forest"])["random_forest"], compiled=True)
+    counts = [int(count) for count in args.streams.split(",")]
+    print(
+        f"{args.width}x{args.height} streams at {args.fps} FPS for {args.duration:.0f} s each, "
+        f"dots detector at {args.max_side}, {os.cpu_count()} CPUs"
+    )
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for count in counts:
+            threads = args.threads or min(count, os.cpu_count() or 1)
+            total_fps, slowest_fps, drop_rate, latencies = _run_frame_streams(count, threads, frames, engine, args)
+            matching = _replay_parity(count, threads, folder)
+            rows.append(
+                (
+                    f"{count} streams, {threads} threads",
+                    f"{total_fps:6.1f} FPS total  slowest stream {slowest_fps:5.1f} FPS  dropped {drop_rate * 100:4.1f}%"
+                    f"  latency p50 {_percentile_ms(latencies, 50):5.1f} ms p95 {_percentile_ms(latencies, 95):5.1f} ms"
+                    f"  replayed captions match {matching}/{count}",
+                )
+            )
+    _print_rows("Caption streams:", rows)
+
+
+def motion_sign_sequence(pose, motion, rng, frames):
+    # Landmarks of one signing: the pose held still, moved down and hooked like J, or
+    # traced in a zigzag like Z. The hand moves as a whole, so every single frame
+    # looks like the static sign.
+    u = np.linspace(0.0, 1.0, frames) * rng.uniform(0.85, 1.0)
+    if motion == "hook":
+        curl = np.clip((u - 0.6) / 0.4, 0.0, 1.0)
+        offsets = np.column_stack((-0.04 * (1.0 - np.cos(np.pi * curl)), 0.18 * np.minimum(u / 0.6, 1.0)))
+    elif motion == "zigzag":
+        corners = np.array([(0.0, 0.0), (0.15, 0.0), (0.0, 0.12), (0.15, 0.12)])
+        position = u * (len(corners) - 1)
+        index = np.minimum(position.astype(int), len(corners) - 2)
+        fraction = (position - index)[:, None]
+        offsets = corners[index] + (corners[index + 1] - corners[index]) * fraction
+    else:
+        offsets = np.zeros((frames, 2))
+    offsets = offsets * rng.uniform(0.8, 1.2) + rng.uniform(-0.05, 0.05, 2)
+    points = np.repeat(pose[None], frames, axis=0)
+    points[:, :, :2] += offsets[:, None, :]
+    points += rng.normal(0.0, 0.002, points.shape)
+    return points.astype(np.float32)
+
+
+def _motion_dataset(poses, sequences, seed, window_frames):
+    from features import FeatureWindow
+
+    rng = np.random.default_rng(seed)
+    extractor = HandFeatureExtractor()
+    per_frame, windowed, targets = [], [], []
+    for label, pose, motion in MOTION_BENCH_SIGNS:
+        for _sequence in range(sequences):
+            window = FeatureWindow(window_frames)
+            for index, points in enumerate(motion_sign_sequence(poses[pose], motion, rng, WINDOW_BENCH_SEQUENCE_FRAMES)):
+                features = extractor.extract_points(points[None], ["Right"])
+                vector = window.push(features, extractor.wrists, index / REPLAY_FPS)
+                if index >= window_frames - 1:
+                    per_frame.append(features[0].copy())
+                    windowed.append(vector[0].copy())
+                    targets.append(label)
+    return np.asarray(per_frame), np.asarray(windowed), targets
+
+
+def _window_from_scratch(rows, stamps):
+    # What FeatureWindow.push() returns, recomputed over the whole window.
+    from features import FEATURE_VECTOR_SIZE
+
+    rows = np.asarray(rows)
+    return np.concatenate(
+        (
+            rows[-1, :FEATURE_VECTOR_SIZE],
+            rows.mean(axis=0),
+            rows.std(axis=0),
+            (rows[-1] - rows[-2]) / (stamps[-1] - stamps[-2]),
+            (rows[-1] - rows[0]) / (stamps[-1] - stamps[0]),
+        )
+    )
+
+
+def bench_window(args):
+    from sklearn.ensemble import RandomForestClassifier
+
+    from features import FEATURE_VECTOR_SIZE, FEATURE_WINDOW_FRAMES, WRIST_CHANNELS, FeatureWindow
+    from inference import ClassificationEngine
+
+    rng = np.random.default_rng(WINDOW_BENCH_SEED)
+    poses = rng.random((2, HAND_LANDMARK_COUNT, 3)) * 0.3 + 0.3
+    train = _motion_dataset(poses, WINDOW_BENCH_SEQUENCES, WINDOW_BENCH_SEED, FEATURE_WINDOW_FRAMES)
+    test = _motion_dataset(poses, WINDOW_BENCH_SEQUENCES // 3, WINDOW_BENCH_SEED + 1, FEATURE_WINDOW_FRAMES)
+    engines, accuracies = {}, {}
+    for name, column in (("per-frame", 0), ("windowed", 1)):
+        model = RandomForestClassifier(n_estimators=100, random_state=WINDOW_BENCH_SEED).fit(train[column], train[2])
+        engines[name] = ClassificationEngine(model, compiled=True)
+        accuracies[name] = np.mean(model.predict(test[column]) == np.asarray(test[2]))
+
+    # Per-frame cost of extraction + (window) + classification on a continuous signing stream.
+    sequence = np.concatenate(
+        [motion_sign_sequence(poses[pose], motion, rng, WINDOW_BENCH_SEQUENCE_FRAMES) for _label, pose, motion in MOTION_BENCH_SIGNS]
+    )
+    inputs = [(sequence[index % len(sequence)], index / REPLAY_FPS) for index in range(args.frames)]
+    extractor = HandFeatureExtractor()
+    window = FeatureWindow()
+
+    def per_frame_path(item):
+        engines["per-frame"].classify(extractor.extract_points(item[0][None], ["Right"]))
+
+    def windowed_path(item):
+        features = extractor.extract_points(item[0][None], ["Right"])
+        engines["windowed"].classify(window.push(features, extractor.wrists, item[1]))
+
+    budget_ms = 1000.0 / args.fps
+    rows = []
+    for name, fn in (("per-frame", per_frame_path), ("windowed", windowed_path)):
+        fn(inputs[0])
+        frame_ms = _time_per_frame(fn, inputs) * 1000.0
+        rows.append(
+            (
+                f"{name} extract + classify",
+                f"{frame_ms * 1000:.0f} us/frame ({frame_ms / budget_ms * 100:.1f}% of {budget_ms:.1f} ms), "
+                f"motion-sign accuracy {accuracies[name] * 100:.0f}%",
+            )
+        )
+
+    features = [extractor.extract_points(points[None], ["Right"]).copy() for points, _stamp in inputs[:500]]
+    wrists = [extractor.wrists.copy() for _features in features]
+    for frames in [int(length) for length in args.lengths.split(",")]:
+        incremental = FeatureWindow(frames)
+        history = collections.deque(maxlen=frames)
+        stamps = collections.deque(maxlen=frames)
+
+        def push_incremental(index):
+            incremental.push(features[index], wrists[index], index / REPLAY_FPS)
+
+        def push_from_scratch(index):
+            history.append(np.concatenate((features[index][0], wrists[index])))
+            stamps.append(index / REPLAY_FPS)
+            if len(history) > 1:
+                _window_from_scratch(history, stamps)
+
+        indices = list(range(len(features)))
+        rows.append(
+            (
+                f"window of {frames}: incremental / from scratch",
+                f"{_time_per_frame(push_incremental, indices) * 1e6:.0f} / {_time_per_frame(push_from_scratch, indices) * 1e6:.0f} us/frame",
+            )
+        )
+
+    drift_rng = np.random.default_rng(WINDOW_BENCH_SEED)
+    drift = FeatureWindow()
+    history = collections.deque(maxlen=drift.frames)
+    stamps = collections.deque(maxlen=drift.frames)
+    worst = 0.0
+    for index in range(args.drift_frames):
+        # Large offsets with small changes are the worst case for running sums.
+        features = (100.0 + drift_rng.normal(0.0, 0.01, (1, FEATURE_VECTOR_SIZE))).astype(np.float32)
+        wrist = drift_rng.random(WRIST_CHANNELS).astype(np.float32)
+        vector = drift.push(features, wrist, index / REPLAY_FPS)
+        history.append(np.concatenate((features[0], wrist)).astype(np.float64))
+        stamps.append(index / REPLAY_FPS)
+        if index % 1000 == 999:
+            worst = max(worst, float(np.abs(vector[0] - _window_from_scratch(history, stamps)).max()))
+    rows.append((f"max difference from recomputing, {args.drift_frames} frames", f"{worst:.2e}"))
+
+    print(f"{args.frames} frames at {args.fps} FPS, window of {FEATURE_WINDOW_FRAMES} frames")
+    _print_rows("Temporal window:", rows)
+
+
+def labelled_signing_session(poses, signs, seed, fps, glitch_rate):
+    # In-memory records at `fps` of poses held for 0.4-1.2 s, each reached through
+    # hand movement or after an idle stretch, with glitch_rate of the held frames
+    # showing some other pose (a misread frame). The timeline comes from `seed` alone,
+    # so sessions at different frame rates hold the same signs for the same time.
+    # Returns the records and (label, onset, end) in seconds for every sign, where the
+    # onset is when the hand appears or starts moving toward the pose.
+    from recording import HANDEDNESS_RIGHT, RECORD_DTYPE
+
+    timeline = np.random.default_rng(seed)
+    noise = np.random.default_rng(seed + fps)
+    frames, holds = [], []
+    clock = 0.0
+
+    def emit(points, seconds):
+        nonlocal clock
+        count = max(1, int(round(seconds * fps)))
+        for index in range(count):
+            frames.append((clock + index / fps, points(index / count)))
+        clock += count / fps
+
+    previous = None
+    for _sign in range(signs):
+        index = int(timeline.integers(len(poses)))
+        while index == previous:
+            index = int(timeline.integers(len(poses)))
+        pose = poses[index]
+        if previous is None or timeline.random() < 0.3:
+            emit(lambda _step: None, timeline.uniform(0.5, 2.0))
+            onset = clock
+        else:
+            onset = clock
+            start_pose = poses[previous]
+            emit(lambda step: start_pose + (pose - start_pose) * step, timeline.uniform(0.15, 0.35))
+
+        def held(_step, pose=pose, index=index):
+            if noise.random() < glitch_rate:
+                other = poses[(index + 1 + noise.integers(len(poses) - 1)) % len(poses)]
+                return other + noise.normal(0.0, COMMIT_BENCH_JITTER, pose.shape)
+            return pose + noise.normal(0.0, COMMIT_BENCH_JITTER, pose.shape)
+
+        emit(held, timeline.uniform(0.4, 1.2))
+        holds.append((STUB_CLASSES[index], onset, clock))
+        previous = index
+
+    records = np.zeros(len(frames), dtype=RECORD_DTYPE)
+    for record, (captured_at, points) in zip(records, frames):
+        record["captured_at"] = captured_at
+        if points is not None:
+            record["landmarks"][0] = points
+            record["handedness"][0] = HANDEDNESS_RIGHT
+            record["hand_count"] = 1
+    return records, holds
+
+
+def _score_commits(commits, holds):
+    # A commit counts for a sign if it is the first of its label between the sign's
+    # onset and the next one; every other commit is false.
+    starts = [onset for _label, onset, _end in holds]
+    delays, credited, false = [], set(), 0
+    for captured_at, label in commits:
+        hold = int(np.searchsorted(starts, captured_at, side="right")) - 1
+        if hold < 0 or hold in credited or label != holds[hold][0]:
+            false += 1
+            continue
+        credited.add(hold)
+        delays.append(captured_at - holds[hold][1])
+    return delays, len(holds) - len(credited), false
+
+
+def repeated_sign_session(pose, fps, segments):
+    # Records at `fps` of one pose, given as (seconds, hands shown) segments.
+    from recording import HANDEDNESS_RIGHT, RECORD_DTYPE
+
+    shown = [hands for seconds, hands in segments for _frame in range(int(round(seconds * fps)))]
+    records = np.zeros(len(shown), dtype=RECORD_DTYPE)
+    for index, (record, hands) in enumerate(zip(records, shown)):
+        record["captured_at"] = index / fps
+        if hands:
+            record["landmarks"][0] = pose
+            record["handedness"][0] = HANDEDNESS_RIGHT
+            record["hand_count"] = 1
+    return records
+
+
+def _commit_pass(records, engine, committer, freeze_on_detection_loss=False):
+    from pipeline import RecognitionPipeline
+
+    counting = CountingCommitter(committer)
+    pipeline = RecognitionPipeline(None, engine, committer=counting)
+    pipeline.freeze_on_detection_loss = freeze_on_detection_loss
+    for record in records:
+        pipeline.process_record(record)
+    return [(float(records[frame]["captured_at"]), label) for frame, label in counting.commits]
+
+
+def bench_commit(args):
+    from pipeline import EvidenceCommitter, StableLabelCommitter
+
+    rng = np.random.default_rng(COMMIT_BENCH_SEED)
+    poses = rng.random((SCHEDULE_BENCH_POSES, HAND_LANDMARK_COUNT, 3)) * 0.3 + 0.35
+    engine = ClassificationEngine(pose_model(poses, COMMIT_BENCH_SEED), compiled=True)
+    committers = (("frame count", StableLabelCommitter), ("evidence", EvidenceCommitter))
+
+    print(
+        f"{args.signs} held signs, {args.glitch_rate:.0%} of held frames misread, "
+        f"time to commit from each sign's onset"
+    )
+    update_calls = None
+    for fps in [int(value) for value in args.fps.split(",")]:
+        records, holds = labelled_signing_session(poses, args.signs, COMMIT_BENCH_SEED, fps, args.glitch_rate)
+        rows, p50s = [], {}
+        for name, committer in committers:
+            delays, missed, false = _score_commits(_commit_pass(records, engine, committer()), holds)
+            p50s[name] = _percentile_ms(delays, 50)
+            rows.append(
+                (
+                    name,
+                    f"p50 {_percentile_ms(delays, 50):.0f} ms, p95 {_percentile_ms(delays, 95):.0f} ms, "
+                    f"{missed} missed, {false} false",
+                )
+            )
+        _print_rows(f"{fps} FPS ({len(records):,} frames):", rows)
+        if fps == REPLAY_FPS:
+            # The default committer must not caption slower than counting frames at the nominal rate.
+            _require(
+                p50s["evidence"] <= p50s["frame count"],
+                f"evidence commits at p50 {p50s['evidence']:.0f} ms vs {p50s['frame count']:.0f} ms at {fps} FPS",
+            )
+        if update_calls is None:
+            extractor = HandFeatureExtractor()
+            update_calls = []
+            for record in records[:2000]:
+                prediction = None
+                if record["hand_count"]:
+                    prediction = engine.classify(extractor.extract_points(record["landmarks"][:1], ["Right"]))
+                    prediction = prediction._replace(probabilities=prediction.probabilities.copy())
+                label = prediction.label if prediction is not None and prediction.probability > 0.7 else None
+                update_calls.append((label, prediction, float(record["captured_at"])))
+
+    rows = []
+    for name, committer in committers:
+        instance = committer()
+        rows.append((name, f"{_time_per_frame(lambda call: instance.update(*call), update_calls) * 1e6:.1f} us/frame"))
+    _print_rows(f"Committer update ({len(engine.labels)} labels):", rows)
+
+    # A double letter: the sign, the hands gone for longer than the repeat lock, the
+    # same sign again, then a dropout short enough to keep the lock.
+    segments = [(0.6, True), (0.4, False), (0.6, True), (0.08, False), (0.4, True)]
+    rows = []
+    for fps in [int(value) for value in args.fps.split(",")]:
+        records = repeated_sign_session(poses[0], fps, segments)
+        for name, committer in committers:
+            for freeze in (False, True):
+                labels = [label for _at, label in _commit_pass(records, engine, committer(), freeze)]
+                mode = "frozen" if freeze else "not frozen"
+                rows.append((f"{fps} FPS, {name}, {mode}", " ".join(labels) or "nothing"))
+                _require(
+                    labels == [STUB_CLASSES[0]] * 2,
+                    f"{name} at {fps} FPS ({mode} on detection loss) committed {labels}, expected the sign twice",
+                )
+    _print_rows("Repeated sign across a hand-loss gap:", rows)
+
+
+def _drag_slider(slider, values, tick_ms):
+    # Moves the slider one value per tick from an event loop, as a drag would, and
+    # returns how long each valueChanged handling took on the GUI thread. A local
+    # loop, because quitting the application would also stop the preferences store.
+    from PyQt5.QtCore import QEventLoop, QTimer
+
+    handler_s = []
+    remaining = list(values)
+    loop = QEventLoop()
+
+    def tick():
+        if not remaining:
+            timer.stop()
+            loop.quit()
+            return
+        start = time.perf_counter()
+        slider.setValue(remaining.pop(0))
+        handler_s.append(time.perf_counter() - start)
+
+    timer = QTimer()
+    timer.timeout.connect(tick)
+    timer.start(tick_ms)
+    loop.exec_()
+    return handler_s
+
+
+def bench_preferences(args):
+    import overlay
+
+    _app, window = _offscreen_overlay_window()
+    store = window.preferences_store
+    slider = window.secondary_panel.opacity_slider
+    low, high = overlay.MIN_OPACITY_PERCENT, overlay.MAX_OPACITY_PERCENT
+    values = [low + (index % (high - low)) for index in range(1, args.ticks + 1)]
+    if values[-1] == slider.value():
+        values.append(values[-1] - 1)
+    handler_s = _drag_slider(slider, values, args.tick_ms)
+    drag_end = time.monotonic()
+    writes_during_drag = store.writes
+    while not store.writes and time.monotonic() - drag_end < store.debounce_s + overlay.PREFERENCES_STOP_TIMEOUT_S:
+        time.sleep(0.005)
+    written_after_ms = (time.monotonic() - drag_end) * 1000.0
+    time.sleep(store.debounce_s)
+    saved = json.loads(store.path.read_text(encoding="utf-8"))
+
+    # What every tick used to cost: a synchronous rewrite on the GUI thread.
+    direct_path = store.path.with_name("direct.json")
+    sync_s = []
+    for value in values:
+        preferences = dict(window.preferences, opacity_percent=value)
+        start = time.perf_counter()
+        direct_path.write_text(json.dumps(overlay._sanitize_settings(preferences), indent=2), encoding="utf-8")
+        sync_s.append(time.perf_counter() - start)
+
+    store.stop()
+    window.close()
+    _print_rows(
+        f"Opacity slider dragged through {len(values)} values, one every {args.tick_ms} ms:",
+        [
+            ("file writes during the drag", str(writes_during_drag)),
+            ("file writes in total", f"{store.writes}, the first {written_after_ms:.0f} ms after the drag"),
+            ("saved opacity / final slider value", f"{saved['opacity_percent']} / {values[-1]}"),
+            ("GUI thread per tick, p50/max", f"{_percentile_ms(handler_s, 50):.3f} / {max(handler_s) * 1000:.3f} ms"),
+            ("synchronous write per tick, p50/max", f"{_percentile_ms(sync_s, 50):.3f} / {max(sync_s) * 1000:.3f} ms"),
+        ],
+    )
+
+
+def _next_caption_paint(window, timeout_s):
+    # Runs the event loop until the caption label paints and returns when it did
+    # (time.monotonic()), or None after timeout_s.
+    from PyQt5.QtCore import QEvent, QEventLoop, QObject, QTimer
+
+    painted = []
+    loop = QEventLoop()
+
+    class _Filter(QObject):
+        def eventFilter(self, _watched, event):
+            if event.type() == QEvent.Paint and not painted:
+                painted.append(time.monotonic())
+                QTimer.singleShot(0, loop.quit)
+            return False
+
+    label = window.primary_panel.caption_label
+    paint_filter = _Filter()
+    label.installEventFilter(paint_filter)
+    QTimer.singleShot(int(timeout_s * 1000), loop.quit)
+    loop.exec_()
+    label.removeEventFilter(paint_filter)
+    return painted[0] if painted else None
+
+
+def _overlay_cold_start(results):
+    # What a restart amounted to: a new interpreter imports PyQt5, builds every
+    # widget and icon, and only then paints a caption again. Captions arriving from
+    # the sender after its reconnect are not included.
+    _app, window = _offscreen_overlay_window()
+    window.set_caption_text(SETTINGS_BENCH_CAPTION)
+    window.show()
+    results.put(_next_caption_paint(window, SETTINGS_BENCH_TIMEOUT_S))
+
+
+def bench_settings(args):
+    import overlay
+
+    context = multiprocessing.get_context("spawn")
+    restart_s = []
+    for _run in range(args.runs):
+        results = context.Queue()
+        process = context.Process(target=_overlay_cold_start, args=(results,))
+        started_at = time.monotonic()
+        process.start()
+        painted_at = results.get(timeout=SETTINGS_BENCH_TIMEOUT_S)
+        process.join()
+        if painted_at is not None:
+            restart_s.append(painted_at - started_at)
+
+    _app, window = _offscreen_overlay_window()
+    window.set_caption_text(SETTINGS_BENCH_CAPTION)
+    window.show()
+    _next_caption_paint(window, SETTINGS_BENCH_REPAINT_TIMEOUT_S)
+    variant = dict(
+        overlay.DEFAULT_SETTINGS,
+        caption_box_size=overlay.PRIMARY_BOX_SIZE_MAX,
+        opacity_percent=overlay.MAX_OPACITY_PERCENT,
+        corner=overlay.CORNER_TOP_LEFT,
+    )
+    apply_s, repaint_s, kept = [], [], 0
+    for run in range(args.runs * 2):
+        preferences = variant if run % 2 == 0 else dict(overlay.DEFAULT_SETTINGS)
+        started_at = time.monotonic()
+        window.apply_preferences(preferences)
+        apply_s.append(time.monotonic() - started_at)
+        painted_at = _next_caption_paint(window, SETTINGS_BENCH_REPAINT_TIMEOUT_S)
+        if painted_at is not None:
+            repaint_s.append(painted_at - started_at)
+        kept += window.caption_text == SETTINGS_BENCH_CAPTION
+    # A change still waiting for the store's debounce, then Reload right away.
+    slider = window.secondary_panel.opacity_slider
+    changed = overlay.MIN_OPACITY_PERCENT if slider.value() != overlay.MIN_OPACITY_PERCENT else overlay.MAX_OPACITY_PERCENT
+    slider.setValue(changed)
+    window.on_reload_requested()
+    reloaded = round(window.overlay_opacity * 100)
+    window.preferences_store.stop()
+    window.close()
+
+    _print_rows(
+        "Caption blackout when settings change:",
+        [
+            ("restart: new process to first caption paint", f"p50 {_percentile_ms(restart_s, 50):.0f} ms, max {max(restart_s, default=0.0) * 1000:.0f} ms ({len(restart_s)}/{args.runs} runs)"),
+            ("in place: apply_preferences on the GUI thread", f"p50 {_percentile_ms(apply_s, 50):.2f} ms, max {max(apply_s) * 1000:.2f} ms"),
+            ("in place: next caption paint", f"p50 {_percentile_ms(repaint_s, 50):.2f} ms ({len(repaint_s)}/{len(apply_s)} applies repainted)"),
+            ("in place: caption kept", f"{kept}/{len(apply_s)}"),
+            ("reload right after a change: opacity", f"{reloaded} (changed to {changed})"),
+        ],
+    )
+    _require(reloaded == changed, f"reloading right after a change reverted opacity {changed} to {reloaded}")
+
+
+def _wait_for(app, condition, timeout_s):
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents()
+        time.sleep(0.001)
+    return True
+
+
+def bench_control(args):
+    from pipeline import RecognitionPipeline
+    from realtime_sender import Playback, handle_control
+    from registry import ModelSwitcher
+
+    app, window = _offscreen_overlay_window()
+    if not window.start_caption_server(CONTROL_BENCH_SERVER_NAME):
+        raise SystemExit(f"could not listen on {CONTROL_BENCH_SERVER_NAME}")
+
+    engine = ClassificationEngine(build_stub_models(["scaled_logistic"])["scaled_logistic"], compiled=True)
+    pipeline = RecognitionPipeline(StubHandDetector(PIPELINE_BENCH_FRAMES, PIPELINE_BENCH_SEED), engine)
+    # The overlay's model is reported as already loaded, without a registry to load from.
+    models = ModelSwitcher(pipeline, {}, current=window.model_selection).start()
+    captions = CaptionBuffer()
+    playback = Playback()
+    outbox = Outbox(
+        CONTROL_BENCH_SERVER_NAME,
+        on_message=lambda message: handle_control(
+            pipeline,
+            playback,
+            models,
+            lambda _stream=None: outbox.post_caption_delta(captions.clear()),
+            outbox.post_control_ack,
+            message,
+        ),
+    ).start()
+
+    # Overlay side: round trip from sending a command to handling its ack.
+    acks = []
+    on_control_ack = window._on_control_ack
+
+    def timed_ack(ack):
+        sent = window.controls_in_flight.get(ack.get("id"))
+        if sent is not None:
+            acks.append((sent[0], time.perf_counter() - sent[1], ack.get("applied_ms", 0.0) / 1000.0, ack.get("ok")))
+        on_control_ack(ack)
+
+    window._on_control_ack = timed_ack
+
+    interval = 1.0 / args.fps
+    frame_gaps = []
+    running = threading.Event()
+    running.set()
+
+    def frame_loop():
+        frame = np.zeros(SWAP_BENCH_FRAME_SHAPE, dtype=np.uint8)
+        previous_started_at = None
+        while running.is_set():
+            if not playback.wait(CONTROL_BENCH_PAUSE_POLL_S):
+                previous_started_at = None
+                continue
+            started_at = time.perf_counter()
+            pipeline.process(frame, started_at)
+            if previous_started_at is not None:
+                frame_gaps.append(started_at - previous_started_at)
+            previous_started_at = started_at
+            delay = started_at + interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    frames = threading.Thread(target=frame_loop, name="signflow-bench-frames", daemon=True)
+    frames.start()
+    outbox.post_caption_delta(captions.keyframe())
+    # The commands a connecting sender is brought up to date with come first.
+    if not _wait_for(app, lambda: acks and not window.controls_in_flight, CONTROL_BENCH_TIMEOUT_S):
+        raise SystemExit("the sender did not connect and acknowledge")
+    acks.clear()
+    frame_gaps.clear()
+
+    rng = np.random.default_rng(PIPELINE_BENCH_SEED)
+    cleared = freeze_seen = 0
+    commands_started_at = time.monotonic()
+    for index in range(args.commands):
+        if index % 2 == 0:
+            freeze = index % 4 == 0
+            window.on_freeze_on_loss_toggled(freeze)
+            _wait_for(app, lambda: not window.controls_in_flight, CONTROL_BENCH_TIMEOUT_S)
+            freeze_seen += pipeline.freeze_on_detection_loss == freeze
+        else:
+            outbox.post_caption_delta(captions.append(CONTROL_BENCH_CAPTION))
+            _wait_for(app, lambda: window._caption_lanes_text(), CONTROL_BENCH_TIMEOUT_S)
+            window.on_clear_clicked()
+            _wait_for(app, lambda: not window.controls_in_flight, CONTROL_BENCH_TIMEOUT_S)
+            cleared += window._caption_lanes_text() == "" and not captions.visible
+        # Jittered, so commands do not arrive at the same point of every frame interval.
+        _wait_for(app, lambda: False, args.every + rng.uniform(0.0, interval))
+    commands_s = time.monotonic() - commands_started_at
+
+    # Paused, nothing is recognized, yet settings and Clear still take effect.
+    commands_acks = len(acks)
+    window.on_play_pause_toggled(False)
+    _wait_for(app, lambda: not window.controls_in_flight, CONTROL_BENCH_TIMEOUT_S)
+    paused_acks = len(acks)
+    freeze = not pipeline.freeze_on_detection_loss
+    window.on_freeze_on_loss_toggled(freeze)
+    outbox.post_caption_delta(captions.append(CONTROL_BENCH_CAPTION))
+    _wait_for(app, lambda: window._caption_lanes_text(), CONTROL_BENCH_TIMEOUT_S)
+    window.on_clear_clicked()
+    _wait_for(app, lambda: not window.controls_in_flight, CONTROL_BENCH_TIMEOUT_S)
+    paused = acks[paused_acks:]
+    paused_ok = (
+        [(name, ok) for name, _round_trip, _applied, ok in paused] == [(CONTROL_SETTINGS, True), (CONTROL_CLEAR, True)]
+        and pipeline.freeze_on_detection_loss == freeze
+        and window._caption_lanes_text() == ""
+    )
+    del acks[commands_acks:]
+    window.on_play_pause_toggled(True)
+    _wait_for(app, lambda: not window.controls_in_flight, CONTROL_BENCH_TIMEOUT_S)
+    running.clear()
+    frames.join()
+    outbox.stop()
+    models.stop()
+    app.processEvents()
+    window.caption_server.close()
+    window.preferences_store.stop()
+    window.close()
+
+    rows = []
+    for command, sent in ((CONTROL_SETTINGS, (args.commands + 1) // 2), (CONTROL_CLEAR, args.commands // 2)):
+        round_trips = [round_trip for name, round_trip, _applied, _ok in acks if name == command]
+        applied = [applied for name, _round_trip, applied, _ok in acks if name == command]
+        ok = sum(ok is True for name, _round_trip, _applied, ok in acks if name == command)
+        rows += [
+            (f"{command}: acknowledged", f"{len(round_trips)}/{sent}, {ok} ok"),
+            (f"{command}: round trip p50/p95/max", f"{_percentile_ms(round_trips, 50):.1f} / {_percentile_ms(round_trips, 95):.1f} / {_percentile_ms(round_trips, 100):.1f} ms"),
+            (f"{command}: waiting for a frame boundary p50/max", f"{_percentile_ms(applied, 50):.1f} / {_percentile_ms(applied, 100):.1f} ms"),
+        ]
+    late = sum(gap > 2 * interval for gap in frame_gaps)
+    rows += [
+        ("setting in effect when acknowledged", f"{freeze_seen}/{(args.commands + 1) // 2}"),
+        ("captions cleared when acknowledged", f"{cleared}/{args.commands // 2}"),
+        ("settings and clear while paused", "acknowledged and in effect" if paused_ok else "NOT applied"),
+        ("round trip while paused", ", ".join(f"{name} {round_trip * 1000:.1f} ms" for name, round_trip, _applied, _ok in paused)),
+        ("frames recognized meanwhile", f"{len(frame_gaps) + 1} in {commands_s:.1f} s"),
+        ("largest gap between frames", f"{_percentile_ms(frame_gaps, 100):.1f} ms (interval {interval * 1000:.1f} ms)"),
+        ("frames more than one interval late", str(late)),
+    ]
+    print(f"{args.commands} commands from the overlay, one every {args.every * 1000:.0f} ms, frames at {args.fps} FPS")
+    _print_rows("Overlay to sender control channel:", rows)
+    _require(freeze_seen == (args.commands + 1) // 2, "a setting was not in effect when it was acknowledged")
+    _require(cleared == args.commands // 2, "captions were not cleared when Clear was acknowledged")
+    _require(paused_ok, "settings or Clear sent while paused were not applied and acknowledged")
+
+
+def bench_ipc(args):
+    _print_rows("Connect per caption (newline-delimited):", _run_ipc_throughput(False, args.messages))
+    _print_rows("Persistent framed connection:", _run_ipc_throughput(True, args.messages))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SignFlow performance benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    grabber = subparsers.add_parser("grabber", help="glass-to-caption latency with and without the frame grabber")
+    grabber.add_argument("--video", help="replay frames from this video file instead of blank frames")
+    grabber.add_argument("--fps", type=int, default=REPLAY_FPS)
+    grabber.add_argument("--buffer-depth", type=int, default=REPLAY_DRIVER_BUFFER_DEPTH)
+    grabber.add_argument("--duration", type=float, default=REPLAY_DURATION_S)
+    grabber.add_argument("--work-ms", type=float, default=REPLAY_WORK_MS)
+    grabber.set_defaults(func=bench_grabber)
+
+    features = subparsers.add_parser("features", help="per-frame cost of landmark feature extraction")
+    features.add_argument("--frames", type=int, default=FEATURE_BENCH_FRAMES)
+    features.set_defaults(func=bench_features)
+
+    inference = subparsers.add_parser("inference", help="single-pass and compiled classification latency")
+    inference.add_argument("--model", help="joblib model to benchmark instead of the synthetic stub models")
+    inference.add_argument("--calls", type=int, default=INFERENCE_BENCH_CALLS)
+    inference.set_defaults(func=bench_inference)
+
+    ipc = subparsers.add_parser("ipc", help="messages per second over the overlay's local socket")
+    ipc.add_argument("--messages", type=int, default=IPC_BENCH_MESSAGES)
+    ipc.set_defaults(func=bench_ipc)
+
+    outbox = subparsers.add_parser("outbox", help="frame loop timing while the overlay freezes and dies")
+    outbox.add_argument("--phase-seconds", type=float, default=OUTBOX_BENCH_PHASE_S)
+    outbox.add_argument("--fps", type=int, default=REPLAY_FPS)
+    outbox.add_argument("--work-ms", type=float, default=10.0)
+    outbox.add_argument("--caption-bytes", type=int, default=OUTBOX_BENCH_CAPTION_BYTES)
+    outbox.set_defaults(func=bench_outbox)
+
+    overlay_ipc = subparsers.add_parser("overlay-ipc", help="headless caption flood into the overlay's IPC server")
+    overlay_ipc.add_argument("--framed", type=int, default=OVERLAY_BENCH_FRAMED_UPDATES)
+    overlay_ipc.add_argument("--lines", type=int, default=OVERLAY_BENCH_LINE_UPDATES)
+    overlay_ipc.set_defaults(func=bench_overlay_ipc)
+
+    overlay_layout = subparsers.add_parser("overlay-layout", help="headless caption updates per second with long captions")
+    overlay_layout.add_argument("--updates", type=int, default=LAYOUT_BENCH_UPDATES)
+    overlay_layout.add_argument("--caption-chars", type=int, default=LAYOUT_BENCH_CAPTION_CHARS)
+    overlay_layout.set_defaults(func=bench_overlay_layout)
+
+    captions = subparsers.add_parser("captions", help="per-commit caption cost as a session grows")
+    captions.add_argument("--checkpoints", type=int, nargs="+", default=list(CAPTION_BENCH_CHECKPOINTS))
+    captions.add_argument("--window", type=int, default=CAPTION_BENCH_WINDOW)
+    captions.set_defaults(func=bench_captions)
+
+    latency = subparsers.add_parser("latency", help="cost of recording per-stage caption latency")
+    latency.add_argument("--samples", type=int, default=LATENCY_BENCH_SAMPLES)
+    latency.set_defaults(func=bench_latency)
+
+    pipeline = subparsers.add_parser("pipeline", help="end-to-end recognition throughput without a camera")
+    source = pipeline.add_mutually_exclusive_group()
+    source.add_argument("--video", help="run frames from this video file")
+    source.add_argument("--images", help="run every image in this folder")
+    pipeline.add_argument("--frames", type=int, default=PIPELINE_BENCH_FRAMES)
+    pipeline.add_argument("--detector", choices=("stub", "mediapipe"), default="stub")
+    pipeline.add_argument("--model", help="joblib model to run instead of a synthetic stub model")
+    pipeline.add_argument("--stub-model", choices=("random_forest", "scaled_logistic", "mlp"), default="random_forest")
+    pipeline.add_argument("--compiled", action="store_true", help="use the compiled NumPy classifier")
+    pipeline.add_argument("--json", help="also write the report to this JSON file")
+    pipeline.set_defaults(func=bench_pipeline)
+
+    roi = subparsers.add_parser("roi", help="detection time with and without hand region-of-interest cropping")
+    roi_source = roi.add_mutually_exclusive_group()
+    roi_source.add_argument("--video", help="run frames from this video file (use with --detector mediapipe)")
+    roi_source.add_argument("--images", help="run every image in this folder (use with --detector mediapipe)")
+    roi.add_argument("--frames", type=int, default=ROI_BENCH_FRAMES)
+    roi.add_argument("--detector", choices=("stub", "mediapipe"), default="mediapipe")
+    roi.add_argument("--model", help="joblib model to run instead of a synthetic stub model")
+    roi.add_argument("--stub-model", choices=("random_forest", "scaled_logistic", "mlp"), default="scaled_logistic")
+    roi.set_defaults(func=bench_roi)
+
+    schedule = subparsers.add_parser("schedule", help="adaptive detection scheduling on a recorded session")
+    schedule.add_argument("--recording", help="use this recording instead of a synthetic signing session")
+    schedule.add_argument("--signs", type=int, default=SCHEDULE_BENCH_SIGNS)
+    schedule.add_argument("--model", help="joblib model to run (needed with --recording)")
+    schedule.add_argument("--stub-model", choices=("random_forest", "scaled_logistic", "mlp"), default="random_forest")
+    schedule.add_argument("--compiled", action="store_true", help="use the compiled NumPy classifier")
+    schedule.add_argument("--detect-ms", type=float, default=SCHEDULE_BENCH_DETECT_MS)
+    schedule.set_defaults(func=bench_schedule)
+
+    replay = subparsers.add_parser("replay", help="record synthetic landmarks and replay them without a camera")
+    replay.add_argument("--recording", help="replay this recording instead of a synthetic one")
+    replay.add_argument("--frames", type=int, default=REPLAY_BENCH_FRAMES)
+    replay.add_argument("--model", help="joblib model to run instead of a synthetic stub model")
+    replay.add_argument("--stub-model", choices=("random_forest", "scaled_logistic", "mlp"), default="random_forest")
+    replay.add_argument("--compiled", action="store_true", help="use the compiled NumPy classifier")
+    replay.set_defaults(func=bench_replay)
+
+    pause = subparsers.add_parser("pause", help="idle CPU while paused and time to the first caption after resuming")
+    pause.add_argument("--camera", type=int, help="pause and resume this camera instead of a synthetic one")
+    pause.add_argument("--fps", type=int, default=REPLAY_FPS)
+    pause.add_argument("--phase", type=float, default=PAUSE_BENCH_PHASE_S, help="seconds to sample CPU in each state")
+    pause.add_argument("--resumes", type=int, default=PAUSE_BENCH_RESUMES)
+    pause.add_argument("--detect-ms", type=float, default=SCHEDULE_BENCH_DETECT_MS)
+    pause.add_argument("--compiled", action="store_true", help="use the compiled NumPy classifier")
+    pause.set_defaults(func=bench_pause)
+
+    preprocess = subparsers.add_parser("preprocess", help="per-frame preprocessing cost and feature parity with flipped frames")
+    preprocess.add_argument("--width", type=int, default=PREPROCESS_BENCH_SIZE[0])
+    preprocess.add_argument("--height", type=int, default=PREPROCESS_BENCH_SIZE[1])
+    preprocess.add_argument("--max-side", type=int, default=PREPROCESS_BENCH_MAX_SIDE)
+    preprocess.add_argument("--frames", type=int, default=PREPROCESS_BENCH_FRAMES)
+    preprocess.add_argument("--parity-frames", type=int, default=PREPROCESS_PARITY_FRAMES)
+    preprocess.set_defaults(func=bench_preprocess)
+
+    startup = subparsers.add_parser("startup", help="sender startup time and first-frame latency, cold")
+    startup.add_argument("--model", help="joblib model to load instead of a synthetic stub model")
+    startup.add_argument("--stub-model", choices=("random_forest", "scaled_logistic", "mlp"), default="random_forest")
+    startup_camera = startup.add_mutually_exclusive_group()
+    startup_camera.add_argument("--camera", type=int, help="also open this camera")
+    startup_camera.add_argument(
+        "--emulate-camera-open-ms",
+        type=float,
+        help="also open a synthetic camera whose driver takes this long to open",
+    )
+    startup.add_argument("--runs", type=int, default=STARTUP_BENCH_RUNS)
+    startup.set_defaults(func=bench_startup)
+
+    swap = subparsers.add_parser("swap", help="background model swaps while frames keep flowing")
+    swap.add_argument("--fps", type=int, default=REPLAY_FPS)
+    swap.add_argument("--duration", type=float, default=SWAP_BENCH_DURATION_S)
+    swap.add_argument("--every", type=float, default=SWAP_BENCH_EVERY_S, help="seconds between swap requests")
+    swap.add_argument("--compiled", action="store_true", help="use the compiled NumPy classifier")
+    swap.set_defaults(func=bench_swap)
+
+    workers = subparsers.add_parser("workers", help="throughput and latency as detection moves into worker processes")
+    workers.add_argument("--workers", default=WORKERS_BENCH_COUNTS, help="comma-separated worker counts; 0 is in-process")
+    workers.add_argument("--frames", type=int, default=WORKERS_BENCH_FRAMES)
+    workers.add_argument("--fps", type=int, default=0, help="pace frames like a camera; 0 submits as fast as possible")
+    workers.add_argument("--width", type=int, default=WORKERS_BENCH_SIZE[0])
+    workers.add_argument("--height", type=int, default=WORKERS_BENCH_SIZE[1])
+    workers.add_argument("--max-side", type=int, default=PREPROCESS_BENCH_MAX_SIDE)
+    workers.add_argument("--detector", choices=("dots", "mediapipe"), default="dots")
+    workers.set_defaults(func=bench_workers)
+
+    streams = subparsers.add_parser("streams", help="several caption streams recognized on a shared thread pool")
+    streams.add_argument("--streams", default=STREAMS_BENCH_COUNTS, help="comma-separated stream counts")
+    streams.add_argument("--threads", type=int, default=0, help="pool threads; 0 uses one per stream up to the CPU count")
+    streams.add_argument("--fps", type=int, default=REPLAY_FPS)
+    streams.add_argument("--duration", type=float, default=STREAMS_BENCH_DURATION_S)
+    streams.add_argument("--width", type=int, default=STREAMS_BENCH_SIZE[0])
+    streams.add_argument("--height", type=int, default=STREAMS_BENCH_SIZE[1])
+    streams.add_argument("--max-side", type=int, default=PREPROCESS_BENCH_MAX_SIDE)
+    streams.set_defaults(func=bench_streams)
+
+    window = subparsers.add_parser("window", help="windowed (motion) features against the per-frame budget")
+    window.add_argument("--frames", type=int, default=WINDOW_BENCH_FRAMES)
+    window.add_argument("--fps", type=int, default=REPLAY_FPS)
+    window.add_argument("--lengths", default=WINDOW_BENCH_LENGTHS, help="comma-separated window lengths to time")
+    window.add_argument("--drift-frames", type=int, default=WINDOW_BENCH_DRIFT_FRAMES)
+    window.set_defaults(func=bench_window)
+
+    commit = subparsers.add_parser("commit", help="time to commit and false commits, frame count against evidence")
+    commit.add_argument("--signs", type=int, default=COMMIT_BENCH_SIGNS)
+    commit.add_argument("--fps", default=COMMIT_BENCH_FPS, help="comma-separated frame rates to replay at")
+    commit.add_argument("--glitch-rate", type=float, default=COMMIT_BENCH_GLITCH_RATE)
+    commit.set_defaults(func=bench_commit)
+
+    preferences = subparsers.add_parser("preferences", help="disk writes and GUI-thread cost while dragging a settings slider")
+    preferences.add_argument("--ticks", type=int, default=PREFERENCES_BENCH_TICKS)
+    preferences.add_argument("--tick-ms", type=int, default=PREFERENCES_BENCH_TICK_MS)
+    preferences.set_defaults(func=bench_preferences)
+
+    settings = subparsers.add_parser("settings", help="caption blackout for a restart against applying settings in place")
+    settings.add_argument("--runs", type=int, default=SETTINGS_BENCH_RUNS)
+    settings.set_defaults(func=bench_settings)
+
+    control = subparsers.add_parser("control", help="round trip of overlay settings and clear commands while frames keep flowing")
+    control.add_argument("--commands", type=int, default=CONTROL_BENCH_COMMANDS)
+    control.add_argument("--every", type=float, default=CONTROL_BENCH_EVERY_S, help="seconds between commands")
+    control.add_argument("--fps", type=int, default=REPLAY_FPS)
+    control.set_defaults(func=bench_control)
+
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
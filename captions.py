@@ -0,0 +1,109 @@
+import collections
+import secrets
+import threading
+
+CAPTION_SEGMENT_CAPACITY = 512
+CAPTION_VISIBLE_CHARS = 160
+CAPTION_KEYFRAME_INTERVAL = 20
+
+OP_APPEND = "append"
+OP_REPLACE = "replace"
+
+
+class CaptionBuffer:
+    # Committed segments live in a bounded ring buffer (the scrollback); only the
+    # last visible_chars characters are shown. Changes travel as deltas: "append"
+    # carries one segment, "replace" carries the whole visible window and doubles
+    # as a keyframe that resynchronizes a receiver that missed deltas. Every buffer
+    # stamps its deltas with a random session, so a receiver can tell a restarted
+    # sender (counting revisions from 0 again) from stale deltas of the current one.
+    def __init__(
+        self,
+        capacity=CAPTION_SEGMENT_CAPACITY,
+        visible_chars=CAPTION_VISIBLE_CHARS,
+        keyframe_interval=CAPTION_KEYFRAME_INTERVAL,
+    ):
+        self.segments = collections.deque(maxlen=capacity)
+        self.visible_chars = visible_chars
+        self.keyframe_interval = keyframe_interval
+        self.session = secrets.token_hex(4)
+        self.revision = 0
+        self.visible = ""
+        self.in_sync = True
+        self._appends_since_keyframe = 0
+        self._lock = threading.Lock()
+
+    def _push(self, segment):
+        self.segments.append(segment)
+        self.visible = (self.visible + segment)[-self.visible_chars:]
+
+    def _replace_delta(self):
+        self._appends_since_keyframe = 0
+        return {"op": OP_REPLACE, "session": self.session, "rev": self.revision, "text": self.visible}
+
+    def append(self, segment):
+        with self._lock:
+            self._push(segment)
+            self.revision += 1
+            self._appends_since_keyframe += 1
+            if self._appends_since_keyframe >= self.keyframe_interval:
+                return self._replace_delta()
+            return {"op": OP_APPEND, "session": self.session, "rev": self.revision, "text": segment}
+
+    def replace(self, text):
+        with self._lock:
+            self.segments.clear()
+            self.visible = ""
+            if text:
+                self._push(text)
+            self.revision += 1
+            return self._replace_delta()
+
+    def clear(self):
+        return self.replace("")
+
+    def keyframe(self):
+        with self._lock:
+            return self._replace_delta()
+
+    def apply(self, delta):
+        # Receiver side. Returns True when the visible text may have changed.
+        if not isinstance(delta, dict) or not isinstance(delta.get("rev"), int):
+            return False
+        text = str(delta.get("text", ""))
+        with self._lock:
+            if delta.get("session") != self.session:
+                # A new sender: nothing shown so far belongs to it.
+                self.session = delta.get("session")
+                self.segments.clear()
+                self.visible = ""
+                self.revision = 0
+                self.in_sync = True
+            if delta.get("op") == OP_REPLACE:
+                # A keyframe older than what this sender already showed (e.g. queued before a reconnect) is stale.
+                if self.in_sync and delta["rev"] < self.revision:
+                    return False
+                # A keyframe that matches what we already show keeps the scrollback.
+                if not (self.in_sync and text == self.visible):
+                    self.segments.clear()
+                    self.visible = ""
+                    if text:
+                        self._push(text)
+                self.revision = delta["rev"]
+                self.in_sync = True
+                return True
+            if delta.get("op") == OP_APPEND:
+                # Appends already folded into a keyframe (e.g. queued before a reconnect) are stale.
+                if self.in_sync and delta["rev"] <= self.revision:
+                    return False
+                if not self.in_sync or delta["rev"] != self.revision + 1:
+                    self.in_sync = False
+                    return False
+                self._push(text)
+                self.revision = delta["rev"]
+                return True
+        return False
+
+    def scrollback(self):
+        with self._lock:
+            return "".join(self.segments)
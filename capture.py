@@ -0,0 +1,289 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+CAMERA_SETTINGS_PATH = Path(__file__).resolve().parent / "camera_settings.json"
+
+# Backend names accepted in the settings, mapped to OpenCV's VideoCaptureAPIs names.
+CAMERA_BACKENDS = {
+    "auto": "CAP_ANY",
+    "dshow": "CAP_DSHOW",
+    "msmf": "CAP_MSMF",
+    "v4l2": "CAP_V4L2",
+    "avfoundation": "CAP_AVFOUNDATION",
+    "gstreamer": "CAP_GSTREAMER",
+}
+CAMERA_FOURCCS = ("auto", "MJPG", "YUYV")
+MAX_CAMERA_INDEX = 63
+MAX_CAMERA_SIDE = 7680
+MAX_CAMERA_FPS = 240
+MAX_CAMERA_BUFFER_SIZE = 16
+
+# 0 and "auto" keep whatever the driver picks.
+DEFAULT_CAMERA_SETTINGS = {
+    "camera_index": 0,
+    "backend": "auto",
+    "fourcc": "auto",
+    "width": 0,
+    "height": 0,
+    "fps": 0,
+    "buffer_size": 0,
+}
+
+# Probing: frames read before measuring, how long delivered FPS is measured, and how
+# long the reader stalls before counting the frames that were queued meanwhile.
+PROBE_WARMUP_S = 1.0
+PROBE_MEASURE_S = 2.0
+PROBE_STALL_S = 0.2
+PROBE_STALLS = 3
+# A grab() returning within this fraction of the frame interval was served from a queue.
+PROBE_QUEUED_FRACTION = 0.3
+PROBE_FOURCCS = ("MJPG", "YUYV")
+PROBE_BUFFER_SIZES = (0, 1)
+
+
+class LatestFrameGrabber:
+    # on_ready, if given, is called from the grabber thread whenever read() has
+    # something new to return: a frame, or the end of the stream.
+    def __init__(self, cap, clock=time.perf_counter, on_ready=None):
+        self.cap = cap
+        self.clock = clock
+        self.on_ready = on_ready
+        self.grabbed_frames = 0
+        self.dropped_frames = 0
+        self.paused_grabs = 0
+        self.pauses = 0
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._captured_at = 0.0
+        self._frame_id = 0
+        self._consumed_id = 0
+        self._ended = False
+        self._paused = False
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="signflow-frame-grabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @property
+    def ended(self):
+        return self._ended
+
+    def pause(self):
+        # The camera stays open and streaming: the thread keeps calling grab(), which
+        # drains the driver queue without decoding, so resume() delivers a fresh frame.
+        with self._cond:
+            if self._paused:
+                return
+            self._paused = True
+            self.pauses += 1
+            self._frame = None
+            self._consumed_id = self._frame_id
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def _end(self):
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def _run(self):
+        while self._running:
+            if self._paused:
+                if not self.cap.grab():
+                    self._end()
+                    return
+                self.paused_grabs += 1
+                continue
+            ret, frame = self.cap.read()
+            captured_at = self.clock()
+            if not ret:
+                self._end()
+                return
+            with self._cond:
+                if self._paused:
+                    continue
+                # Only one slot: an unconsumed frame is overwritten by the newer one.
+                if self._frame_id > self._consumed_id:
+                    self.dropped_frames += 1
+                self._frame = frame
+                self._captured_at = captured_at
+                self._frame_id += 1
+                self.grabbed_frames += 1
+                self._cond.notify_all()
+            if self.on_ready is not None:
+                self.on_ready()
+
+    def read(self, timeout=None):
+        with self._cond:
+            has_new_frame = self._cond.wait_for(lambda: self._frame_id > self._consumed_id or self._ended, timeout)
+            if not has_new_frame or self._frame_id == self._consumed_id:
+                return False, None, 0.0
+            frame = self._frame
+            self._frame = None
+            self._consumed_id = self._frame_id
+            return True, frame, self._captured_at
+
+
+def _clamp_int(value, low, high, fallback):
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        return fallback
+    return max(low, min(high, parsed))
+
+
+def sanitize_camera_settings(raw):
+    source = raw if isinstance(raw, dict) else {}
+    defaults = DEFAULT_CAMERA_SETTINGS
+    return {
+        "camera_index": _clamp_int(source.get("camera_index"), 0, MAX_CAMERA_INDEX, defaults["camera_index"]),
+        "backend": source.get("backend") if source.get("backend") in CAMERA_BACKENDS else defaults["backend"],
+        "fourcc": source.get("fourcc") if source.get("fourcc") in CAMERA_FOURCCS else defaults["fourcc"],
+        "width": _clamp_int(source.get("width"), 0, MAX_CAMERA_SIDE, defaults["width"]),
+        "height": _clamp_int(source.get("height"), 0, MAX_CAMERA_SIDE, defaults["height"]),
+        "fps": _clamp_int(source.get("fps"), 0, MAX_CAMERA_FPS, defaults["fps"]),
+        "buffer_size": _clamp_int(source.get("buffer_size"), 0, MAX_CAMERA_BUFFER_SIZE, defaults["buffer_size"]),
+    }
+
+
+def load_camera_settings(path=CAMERA_SETTINGS_PATH):
+    path = Path(path)
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        raw = None
+    return sanitize_camera_settings(raw)
+
+
+def save_camera_settings(settings, path=CAMERA_SETTINGS_PATH):
+    Path(path).write_text(json.dumps(sanitize_camera_settings(settings), indent=2), encoding="utf-8")
+
+
+def open_camera(settings):
+    import cv2
+
+    cap = cv2.VideoCapture(settings["camera_index"], getattr(cv2, CAMERA_BACKENDS[settings["backend"]]))
+    if not cap.isOpened():
+        return cap
+    # FOURCC goes first: many webcams only offer their higher resolutions and frame
+    # rates once MJPG is selected.
+    if settings["fourcc"] != "auto":
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*settings["fourcc"]))
+    if settings["width"] and settings["height"]:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings["width"])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings["height"])
+    if settings["fps"]:
+        cap.set(cv2.CAP_PROP_FPS, settings["fps"])
+    if settings["buffer_size"]:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, settings["buffer_size"])
+    return cap
+
+
+def camera_mode(cap):
+    # What the driver actually agreed to; backends silently ignore settings they do not support.
+    import cv2
+
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    fourcc = "".join(chr((code >> shift) & 0xFF) for shift in (0, 8, 16, 24)).strip("\0 ")
+    return {
+        "backend": cap.getBackendName(),
+        "fourcc": fourcc or "?",
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "buffer_size": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+
+def probe_camera(settings, measure_s=PROBE_MEASURE_S, clock=time.perf_counter):
+    # Opens the camera with `settings` and measures what it delivers. Frame age is
+    # how many frame intervals behind live the first frame read after a stall is,
+    # i.e. the latency a busy frame loop pays for driver-side buffering. Returns
+    # None when the camera cannot be opened or does not deliver frames.
+    cap = open_camera(settings)
+    try:
+        if not cap.isOpened():
+            return None
+        mode = camera_mode(cap)
+        deadline = clock() + PROBE_WARMUP_S
+        while clock() < deadline:
+            if not cap.grab():
+                return None
+
+        frames = 0
+        started_at = clock()
+        while clock() - started_at < measure_s and cap.read()[0]:
+            frames += 1
+        if frames < 2:
+            return None
+        delivered_fps = frames / (clock() - started_at)
+        interval = 1.0 / delivered_fps
+
+        queued = 0
+        for _stall in range(PROBE_STALLS):
+            time.sleep(PROBE_STALL_S)
+            while True:
+                grab_started_at = clock()
+                if not cap.grab() or clock() - grab_started_at > interval * PROBE_QUEUED_FRACTION:
+                    break
+                queued += 1
+        queued_frames = queued / PROBE_STALLS
+        return dict(
+            mode,
+            delivered_fps=delivered_fps,
+            queued_frames=queued_frames,
+            frame_age_ms=queued_frames * interval * 1000.0,
+        )
+    finally:
+        cap.release()
+
+
+def probe_candidates(settings):
+    # Every available backend, FOURCC and buffer depth combination, keeping the
+    # camera index, resolution and FPS from `settings`.
+    import cv2
+
+    available = set(cv2.videoio_registry.getCameraBackends())
+    backends = [
+        name for name, api in CAMERA_BACKENDS.items()
+        if name != "auto" and getattr(cv2, api, None) in available
+    ] or ["auto"]
+    for backend in backends:
+        for fourcc in PROBE_FOURCCS:
+            for buffer_size in PROBE_BUFFER_SIZES:
+                yield dict(settings, backend=backend, fourcc=fourcc, buffer_size=buffer_size)
+
+
+def best_probe(results):
+    # Freshest frames first, then the highest delivered frame rate.
+    measured = [(candidate, result) for candidate, result in results if result is not None]
+    if not measured:
+        return None
+    return min(measured, key=lambda item: (round(item[1]["frame_age_ms"]), -item[1]["delivered_fps"]))[0]
@@ -0,0 +1,397 @@
+import numpy as np
+
+HAND_LANDMARK_COUNT = 21
+HAND_COORD_FEATURES = HAND_LANDMARK_COUNT * 3
+ANGLE_JOINTS = np.array(
+    [
+        (1, 2, 3),
+        (2, 3, 4),
+        (5, 6, 7),
+        (6, 7, 8),
+        (9, 10, 11),
+        (10, 11, 12),
+        (13, 14, 15),
+        (14, 15, 16),
+        (17, 18, 19),
+        (18, 19, 20),
+    ],
+    dtype=np.intp,
+)
+HAND_FEATURE_SIZE = HAND_COORD_FEATURES + len(ANGLE_JOINTS)
+FEATURE_VECTOR_SIZE = 1 + HAND_FEATURE_SIZE * 2
+# Bumped whenever the meaning or order of the features changes, windowed ones
+# included; models record the version they were trained on in models/registry.json.
+FEATURE_LAYOUT_VERSION = 1
+# Temporal window for motion signs: the last FEATURE_WINDOW_FRAMES frames (half a
+# second at 30 FPS). Each frame contributes its feature vector plus both hands' raw
+# wrist positions, since the features are wrist-relative and would not show the whole
+# hand moving. A windowed model sees the newest feature vector, then the mean,
+# standard deviation, velocity against the previous frame and net displacement across
+# the window of every channel, the last two per second. A gap of more than
+# FEATURE_WINDOW_MAX_GAP_S between frames starts a new window.
+FEATURE_WINDOW_FRAMES = 15
+FEATURE_WINDOW_MAX_GAP_S = 0.25
+WRIST_CHANNELS = 2 * 3
+WINDOW_CHANNELS = FEATURE_VECTOR_SIZE + WRIST_CHANNELS
+WINDOW_STATISTICS = ("mean", "std", "velocity", "displacement")
+WINDOWED_FEATURE_VECTOR_SIZE = FEATURE_VECTOR_SIZE + len(WINDOW_STATISTICS) * WINDOW_CHANNELS
+SCALE_LANDMARK = 9
+MIN_NORM = 1e-6
+
+
+def normalize_landmarks(landmarks):
+    lm = np.array([[lm.x, lm.y, lm.z] for lm in landmarks], dtype=np.float32)
+    base = lm[0]
+    lm = lm - base
+    scale = np.linalg.norm(lm[9]) if lm.shape[0] > 9 else 0.0
+    if scale < 1e-6:
+        scale = 1.0
+    return lm / scale
+
+
+def angle_at(a, b, c):
+    ba = a - b
+    bc = c - b
+    denom = np.linalg.norm(ba) * np.linalg.norm(bc)
+    if denom < 1e-6:
+        return 0.0
+    cos = float(np.dot(ba, bc) / denom)
+    cos = max(-1.0, min(1.0, cos))
+    return float(np.arccos(cos))
+
+
+def compute_angles(lm):
+    idx = lambda i: lm[i]
+    return [
+        angle_at(idx(1), idx(2), idx(3)),
+        angle_at(idx(2), idx(3), idx(4)),
+        angle_at(idx(5), idx(6), idx(7)),
+        angle_at(idx(6), idx(7), idx(8)),
+        angle_at(idx(9), idx(10), idx(11)),
+        angle_at(idx(10), idx(11), idx(12)),
+        angle_at(idx(13), idx(14), idx(15)),
+        angle_at(idx(14), idx(15), idx(16)),
+        angle_at(idx(17), idx(18), idx(19)),
+        angle_at(idx(18), idx(19), idx(20)),
+    ]
+
+
+def build_hand_features(landmarks):
+    norm = normalize_landmarks(landmarks)
+    coords = norm.flatten().tolist()
+    angles = compute_angles(norm)
+    return coords + angles
+
+
+def zero_hand_features():
+    return [0.0] * HAND_FEATURE_SIZE
+
+
+def handedness_label(multi_handedness, idx):
+    if multi_handedness and len(multi_handedness) > idx:
+        classification = multi_handedness[idx].classification
+        if classification:
+            return classification[0].label
+    return None
+
+
+def build_feature_vector(multi_hand_landmarks, multi_handedness):
+    right_features = None
+    left_features = None
+    unknown_features = []
+
+    for idx, hand_landmarks in enumerate(multi_hand_landmarks):
+        features = build_hand_features(hand_landmarks.landmark)
+        label = handedness_label(multi_handedness, idx)
+        if label == "Right":
+            right_features = features
+        elif label == "Left":
+            left_features = features
+        else:
+            unknown_features.append(features)
+
+    if right_features is None and unknown_features:
+        right_features = unknown_features.pop(0)
+    if left_features is None and unknown_features:
+        left_features = unknown_features.pop(0)
+
+    primary = right_features if right_features is not None else zero_hand_features()
+    secondary = left_features if left_features is not None else zero_hand_features()
+    only_primary_hand = 1 if right_features is not None and left_features is None else 0
+
+    features = [only_primary_hand] + primary + secondary
+    return np.array(features).reshape(1, -1)
+
+
+def assign_hand_slots(labels):
+    # Same choice as build_feature_vector: the last "Right"/"Left" hand wins its slot,
+    # unlabeled hands fill the empty slots in detection order.
+    right_idx = left_idx = -1
+    unknown_first = unknown_second = -1
+    for idx, label in enumerate(labels):
+        if label == "Right":
+            right_idx = idx
+        elif label == "Left":
+            left_idx = idx
+        elif unknown_first < 0:
+            unknown_first = idx
+        elif unknown_second < 0:
+            unknown_second = idx
+
+    if right_idx < 0 and unknown_first >= 0:
+        right_idx, unknown_first, unknown_second = unknown_first, unknown_second, -1
+    if left_idx < 0 and unknown_first >= 0:
+        left_idx = unknown_first
+    return right_idx, left_idx
+
+
+class HandFeatureExtractor:
+    # Batched replacement for build_feature_vector: both hands are normalized and
+    # all joint angles gathered in one pass, writing into a reused (1, 147) buffer.
+    # Intermediate math follows the float32/float64 steps of the list-based path,
+    # so the output equals build_feature_vector() cast to the buffer dtype.
+    def __init__(self, dtype=np.float32):
+        self.features = np.zeros((1, FEATURE_VECTOR_SIZE), dtype=dtype)
+        self.hands_loaded = (False, False)
+
+        joint_count = len(ANGLE_JOINTS)
+        self._landmarks = np.zeros((2, HAND_LANDMARK_COUNT, 3), dtype=np.float32)
+        # Raw (right, left) landmarks between load() and compute(); normalized in place after.
+        self.landmarks = self._landmarks
+        self._coords = self._landmarks.reshape(2, HAND_COORD_FEATURES)
+        self._base = np.zeros((2, 1, 3), dtype=np.float32)
+        self._scale = np.zeros((2, 1), dtype=np.float32)
+        self._scale_mask = np.zeros((2, 1), dtype=bool)
+        self._joints = np.zeros((2, joint_count, 3, 3), dtype=np.float32)
+        self._ba = np.zeros((2, joint_count, 3), dtype=np.float32)
+        self._bc = np.zeros((2, joint_count, 3), dtype=np.float32)
+        self._ba_norm = np.zeros((2, joint_count), dtype=np.float32)
+        self._bc_norm = np.zeros((2, joint_count), dtype=np.float32)
+        self._dot_product = np.zeros((2, joint_count), dtype=np.float32)
+        self._denom_mask = np.zeros((2, joint_count), dtype=bool)
+        self._angles = np.zeros((2, joint_count), dtype=np.float64)
+        # Raw (right, left) wrist positions of the last compute(); zero for a missing hand.
+        self.wrists = self._base.reshape(WRIST_CHANNELS)
+
+        # Views are created once so the per-frame path only runs ufuncs into existing memory.
+        self._base_src = self._landmarks[:, :1, :]
+        self._scale_src = self._landmarks[:, SCALE_LANDMARK:SCALE_LANDMARK + 1, :]
+        self._scale_view = self._scale[:, :, None]
+        self._scale_rows = self._scale_src[:, :, None, :]
+        self._scale_cols = self._scale_src[:, :, :, None]
+        self._scale_out = self._scale[:, :, None, None]
+        self._joint_a = self._joints[:, :, 0]
+        self._joint_b = self._joints[:, :, 1]
+        self._joint_c = self._joints[:, :, 2]
+        self._ba_rows = self._ba[:, :, None, :]
+        self._ba_cols = self._ba[:, :, :, None]
+        self._bc_rows = self._bc[:, :, None, :]
+        self._bc_cols = self._bc[:, :, :, None]
+        self._ba_norm_out = self._ba_norm[:, :, None, None]
+        self._bc_norm_out = self._bc_norm[:, :, None, None]
+        self._dot_out = self._dot_product[:, :, None, None]
+
+        hand_offsets = (1, 1 + HAND_FEATURE_SIZE)
+        self._outputs = [
+            (
+                self._coords[slot],
+                self.features[0, start:start + HAND_COORD_FEATURES],
+                self._angles[slot],
+                self.features[0, start + HAND_COORD_FEATURES:start + HAND_FEATURE_SIZE],
+            )
+            for slot, start in enumerate(hand_offsets)
+        ]
+
+    def _load_hand(self, slot, landmarks):
+        coords = self._coords[slot]
+        if landmarks is None:
+            coords.fill(0.0)
+            return False
+        for i, lm in enumerate(landmarks):
+            j = i * 3
+            coords[j] = lm.x
+            coords[j + 1] = lm.y
+            coords[j + 2] = lm.z
+        return True
+
+    def _compute(self):
+        lm = self._landmarks
+        np.copyto(self._base, self._base_src)
+        np.subtract(lm, self._base, out=lm)
+
+        # Dot products go through matmul, which accumulates 3-vectors exactly like the
+        # ndarray.dot calls in normalize_landmarks/angle_at; einsum and sum() do not.
+        scale = self._scale
+        np.matmul(self._scale_rows, self._scale_cols, out=self._scale_out)
+        np.sqrt(scale, out=scale)
+        np.less(scale, MIN_NORM, out=self._scale_mask)
+        np.copyto(scale, 1.0, where=self._scale_mask)
+        np.divide(lm, self._scale_view, out=lm)
+
+        np.take(lm, ANGLE_JOINTS, axis=1, out=self._joints, mode="clip")
+        np.subtract(self._joint_a, self._joint_b, out=self._ba)
+        np.subtract(self._joint_c, self._joint_b, out=self._bc)
+        denom = self._ba_norm
+        np.matmul(self._ba_rows, self._ba_cols, out=self._ba_norm_out)
+        np.matmul(self._bc_rows, self._bc_cols, out=self._bc_norm_out)
+        np.sqrt(denom, out=denom)
+        np.sqrt(self._bc_norm, out=self._bc_norm)
+        np.multiply(denom, self._bc_norm, out=denom)
+        np.less(denom, MIN_NORM, out=self._denom_mask)
+        np.copyto(denom, 1.0, where=self._denom_mask)
+        np.matmul(self._ba_rows, self._bc_cols, out=self._dot_out)
+        np.divide(self._dot_product, denom, out=self._dot_product)
+
+        angles = self._angles
+        np.copyto(angles, self._dot_product)
+        np.clip(angles, -1.0, 1.0, out=angles)
+        np.arccos(angles, out=angles)
+        np.copyto(angles, 0.0, where=self._denom_mask)
+
+    def _load_points(self, slot, points):
+        if points is None:
+            self._landmarks[slot].fill(0.0)
+            return False
+        np.copyto(self._landmarks[slot], points, casting="same_kind")
+        return True
+
+    def load(self, multi_hand_landmarks, multi_handedness):
+        # First half of extract(): fills self.landmarks without computing features.
+        right_idx, left_idx = assign_hand_slots(
+            [handedness_label(multi_handedness, idx) for idx in range(len(multi_hand_landmarks))]
+        )
+        self.hands_loaded = (
+            self._load_hand(0, multi_hand_landmarks[right_idx].landmark if right_idx >= 0 else None),
+            self._load_hand(1, multi_hand_landmarks[left_idx].landmark if left_idx >= 0 else None),
+        )
+        return self.landmarks
+
+    def load_points(self, points, labels):
+        # load() for landmarks already held in an (n, 21, 3) float32 array, e.g. a
+        # replayed recording; labels holds each hand's handedness or None.
+        right_idx, left_idx = assign_hand_slots(labels)
+        self.hands_loaded = (
+            self._load_points(0, points[right_idx] if right_idx >= 0 else None),
+            self._load_points(1, points[left_idx] if left_idx >= 0 else None),
+        )
+        return self.landmarks
+
+    def extract(self, multi_hand_landmarks, multi_handedness):
+        self.load(multi_hand_landmarks, multi_handedness)
+        return self.compute()
+
+    def extract_points(self, points, labels):
+        self.load_points(points, labels)
+        return self.compute()
+
+    def compute(self):
+        has_right, has_left = self.hands_loaded
+        self._compute()
+
+        features = self.features
+        features[0, 0] = 1 if has_right and not has_left else 0
+        for coords, coords_out, angles, angles_out in self._outputs:
+            np.copyto(coords_out, coords)
+            np.copyto(angles_out, angles, casting="same_kind")
+        return features
+
+
+class FeatureWindow:
+    # Ring buffer of the last `frames` frames' channels and timestamps, and the
+    # windowed feature vector built from it in a reused (1, 759) buffer. The sums
+    # behind the mean and standard deviation are updated as a frame enters and the
+    # oldest one leaves, so a push costs the same at any window length; they are
+    # rebuilt exactly once per lap of the ring so float error cannot build up.
+    def __init__(self, frames=FEATURE_WINDOW_FRAMES, max_gap_s=FEATURE_WINDOW_MAX_GAP_S, dtype=np.float32):
+        self.frames = max(2, int(frames))
+        self.max_gap_s = max_gap_s
+        self.vector = np.zeros((1, WINDOWED_FEATURE_VECTOR_SIZE), dtype=dtype)
+        self.count = 0
+
+        self._rows = np.zeros((self.frames, WINDOW_CHANNELS), dtype=np.float64)
+        self._stamps = np.zeros(self.frames, dtype=np.float64)
+        self._sum = np.zeros(WINDOW_CHANNELS, dtype=np.float64)
+        self._sum_sq = np.zeros(WINDOW_CHANNELS, dtype=np.float64)
+        self._scratch = np.zeros(WINDOW_CHANNELS, dtype=np.float64)
+        self._variance = np.zeros(WINDOW_CHANNELS, dtype=np.float64)
+        self._head = 0
+        self._since_rebuild = 0
+
+        self._current = self.vector[0, :FEATURE_VECTOR_SIZE]
+        self._mean, self._std, self._velocity, self._displacement = (
+            self.vector[0, start:start + WINDOW_CHANNELS]
+            for start in range(FEATURE_VECTOR_SIZE, WINDOWED_FEATURE_VECTOR_SIZE, WINDOW_CHANNELS)
+        )
+
+    def clear(self):
+        self.count = 0
+        self._head = 0
+        self._since_rebuild = 0
+        self._sum.fill(0.0)
+        self._sum_sq.fill(0.0)
+
+    def push(self, features, wrists, stamp):
+        # Adds one frame and returns the updated windowed vector.
+        if self.count and stamp - self._stamps[self._head - 1] > self.max_gap_s:
+            self.clear()
+        slot = self._head
+        row = self._rows[slot]
+        if self.count == self.frames:
+            self._sum -= row
+            np.square(row, out=self._scratch)
+            self._sum_sq -= self._scratch
+        else:
+            self.count += 1
+
+        row[:FEATURE_VECTOR_SIZE] = features.reshape(FEATURE_VECTOR_SIZE)
+        row[FEATURE_VECTOR_SIZE:] = wrists
+        self._stamps[slot] = stamp
+        self._sum += row
+        np.square(row, out=self._scratch)
+        self._sum_sq += self._scratch
+        self._head = (slot + 1) % self.frames
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.frames:
+            self._rebuild()
+        self._update(slot)
+        return self.vector
+
+    def _rebuild(self):
+        rows = self._rows[:self.count]
+        np.sum(rows, axis=0, out=self._sum)
+        np.einsum("ij,ij->j", rows, rows, out=self._sum_sq)
+        self._since_rebuild = 0
+
+    def _rate(self, out, row, slot, stamp):
+        # Per-second change from the frame in `slot` to `row`; zero without elapsed time.
+        elapsed = stamp - self._stamps[slot]
+        if elapsed <= 0.0:
+            out.fill(0.0)
+            return
+        np.subtract(row, self._rows[slot], out=self._scratch)
+        self._scratch /= elapsed
+        np.copyto(out, self._scratch, casting="same_kind")
+
+    def _update(self, slot):
+        row = self._rows[slot]
+        stamp = self._stamps[slot]
+        scratch = self._scratch
+        np.copyto(self._current, row[:FEATURE_VECTOR_SIZE], casting="same_kind")
+
+        np.divide(self._sum, self.count, out=scratch)
+        np.copyto(self._mean, scratch, casting="same_kind")
+        variance = self._variance
+        np.square(scratch, out=scratch)
+        np.divide(self._sum_sq, self.count, out=variance)
+        variance -= scratch
+        np.maximum(variance, 0.0, out=variance)
+        np.sqrt(variance, out=variance)
+        np.copyto(self._std, variance, casting="same_kind")
+
+        if self.count == 1:
+            self._velocity.fill(0.0)
+            self._displacement.fill(0.0)
+            return
+        self._rate(self._velocity, row, slot - 1, stamp)
+        # Once the ring is full the oldest frame sits where the next one will go.
+        self._rate(self._displacement, row, self._head if self.count == self.frames else 0, stamp)
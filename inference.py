@@ -0,0 +1,208 @@
+import collections
+
+import numpy as np
+
+from features import FEATURE_VECTOR_SIZE, WINDOWED_FEATURE_VECTOR_SIZE
+
+DEFAULT_TOP_K = 3
+
+# probabilities is the model's whole row, in the order of labels (the engine's list).
+Prediction = collections.namedtuple("Prediction", "label probability top_k probabilities labels")
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def _sigmoid(scores):
+    return 1.0 / (1.0 + np.exp(-scores))
+
+
+def _binary_to_two_columns(positive):
+    positive = positive.reshape(-1)
+    return np.column_stack((1.0 - positive, positive))
+
+
+class CompiledTrees:
+    # Every tree of the ensemble is flattened into shared node tables. Leaves point
+    # back at themselves with an infinite threshold, so all trees can be walked in
+    # lock-step for max_depth steps without checking which ones already finished.
+    def __init__(self, trees, n_classes):
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            structure = tree.tree_
+            node_ids = np.arange(structure.node_count) + offset
+            is_leaf = structure.children_left == -1
+            lefts.append(np.where(is_leaf, node_ids, structure.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, structure.children_right + offset))
+            features.append(np.where(is_leaf, 0, structure.feature))
+            thresholds.append(np.where(is_leaf, np.inf, structure.threshold))
+
+            value = structure.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += structure.node_count
+
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.value = np.concatenate(values)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max(tree.tree_.max_depth for tree in trees)
+
+    def __call__(self, features):
+        # Trees split on float32 inputs, exactly like sklearn's own tree traversal.
+        features = np.asarray(features, dtype=np.float32)
+        rows = np.arange(features.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (features.shape[0], self.roots.size))
+        for _ in range(self.max_depth):
+            go_left = features[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=1)
+
+
+class CompiledLogistic:
+    def __init__(self, estimator):
+        self.coef_t = np.ascontiguousarray(estimator.coef_.T, dtype=np.float64)
+        self.intercept = np.asarray(estimator.intercept_, dtype=np.float64)
+        n_classes = len(estimator.classes_)
+        multi_class = getattr(estimator, "multi_class", "auto")
+        self.ovr = multi_class in ("ovr", "warn") or (
+            multi_class == "auto" and (n_classes <= 2 or estimator.solver == "liblinear")
+        )
+
+    def __call__(self, features):
+        scores = features @ self.coef_t + self.intercept
+        if scores.shape[1] == 1:
+            if self.ovr:
+                return _binary_to_two_columns(_sigmoid(scores))
+            return _softmax(np.column_stack((-scores[:, 0], scores[:, 0])))
+        if self.ovr:
+            scores = _sigmoid(scores)
+            return scores / scores.sum(axis=1, keepdims=True)
+        return _softmax(scores)
+
+
+class CompiledMLP:
+    ACTIVATIONS = {
+        "identity": lambda x: x,
+        "relu": lambda x: np.maximum(x, 0.0, out=x),
+        "tanh": lambda x: np.tanh(x, out=x),
+        "logistic": _sigmoid,
+    }
+
+    def __init__(self, estimator):
+        # sklearn runs the forward pass in the dtype the network was fitted with.
+        self.dtype = estimator.coefs_[0].dtype
+        self.weights = list(estimator.coefs_)
+        self.biases = list(estimator.intercepts_)
+        self.hidden_activation = self.ACTIVATIONS[estimator.activation]
+        self.out_activation = estimator.out_activation_
+
+    def __call__(self, features):
+        activations = np.asarray(features, dtype=self.dtype)
+        last = len(self.weights) - 1
+        for index, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            activations = activations @ weight + bias
+            if index != last:
+                activations = self.hidden_activation(activations)
+        if self.out_activation == "softmax":
+            return _softmax(activations)
+        return _binary_to_two_columns(_sigmoid(activations))
+
+
+class CompiledScaler:
+    def __init__(self, scaler):
+        self.mean = scaler.mean_ if scaler.with_mean else None
+        self.scale = scaler.scale_ if scaler.with_std else None
+
+    def __call__(self, features):
+        # Like StandardScaler.transform: float32 input stays float32.
+        features = np.array(features, dtype=np.result_type(features, np.float32))
+        if self.mean is not None:
+            np.subtract(features, self.mean, out=features, casting="same_kind")
+        if self.scale is not None:
+            np.divide(features, self.scale, out=features, casting="same_kind")
+        return features
+
+
+class CompiledPipeline:
+    def __init__(self, transforms, final):
+        self.transforms = transforms
+        self.final = final
+
+    def __call__(self, features):
+        for transform in self.transforms:
+            features = transform(features)
+        return self.final(features)
+
+
+def compile_estimator(estimator):
+    # Returns a plain-NumPy predict_proba equivalent, or None when the estimator
+    # type is not supported and the sklearn path has to be used.
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+
+    if isinstance(estimator, Pipeline):
+        transforms = []
+        for _name, step in estimator.steps[:-1]:
+            if step is None or step == "passthrough":
+                continue
+            if not isinstance(step, StandardScaler):
+                return None
+            transforms.append(CompiledScaler(step))
+        final = compile_estimator(estimator.steps[-1][1])
+        return CompiledPipeline(transforms, final) if final is not None else None
+
+    if isinstance(estimator, (DecisionTreeClassifier, RandomForestClassifier, ExtraTreesClassifier)):
+        if estimator.n_outputs_ != 1:
+            return None
+        trees = [estimator] if isinstance(estimator, DecisionTreeClassifier) else estimator.estimators_
+        return CompiledTrees(trees, len(estimator.classes_))
+    if isinstance(estimator, LogisticRegression):
+        return CompiledLogistic(estimator)
+    if isinstance(estimator, MLPClassifier) and estimator.activation in CompiledMLP.ACTIVATIONS:
+        return CompiledMLP(estimator)
+    return None
+
+
+class ClassificationEngine:
+    def __init__(self, model, compiled=False, top_k=DEFAULT_TOP_K):
+        self.model = model
+        self.labels = [str(label).strip() for label in model.classes_]
+        self.top_k = max(1, min(int(top_k), len(self.labels)))
+        self.compiled = compile_estimator(model) if compiled else None
+        self.n_features = int(getattr(model, "n_features_in_", FEATURE_VECTOR_SIZE))
+
+    @property
+    def mode(self):
+        return "compiled" if self.compiled is not None else "sklearn"
+
+    @property
+    def windowed(self):
+        # Trained on features.FeatureWindow vectors rather than single frames.
+        return self.n_features == WINDOWED_FEATURE_VECTOR_SIZE
+
+    def predict_proba(self, features):
+        if self.compiled is not None:
+            return self.compiled(features)
+        return self.model.predict_proba(features)
+
+    def classify(self, features):
+        probs = self.predict_proba(features)[0]
+        # A stable sort keeps ties in class order, so the first entry is np.argmax (model.predict).
+        ranked = np.argsort(-probs, kind="stable")[:self.top_k]
+        top_k = tuple((self.labels[index], float(probs[index])) for index in ranked)
+        return Prediction(top_k[0][0], top_k[0][1], top_k, probs, self.labels)
@@ -0,0 +1,508 @@
+import collections
+import json
+import struct
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+IPC_SERVER_NAME = "signflow_overlay_ipc_v2"
+CONNECT_TIMEOUT_MS = 500
+WRITE_TIMEOUT_MS = 500
+DISCONNECT_TIMEOUT_MS = 200
+MESSAGE_DELIMITER = "\n"
+
+# Frame layout: magic, protocol version, message type, sequence number, payload length.
+FRAME_MAGIC = b"SF"
+PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct("!2sBBII")
+MAX_PAYLOAD_BYTES = 1 << 20
+SEQUENCE_MODULO = 1 << 32
+
+MSG_CAPTION = 1
+# Sender state, a JSON object with a "state" key and optional "detail", "timings_ms"
+# and "settings" (the CONTROL_SETTINGS names the sender applies).
+MSG_STATUS = 2
+STATUS_STARTING = "starting"
+STATUS_READY = "ready"
+STATUS_ERROR = "error"
+MSG_TELEMETRY = 3
+# captions.CaptionBuffer deltas. A sender captioning several streams adds a "stream"
+# key naming the caption lane.
+MSG_CAPTION_DELTA = 4
+# Overlay -> sender commands, JSON objects with a "command" key and an optional "id".
+MSG_CONTROL = 5
+CONTROL_ROI = "roi"
+CONTROL_PLAYBACK = "playback"
+CONTROL_MODEL = "model"
+CONTROL_SETTINGS = "settings"
+CONTROL_CLEAR = "clear"
+# Sender -> overlay, once a command with an "id" has taken effect or failed: a JSON
+# object with "id", "command", "ok" and optional "detail" and "ignored" (setting names
+# the sender has no use for).
+MSG_CONTROL_ACK = 6
+
+# Outbox drop policies. KEEP_LATEST replaces a queued message of the same type, the
+# other two decide which message goes when the queue is full.
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+KEEP_LATEST = "keep_latest"
+DEFAULT_DROP_POLICIES = {
+    MSG_CAPTION: KEEP_LATEST,
+    MSG_STATUS: KEEP_LATEST,
+    MSG_TELEMETRY: DROP_OLDEST,
+    MSG_CAPTION_DELTA: DROP_OLDEST,
+    MSG_CONTROL_ACK: DROP_OLDEST,
+}
+OUTBOX_CAPACITY = 64
+OUTBOX_STOP_TIMEOUT_S = 1.0
+OUTBOX_POLL_INTERVAL_S = 0.05
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN_S = 2.0
+
+Message = collections.namedtuple("Message", "type sequence payload")
+
+
+def encode_payload(payload):
+    if isinstance(payload, bytes):
+        return payload
+    if isinstance(payload, str):
+        return payload.encode("utf-8")
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(payload):
+    try:
+        return json.loads(payload.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+
+
+def encode_frame(msg_type, sequence, payload):
+    body = encode_payload(payload)
+    if len(body) > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"IPC payload of {len(body)} bytes exceeds {MAX_PAYLOAD_BYTES}")
+    return FRAME_HEADER.pack(FRAME_MAGIC, PROTOCOL_VERSION, msg_type, sequence % SEQUENCE_MODULO, len(body)) + body
+
+
+class FrameDecoder:
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        self._buffer += data
+        messages = []
+        offset = 0
+        while len(self._buffer) - offset >= FRAME_HEADER.size:
+            magic, version, msg_type, sequence, length = FRAME_HEADER.unpack_from(self._buffer, offset)
+            if magic != FRAME_MAGIC or version != PROTOCOL_VERSION or length > MAX_PAYLOAD_BYTES:
+                raise ValueError("Malformed IPC frame")
+            end = offset + FRAME_HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            messages.append(Message(msg_type, sequence, bytes(self._buffer[offset + FRAME_HEADER.size:end])))
+            offset = end
+        del self._buffer[:offset]
+        return messages
+
+
+class OverlayConnection:
+    # One long-lived socket to the overlay. It is created lazily, so it belongs to
+    # whichever thread sends first, and is re-established on the next send after
+    # any connect or write failure. on_connect returns (type, payload) pairs that
+    # are sent first on every new connection, e.g. to resynchronize state.
+    def __init__(
+        self,
+        server_name=IPC_SERVER_NAME,
+        connect_timeout_ms=CONNECT_TIMEOUT_MS,
+        write_timeout_ms=WRITE_TIMEOUT_MS,
+        on_connect=None,
+    ):
+        self.server_name = server_name
+        self.connect_timeout_ms = connect_timeout_ms
+        self.write_timeout_ms = write_timeout_ms
+        self.on_connect = on_connect
+        self.sequence = 0
+        self.connects = 0
+        self._socket = None
+        self._decoder = FrameDecoder()
+
+    def is_connected(self):
+        return self._socket is not None and self._socket.state() == QLocalSocket.ConnectedState
+
+    def _connect(self):
+        if self._socket is None:
+            self._socket = QLocalSocket()
+        self._socket.abort()
+        self._socket.connectToServer(self.server_name)
+        if not self._socket.waitForConnected(self.connect_timeout_ms):
+            self._socket.abort()
+            return False
+        self.connects += 1
+        self._decoder = FrameDecoder()
+        for msg_type, payload in self.on_connect() if self.on_connect is not None else ():
+            if not self._write(encode_frame(msg_type, self.sequence, payload)):
+                self._socket.abort()
+                return False
+            self.sequence = (self.sequence + 1) % SEQUENCE_MODULO
+        return True
+
+    def _write(self, frame):
+        if self._socket.write(frame) < 0:
+            return False
+        while self._socket.bytesToWrite() > 0:
+            if not self._socket.waitForBytesWritten(self.write_timeout_ms):
+                return False
+        return True
+
+    def send(self, msg_type, payload):
+        frame = encode_frame(msg_type, self.sequence, payload)
+        # A socket that looks connected may have been closed by the overlay; retry once on a fresh connection.
+        for _attempt in range(2):
+            if not self.is_connected() and not self._connect():
+                return False
+            if self._write(frame):
+                self.sequence = (self.sequence + 1) % SEQUENCE_MODULO
+                return True
+            self._socket.abort()
+        return False
+
+    def ensure_connected(self):
+        return self.is_connected() or self._connect()
+
+    def poll(self):
+        # Returns the frames the overlay sent back since the last call without blocking.
+        if not self.is_connected():
+            return []
+        if self._socket.bytesAvailable() == 0 and not self._socket.waitForReadyRead(0):
+            return []
+        try:
+            return self._decoder.feed(bytes(self._socket.readAll()))
+        except ValueError:
+            self._socket.abort()
+            return []
+
+    def send_caption(self, caption_text):
+        return self.send(MSG_CAPTION, caption_text)
+
+    def send_status(self, status):
+        return self.send(MSG_STATUS, status)
+
+    def send_telemetry(self, telemetry):
+        return self.send(MSG_TELEMETRY, telemetry)
+
+    def send_caption_delta(self, delta):
+        return self.send(MSG_CAPTION_DELTA, delta)
+
+    def send_control_ack(self, ack):
+        return self.send(MSG_CONTROL_ACK, ack)
+
+    def close(self):
+        if self._socket is None:
+            return
+        self._socket.disconnectFromServer()
+        if self._socket.state() != QLocalSocket.UnconnectedState:
+            self._socket.waitForDisconnected(DISCONNECT_TIMEOUT_MS)
+        self._socket = None
+
+
+_IDLE = object()
+
+
+class CircuitBreaker:
+    # Opens after repeated send failures so a missing overlay costs one connect
+    # attempt per cooldown instead of one per message.
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown_s=BREAKER_COOLDOWN_S, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.clock = clock
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.cooldown_s:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def retry_in(self):
+        if self.opened_at is None:
+            return None
+        return max(0.0, self.opened_at + self.cooldown_s - self.clock())
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = self.clock()
+
+
+class Outbox:
+    # Bounded queue drained by a background thread that owns the OverlayConnection,
+    # so post() never blocks the frame loop on connects or writes.
+    # With on_message set, the worker also keeps the connection open while idle and
+    # calls on_message(message) from its thread for every frame the overlay sends.
+    def __init__(
+        self,
+        server_name=IPC_SERVER_NAME,
+        capacity=OUTBOX_CAPACITY,
+        drop_policies=None,
+        breaker=None,
+        on_connect=None,
+        on_message=None,
+        poll_interval_s=OUTBOX_POLL_INTERVAL_S,
+    ):
+        self.connection = OverlayConnection(server_name, on_connect=on_connect)
+        self.on_message = on_message
+        self.poll_interval_s = poll_interval_s
+        self.capacity = capacity
+        self.drop_policies = dict(DEFAULT_DROP_POLICIES)
+        self.drop_policies.update(drop_policies or {})
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="signflow-ipc-outbox", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=OUTBOX_STOP_TIMEOUT_S):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": self.queued,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "pending": len(self._pending),
+                "breaker": self.breaker.state,
+            }
+
+    def _drop_queued(self, msg_type):
+        for index, message in enumerate(self._pending):
+            if message[0] == msg_type:
+                del self._pending[index]
+                self.dropped += 1
+                return True
+        return False
+
+    def post(self, msg_type, payload):
+        with self._cond:
+            policy = self.drop_policies.get(msg_type, DROP_OLDEST)
+            if policy == KEEP_LATEST:
+                self._drop_queued(msg_type)
+            if len(self._pending) >= self.capacity:
+                if policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((msg_type, payload))
+            self.queued += 1
+            self._cond.notify()
+            return True
+
+    def post_caption(self, caption_text):
+        return self.post(MSG_CAPTION, caption_text)
+
+    def post_status(self, status):
+        return self.post(MSG_STATUS, status)
+
+    def post_telemetry(self, telemetry):
+        return self.post(MSG_TELEMETRY, telemetry)
+
+    def post_caption_delta(self, delta):
+        return self.post(MSG_CAPTION_DELTA, delta)
+
+    def post_control_ack(self, ack):
+        return self.post(MSG_CONTROL_ACK, ack)
+
+    def _next_message(self):
+        # Returns the next message to send, _IDLE when it is time to poll the overlay, or None to stop.
+        with self._cond:
+            while True:
+                if self._pending and self.breaker.allow():
+                    return self._pending.popleft()
+                if not self._running:
+                    return None
+                timeout = self.breaker.retry_in() if self._pending else None
+                if self.on_message is None:
+                    self._cond.wait(timeout)
+                elif not self._cond.wait(self.poll_interval_s if timeout is None else min(timeout, self.poll_interval_s)):
+                    return _IDLE
+
+    def _send(self, message):
+        msg_type, _payload = message
+        sent = self.connection.send(*message)
+        with self._cond:
+            if sent:
+                self.sent += 1
+                self.breaker.record_success()
+                return
+            self.breaker.record_failure()
+            # Retry the message once the overlay is back, unless a newer one already superseded it.
+            superseded = self.drop_policies.get(msg_type) == KEEP_LATEST and any(
+                queued_type == msg_type for queued_type, _payload in self._pending
+            )
+            if superseded or len(self._pending) >= self.capacity:
+                self.dropped += 1
+            else:
+                self._pending.appendleft(message)
+
+    def _poll(self):
+        if not self.connection.is_connected():
+            with self._cond:
+                if not self.breaker.allow():
+                    return
+            connected = self.connection.ensure_connected()
+            with self._cond:
+                if connected:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                    return
+        for message in self.connection.poll():
+            self.on_message(message)
+
+    def _run(self):
+        while True:
+            message = self._next_message()
+            if message is None:
+                break
+            if message is not _IDLE:
+                self._send(message)
+            if self.on_message is not None:
+                self._poll()
+        self.connection.close()
+
+
+class _ClientStream:
+    # Detects the client's format from its first bytes: frames start with
+    # FRAME_MAGIC, anything else is treated as newline-delimited caption text.
+    def __init__(self, socket):
+        self.socket = socket
+        self.decoder = None
+        self.line_mode = False
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        if self.decoder is not None:
+            return self.decoder.feed(data)
+        self._buffer += data
+        if not self.line_mode:
+            if len(self._buffer) < len(FRAME_MAGIC):
+                return []
+            if self._buffer.startswith(FRAME_MAGIC):
+                self.decoder = FrameDecoder()
+                data, self._buffer = bytes(self._buffer), bytearray()
+                return self.decoder.feed(data)
+            self.line_mode = True
+
+        delimiter = MESSAGE_DELIMITER.encode("utf-8")
+        *lines, rest = bytes(self._buffer).split(delimiter)
+        self._buffer = bytearray(rest)
+        return [Message(MSG_CAPTION, 0, line) for line in lines]
+
+
+class OverlayServer(QObject):
+    message_received = pyqtSignal(object)
+    client_count_changed = pyqtSignal(int)
+    # Emitted with the client's socket once its first frame arrives, i.e. once it is
+    # known to speak the framed protocol and can be sent MSG_CONTROL frames.
+    client_ready = pyqtSignal(object)
+
+    def __init__(self, server_name=IPC_SERVER_NAME, parent=None):
+        super().__init__(parent)
+        self.server_name = server_name
+        self.received = 0
+        self.sequence = 0
+        self._server = QLocalServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._clients = {}
+
+    def listen(self):
+        QLocalServer.removeServer(self.server_name)
+        return self._server.listen(self.server_name)
+
+    def close(self):
+        self._server.close()
+        streams = list(self._clients.values())
+        self._clients.clear()
+        for stream in streams:
+            stream.socket.abort()
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def send(self, socket, msg_type, payload):
+        stream = self._clients.get(socket)
+        if stream is None or stream.decoder is None:
+            return False
+        frame = encode_frame(msg_type, self.sequence, payload)
+        self.sequence = (self.sequence + 1) % SEQUENCE_MODULO
+        return socket.write(frame) == len(frame)
+
+    def broadcast(self, msg_type, payload):
+        return sum(self.send(socket, msg_type, payload) for socket in list(self._clients))
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            self._clients[socket] = _ClientStream(socket)
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._on_disconnected(socket))
+            self.client_count_changed.emit(len(self._clients))
+
+    def _on_ready_read(self, socket):
+        stream = self._clients.get(socket)
+        if stream is None:
+            return
+        framed = stream.decoder is not None
+        try:
+            messages = stream.feed(bytes(socket.readAll()))
+        except ValueError:
+            socket.abort()
+            return
+        if not framed and stream.decoder is not None:
+            self.client_ready.emit(socket)
+        for message in messages:
+            self.received += 1
+            self.message_received.emit(message)
+
+    def _on_disconnected(self, socket):
+        if socket in self._clients:
+            # Connect-per-message clients can disconnect before readyRead was handled.
+            if socket.bytesAvailable() > 0:
+                self._on_ready_read(socket)
+            del self._clients[socket]
+            self.client_count_changed.emit(len(self._clients))
+        socket.deleteLater()
@@ -0,0 +1,105 @@
+import math
+
+# time.perf_counter() timestamps taken along the pipeline, in order. The sender
+# fills in the first five and the overlay adds the last two. perf_counter is
+# system-wide (on Windows since Python 3.10), so stamps from both processes can be
+# subtracted, and unlike time.monotonic() on Windows it resolves sub-millisecond stages.
+LATENCY_STAGES = ("capture", "detect", "features", "classify", "send", "receive", "paint")
+SENDER_STAGE_COUNT = 5
+LATENCY_TOTAL = "total"
+LATENCY_WINDOW = 256
+LATENCY_BUCKET_MS = 0.25
+LATENCY_MAX_MS = 1000.0
+
+
+class LatencyHistogram:
+    # Rolling percentiles over the last `window` samples. Samples are counted in a
+    # fixed array of buckets and a ring of bucket indices remembers which count to
+    # decrement when a sample falls out of the window, so recording never allocates.
+    def __init__(self, window=LATENCY_WINDOW, bucket_ms=LATENCY_BUCKET_MS, max_ms=LATENCY_MAX_MS):
+        self.bucket_ms = bucket_ms
+        # The last bucket also collects everything above max_ms.
+        self.counts = [0] * (int(max_ms / bucket_ms) + 1)
+        self.ring = [0] * window
+        self.size = 0
+        self.cursor = 0
+
+    def record(self, seconds):
+        bucket = int(seconds * 1000.0 / self.bucket_ms)
+        if bucket < 0:
+            bucket = 0
+        elif bucket >= len(self.counts):
+            bucket = len(self.counts) - 1
+
+        if self.size == len(self.ring):
+            self.counts[self.ring[self.cursor]] -= 1
+        else:
+            self.size += 1
+        self.ring[self.cursor] = bucket
+        self.counts[bucket] += 1
+        self.cursor += 1
+        if self.cursor == len(self.ring):
+            self.cursor = 0
+
+    def percentile(self, percentile):
+        # Upper edge of the bucket holding the percentile, in milliseconds.
+        if not self.size:
+            return None
+        rank = max(1, math.ceil(self.size * percentile / 100.0))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return (bucket + 1) * self.bucket_ms
+        return None
+
+    def reset(self):
+        for bucket in range(len(self.counts)):
+            self.counts[bucket] = 0
+        self.size = 0
+        self.cursor = 0
+
+
+class LatencyTracker:
+    # One histogram per stage, each measuring the time since the previous stamp,
+    # plus one for the whole capture-to-paint path.
+    def __init__(self, stages=LATENCY_STAGES, window=LATENCY_WINDOW):
+        self.stages = stages
+        self.names = tuple(stages[1:]) + (LATENCY_TOTAL,)
+        self.histograms = [LatencyHistogram(window) for _name in self.names]
+        self.samples = 0
+
+    def record(self, stamps):
+        if len(stamps) != len(self.stages):
+            return False
+        for index in range(1, len(stamps)):
+            self.histograms[index - 1].record(stamps[index] - stamps[index - 1])
+        self.histograms[-1].record(stamps[-1] - stamps[0])
+        self.samples += 1
+        return True
+
+    def reset(self):
+        for histogram in self.histograms:
+            histogram.reset()
+        self.samples = 0
+
+    def summary(self):
+        return [
+            (name, histogram.percentile(50), histogram.percentile(95))
+            for name, histogram in zip(self.names, self.histograms)
+        ]
+
+
+def valid_sender_stamps(stamps):
+    return (
+        isinstance(stamps, list)
+        and len(stamps) == SENDER_STAGE_COUNT
+        and all(isinstance(stamp, (int, float)) and not isinstance(stamp, bool) for stamp in stamps)
+    )
+
+
+def format_latency_summary(summary):
+    parts = [f"{name} {p50:.1f}/{p95:.1f}" for name, p50, p95 in summary if p50 is not None]
+    if not parts:
+        return "Latency: waiting for captions"
+    return "  ".join(parts) + "  ms p50/p95"
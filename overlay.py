@@ -1,9 +1,13 @@
 ﻿import json
 import os
 import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 
-from PyQt5.QtCore import QAbstractAnimation, QEasingCurve, QRectF, QSize, Qt, QVariantAnimation, pyqtSignal
+from PyQt5.QtCore import QAbstractAnimation, QEasingCurve, QEvent, QRectF, QSize, Qt, QTimer, QVariantAnimation, pyqtSignal
 from PyQt5.QtGui import QColor, QFont, QFontMetrics, QGuiApplication, QIcon, QPainter, QPainterPath, QPen, QPixmap, QRegion
 from PyQt5.QtWidgets import (
     QApplication,
@@ -19,6 +23,27 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+from captions import CaptionBuffer
+from ipc import (
+    CONTROL_CLEAR,
+    CONTROL_MODEL,
+    CONTROL_PLAYBACK,
+    CONTROL_ROI,
+    CONTROL_SETTINGS,
+    IPC_SERVER_NAME,
+    MSG_CAPTION,
+    MSG_CAPTION_DELTA,
+    MSG_CONTROL,
+    MSG_CONTROL_ACK,
+    MSG_STATUS,
+    STATUS_ERROR,
+    STATUS_READY,
+    STATUS_STARTING,
+    OverlayServer,
+    decode_json,
+)
+from latency import LatencyTracker, format_latency_summary, valid_sender_stamps
+
 # GENERAL
 ENABLE_COLLAPSE_ANIMATION = True
 LABEL_DEFAULT_TEXT = "Captions Placeholder"
@@ -45,6 +70,9 @@ DEFAULT_FONT_SIZE = 14
 PRIMARY_BOX_SIZE_MIN = 90
 PRIMARY_BOX_SIZE_MAX = 260
 DEFAULT_PRIMARY_BOX_SIZE = 110
+CAPTION_LAYOUT_CACHE_SIZE = 256
+LATENCY_FONT_SIZE = 9
+LATENCY_LABEL_SPACING = 4
 
 # SECONDARY PANEL
 SECONDARY_INNER_SPACING = 24
@@ -60,6 +88,15 @@ SECONDARY_DROPDOWN_WIDTH = 30
 SECONDARY_ACTION_BUTTON_SIZE = 40
 SECONDARY_ACTION_ICON_SIZE = 20
 
+# IPC
+CAPTION_COALESCE_MS = 16
+# With several caption streams, each lane shows the end of its stream's captions.
+CAPTION_LANE_CHARS = 80
+SENDER_STATUS_LABELS = {STATUS_STARTING: "Starting", STATUS_READY: "Ready", STATUS_ERROR: "Error"}
+# Commands sent and not yet acknowledged that are remembered for their round trip.
+CONTROL_IN_FLIGHT_LIMIT = 64
+LATENCY_REFRESH_MS = 500
+
 # OPACITY
 DEFAULT_OPACITY = 0.80
 MIN_OPACITY_PERCENT = 50
@@ -86,6 +123,17 @@ MODEL_OPTIONS = ["Local Small", "Local Medium"]
 PROJECT_DIR = Path(__file__).resolve().parent
 DEFAULT_SETTINGS_PATH = PROJECT_DIR / "default_settings.json"
 USER_PREFERENCES_PATH = PROJECT_DIR / "user_preferences.json"
+# Preference changes less than this far apart are written to disk together.
+PREFERENCES_DEBOUNCE_S = 0.4
+PREFERENCES_STOP_TIMEOUT_S = 2.0
+
+# Sender settings kept as preferences, by their CONTROL_SETTINGS name -> (type, lowest,
+# highest). None (null in the file) leaves the sender's own default in place.
+SENDER_SETTING_PREFERENCES = {
+    "threshold": (float, 0.0, 1.0),
+    "min_stable_frames": (int, 1, 300),
+    "reset_frames": (int, 1, 300),
+}
 
 DEFAULT_SETTINGS = {
     "caption_box_size": DEFAULT_PRIMARY_BOX_SIZE,
@@ -96,6 +144,7 @@ DEFAULT_SETTINGS = {
     "model_selection": MODEL_OPTIONS[0],
     "show_latency": False,
     "corner": DEFAULT_CORNER,
+    **{name: None for name in SENDER_SETTING_PREFERENCES},
 }
 
 
@@ -113,6 +162,12 @@ def _as_bool(value, fallback):
     return fallback
 
 
+def _optional_setting(value, kind, low, high):
+    if value is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return kind(max(low, min(high, kind(value))))
+
+
 def _sanitize_settings(raw):
     source = raw if isinstance(raw, dict) else {}
     return {
@@ -129,6 +184,10 @@ def _sanitize_settings(raw):
         "model_selection": source.get("model_selection") if source.get("model_selection") in MODEL_OPTIONS else DEFAULT_SETTINGS["model_selection"],
         "show_latency": _as_bool(source.get("show_latency"), DEFAULT_SETTINGS["show_latency"]),
         "corner": source.get("corner") if source.get("corner") in CORNER_OPTIONS else DEFAULT_SETTINGS["corner"],
+        **{
+            name: _optional_setting(source.get(name), *limits)
+            for name, limits in SENDER_SETTING_PREFERENCES.items()
+        },
     }
 
 
@@ -141,8 +200,39 @@ def _read_json(path):
         return None
 
 
+def _json_text(payload):
+    return json.dumps(payload, indent=2)
+
+
+def _read_text(path):
+    try:
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _write_text_atomic(path, text):
+    # Readers such as the sender see the old file or the new one, never half of one.
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
 def _write_json(path, payload):
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    # Leaves the file alone when it already holds this content.
+    text = _json_text(payload)
+    if _read_text(path) != text:
+        _write_text_atomic(path, text)
 
 
 def ensure_preferences_files():
@@ -157,16 +247,91 @@ def ensure_preferences_files():
     return defaults, user
 
 
-def save_user_preferences(preferences):
-    _write_json(USER_PREFERENCES_PATH, _sanitize_settings(preferences))
-
-
-def restart_current_process():
-    if getattr(sys, "frozen", False):
-        os.execv(sys.executable, [sys.executable] + sys.argv[1:])
-    else:
-        script_path = os.path.abspath(sys.argv[0])
-        os.execv(sys.executable, [sys.executable, script_path] + sys.argv[1:])
+class PreferencesStore:
+    # Saves preferences on a background thread so the GUI thread never waits on the
+    # disk. A change is written once no other change has followed for debounce_s, so
+    # dragging a slider writes the file once, when the drag stops. Writes are atomic
+    # and skipped when the file would not change. stop() writes anything pending, and
+    # flush() does so right away on the calling thread.
+    def __init__(self, path, debounce_s=PREFERENCES_DEBOUNCE_S):
+        self.path = Path(path)
+        self.debounce_s = debounce_s
+        self.writes = 0
+        self.error = None
+
+        self._pending = None
+        self._due = 0.0
+        self._written = None
+        self._cond = threading.Condition()
+        # Held for every write, so flush() also waits for one already under way.
+        self._write_lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="signflow-preferences", daemon=True)
+        self._thread.start()
+        return self
+
+    def save(self, preferences):
+        with self._cond:
+            self._pending = dict(preferences)
+            self._due = time.monotonic() + self.debounce_s
+            self._cond.notify_all()
+
+    def flush(self):
+        # E.g. before the file is read back: a change still waiting for the debounce
+        # would otherwise be missing from it.
+        with self._cond:
+            preferences, self._pending = self._pending, None
+        self._write_or_retry(preferences)
+
+    def stop(self, timeout=PREFERENCES_STOP_TIMEOUT_S):
+        # Pending changes are written before the thread exits.
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (self._pending is None or time.monotonic() < self._due):
+                    self._cond.wait(None if self._pending is None else self._due - time.monotonic())
+                if self._pending is None:
+                    return
+                preferences, self._pending = self._pending, None
+            self._write_or_retry(preferences)
+
+    def _write_or_retry(self, preferences):
+        try:
+            with self._write_lock:
+                if preferences is not None:
+                    self._write(preferences)
+        except OSError as exc:
+            self.error = str(exc) or type(exc).__name__
+            with self._cond:
+                # Try again later unless a newer change has replaced this one.
+                if self._pending is None and self._running:
+                    self._pending = preferences
+                    self._due = time.monotonic() + self.debounce_s
+                    self._cond.notify_all()
+
+    def _write(self, preferences):
+        text = _json_text(_sanitize_settings(preferences))
+        if self._written is None:
+            self._written = _read_text(self.path)
+        if text == self._written:
+            return
+        _write_text_atomic(self.path, text)
+        self._written = text
+        self.writes += 1
+        self.error = None
 
 
 class PrimaryPanel(QFrame):
@@ -176,6 +341,10 @@ class PrimaryPanel(QFrame):
     def __init__(self):
         super().__init__()
         self.user_box_size = DEFAULT_PRIMARY_BOX_SIZE
+        self.caption_height = None
+        self.panel_height = None
+        self.latency_height = 0
+        self.layout_cache = OrderedDict()
         self.setObjectName("primaryPanel")
         self.setFixedWidth(OVERLAY_WIDTH)
 
@@ -186,6 +355,18 @@ class PrimaryPanel(QFrame):
         self.caption_label = QLabel(LABEL_DEFAULT_TEXT)
         self.caption_label.setWordWrap(True)
         self.caption_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        self.caption_label.setContentsMargins(
+            CAPTION_HORIZONTAL_PADDING,
+            CAPTION_VERTICAL_PADDING // 2,
+            CAPTION_HORIZONTAL_PADDING,
+            CAPTION_VERTICAL_PADDING // 2,
+        )
+
+        self.latency_label = QLabel("")
+        self.latency_label.setWordWrap(True)
+        self.latency_label.setFont(QFont(FONT_FAMILY, LATENCY_FONT_SIZE))
+        self.latency_label.setContentsMargins(CAPTION_HORIZONTAL_PADDING, 0, CAPTION_HORIZONTAL_PADDING, 0)
+        self.latency_label.hide()
 
         self.toggle_button = QPushButton("▲")
         self.toggle_button.setFixedSize(BUTTON_WIDTH, BUTTON_HEIGHT)
@@ -201,7 +382,13 @@ class PrimaryPanel(QFrame):
         right_buttons.addWidget(self.quit_button)
         right_buttons.addStretch(1)
 
-        root.addWidget(self.caption_label, 1)
+        caption_column = QVBoxLayout()
+        caption_column.setSpacing(LATENCY_LABEL_SPACING)
+        caption_column.addWidget(self.caption_label)
+        caption_column.addWidget(self.latency_label)
+        caption_column.addStretch(1)
+
+        root.addLayout(caption_column, 1)
         root.addLayout(right_buttons)
 
         self.setStyleSheet(
@@ -228,44 +415,85 @@ class PrimaryPanel(QFrame):
         )
 
     def set_caption_text(self, text: str):
-        self.caption_label.setText(text or LABEL_DEFAULT_TEXT)
-        self._recompute_height()
+        text = text or LABEL_DEFAULT_TEXT
+        if text != self.caption_label.text():
+            self.caption_label.setText(text)
+        return self._recompute_height()
 
     def set_caption_font_size(self, size: int):
         self.caption_label.setFont(QFont(FONT_FAMILY, DEFAULT_FONT_SIZE))
-        self._recompute_height()
+        self.layout_cache.clear()
+        return self._recompute_height()
 
     def set_caption_box_size(self, size: int):
         self.user_box_size = max(PRIMARY_BOX_SIZE_MIN, min(PRIMARY_BOX_SIZE_MAX, int(size)))
-        self._recompute_height()
+        return self._recompute_height()
+
+    def set_latency_visible(self, visible: bool):
+        self.latency_label.setVisible(visible)
+        return self._update_latency_height()
+
+    def set_latency_text(self, text: str):
+        if text == self.latency_label.text():
+            return False
+        self.latency_label.setText(text)
+        return self._update_latency_height()
+
+    def _update_latency_height(self):
+        latency_height = 0
+        if not self.latency_label.isHidden():
+            metrics = QFontMetrics(self.latency_label.font())
+            width = self._caption_width() - (CAPTION_HORIZONTAL_PADDING * 2)
+            text_rect = metrics.boundingRect(0, 0, width, 10000, Qt.TextWordWrap, self.latency_label.text() or " ")
+            latency_height = text_rect.height() + LATENCY_LABEL_SPACING
+        if latency_height == self.latency_height:
+            return False
+        self.latency_height = latency_height
+        return self._recompute_height()
 
     def set_expanded_icon(self, expanded: bool):
         self.toggle_button.setText("▼" if expanded else "▲")
 
-    def _recompute_height(self):
+    def _measure_caption_height(self, text: str, width: int):
+        key = (text, width)
+        caption_height = self.layout_cache.get(key)
+        if caption_height is not None:
+            self.layout_cache.move_to_end(key)
+            return caption_height
+
+        metrics = QFontMetrics(self.caption_label.font())
+        text_rect = metrics.boundingRect(0, 0, width, 10000, Qt.TextWordWrap, text)
+        caption_height = max(text_rect.height() + CAPTION_VERTICAL_PADDING, metrics.height() + CAPTION_VERTICAL_PADDING)
+
+        self.layout_cache[key] = caption_height
+        if len(self.layout_cache) > CAPTION_LAYOUT_CACHE_SIZE:
+            self.layout_cache.popitem(last=False)
+        return caption_height
+
+    def _caption_width(self):
         width = self.caption_label.width()
         if width < 120:
             fallback = OVERLAY_WIDTH - (OUTER_PADDING * 2) - BUTTON_WIDTH - PRIMARY_INNER_SPACING - (CAPTION_HORIZONTAL_PADDING * 2)
             width = max(120, fallback)
+        return width
 
-        metrics = QFontMetrics(self.caption_label.font())
-        text_rect = metrics.boundingRect(0, 0, width, 10000, Qt.TextWordWrap, self.caption_label.text())
-        caption_height = max(text_rect.height() + CAPTION_VERTICAL_PADDING, metrics.height() + CAPTION_VERTICAL_PADDING)
-
-        self.caption_label.setMinimumHeight(caption_height)
-        self.caption_label.setMaximumHeight(caption_height)
-        self.caption_label.setContentsMargins(
-            CAPTION_HORIZONTAL_PADDING,
-            CAPTION_VERTICAL_PADDING // 2,
-            CAPTION_HORIZONTAL_PADDING,
-            CAPTION_VERTICAL_PADDING // 2,
-        )
+    def _recompute_height(self):
+        # Returns True when the panel height changed and the window geometry needs a refresh.
+        caption_height = self._measure_caption_height(self.caption_label.text(), self._caption_width())
+        if caption_height != self.caption_height:
+            self.caption_height = caption_height
+            self.caption_label.setMinimumHeight(caption_height)
+            self.caption_label.setMaximumHeight(caption_height)
 
         controls_height = (BUTTON_HEIGHT * 2) + BUTTON_COLUMN_SPACING
-        content_height = max(caption_height, controls_height)
+        content_height = max(caption_height + self.latency_height, controls_height)
         auto_height = (OUTER_PADDING * 2) + content_height
         panel_height = max(auto_height, self.user_box_size)
+        if panel_height == self.panel_height:
+            return False
+        self.panel_height = panel_height
         self.setFixedHeight(panel_height)
+        return True
 
 
 class ThemedCheckBox(QCheckBox):
@@ -349,7 +577,8 @@ class SecondaryPanel(QFrame):
         self.setFixedWidth(OVERLAY_WIDTH)
         self.setFixedHeight(0)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self._is_playing = False
+        # The sender starts recognizing as soon as it connects.
+        self._is_playing = True
 
         root = QVBoxLayout(self)
         root.setContentsMargins(OUTER_PADDING, OUTER_PADDING, OUTER_PADDING, OUTER_PADDING)
@@ -364,6 +593,8 @@ class SecondaryPanel(QFrame):
         self.crop_button.setMaximumHeight(SECONDARY_ACTION_BUTTON_SIZE)
         self.crop_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         self.crop_button.setFocusPolicy(Qt.NoFocus)
+        self.crop_button.setCheckable(True)
+        self.crop_button.setToolTip("Crop detection to the hands")
         self.crop_button.clicked.connect(self.crop_clicked.emit)
 
 
@@ -388,13 +619,8 @@ class SecondaryPanel(QFrame):
         self.clear_button.setIcon(self._build_clear_icon(SECONDARY_ACTION_ICON_SIZE))
         self._apply_play_pause_icon()
 
-        indicator_symbol = "●" if SECONDARY_ACTION_INDICATOR_ACTIVE else "○"
-        indicator_state = "Active" if SECONDARY_ACTION_INDICATOR_ACTIVE else "Inactive"
-        indicator_symbol_color = "rgb(80, 160, 255)" if SECONDARY_ACTION_INDICATOR_ACTIVE else "rgb(145, 145, 145)"
-        self.status_indicator = QLabel(
-            f"Status: {indicator_state} "
-            f"<span style=\"color:{indicator_symbol_color}; font-size:16px;\">{indicator_symbol}</span>"
-        )
+        self.status_indicator = QLabel("")
+        self.set_status("Active" if SECONDARY_ACTION_INDICATOR_ACTIVE else "Inactive", SECONDARY_ACTION_INDICATOR_ACTIVE)
         self.status_indicator.setObjectName("actionStatus")
         self.status_indicator.setAlignment(Qt.AlignCenter)
         self.status_indicator.setTextFormat(Qt.RichText)
@@ -430,9 +656,9 @@ class SecondaryPanel(QFrame):
         self.show_raw_tokens_checkbox = ThemedCheckBox("Show raw tokens")
         self.freeze_on_loss_checkbox = ThemedCheckBox("Freeze captions on detection loss")
 
-        self.restart_button = QPushButton("Restart")
-        self.restart_button.setObjectName("restartButton")
-        self.restart_button.setMinimumHeight(SECONDARY_CONTROL_MIN_HEIGHT)
+        self.reload_button = QPushButton("Reload Preferences")
+        self.reload_button.setObjectName("panelButton")
+        self.reload_button.setMinimumHeight(SECONDARY_CONTROL_MIN_HEIGHT)
 
         self.enable_llm_checkbox = ThemedCheckBox("Enable LLM smoothing")
 
@@ -445,14 +671,14 @@ class SecondaryPanel(QFrame):
         self.corner_combo.addItems(CORNER_OPTIONS)
 
         self.reset_preferences_button = QPushButton("Reset Preferences To Default")
-        self.reset_preferences_button.setObjectName("restartButton")
+        self.reset_preferences_button.setObjectName("panelButton")
         self.reset_preferences_button.setMinimumHeight(SECONDARY_CONTROL_MIN_HEIGHT)
 
         left_col.addLayout(self._labeled_row("Caption box size", self.caption_box_size_slider))
         left_col.addLayout(self._labeled_row("Overlay opacity", self.opacity_slider))
         left_col.addWidget(self.show_raw_tokens_checkbox)
         left_col.addWidget(self.freeze_on_loss_checkbox)
-        left_col.addWidget(self.restart_button)
+        left_col.addWidget(self.reload_button)
         left_col.addStretch(1)
 
         right_col.addWidget(self.enable_llm_checkbox)
@@ -540,7 +766,7 @@ class SecondaryPanel(QFrame):
                 margin: -5px 0;
                 border-radius: 8px;
             }}
-            QPushButton#restartButton {{
+            QPushButton#panelButton {{
                 background-color: {BUTTON_BG};
                 border: 1px solid {BORDER_COLOR};
                 border-radius: 8px;
@@ -548,7 +774,7 @@ class SecondaryPanel(QFrame):
                 font: 600 {SECONDARY_CONTROL_FONT_SIZE}px '{FONT_FAMILY}';
                 padding: 4px 10px;
             }}
-            QPushButton#restartButton:hover {{
+            QPushButton#panelButton:hover {{
                 background-color: {BUTTON_HOVER_BG};
             }}
             QPushButton#actionButton {{
@@ -561,6 +787,9 @@ class SecondaryPanel(QFrame):
             QPushButton#actionButton:hover {{
                 background-color: {BUTTON_HOVER_BG};
             }}
+            QPushButton#actionButton:checked {{
+                background-color: rgba(80, 160, 255, 90);
+            }}
             QPushButton#actionButton:focus {{
                 outline: none;
                 border: 1px solid {BORDER_COLOR};
@@ -670,6 +899,15 @@ class SecondaryPanel(QFrame):
         painter.end()
         return QIcon(pix)
 
+    def set_status(self, state: str, active: bool, details: str = ""):
+        symbol = "●" if active else "○"
+        symbol_color = "rgb(80, 160, 255)" if active else "rgb(145, 145, 145)"
+        self.status_indicator.setText(
+            f"Status: {state} "
+            f"<span style=\"color:{symbol_color}; font-size:16px;\">{symbol}</span>"
+        )
+        self.status_indicator.setToolTip(details)
+
     def _apply_play_pause_icon(self):
         if self._is_playing:
             self.play_pause_button.setIcon(self._build_pause_icon(SECONDARY_ACTION_ICON_SIZE))
@@ -690,17 +928,28 @@ class OverlayWindow(QWidget):
         self.preferences = preferences
         self.caption_text = LABEL_DEFAULT_TEXT
         self.caption_font_size = DEFAULT_FONT_SIZE
-        self.applied_caption_box_size = self.preferences["caption_box_size"]
-        self.pending_caption_box_size = self.preferences["caption_box_size"]
-        self.overlay_opacity = self.preferences["opacity_percent"] / 100.0
-        self.show_raw_tokens = self.preferences["show_raw_tokens"]
-        self.freeze_on_detection_loss = self.preferences["freeze_on_detection_loss"]
-        self.enable_llm_smoothing = self.preferences["enable_llm_smoothing"]
-        self.model_selection = self.preferences["model_selection"]
-        self.show_latency = self.preferences["show_latency"]
-        self.corner = self.preferences["corner"]
+        self._load_preferences(preferences)
+        self.preferences_store = PreferencesStore(USER_PREFERENCES_PATH).start()
+        self.roi_enabled = False
+        self.captions_playing = True
+        self.sender_status = None
+        # The settings the connected sender applies, from its status; None until it sent one.
+        self.sender_setting_names = None
+        # Command id -> (command, time.perf_counter() when sent), oldest first.
+        self.controls_in_flight = OrderedDict()
+        self.next_control_id = 1
+        self.last_control_ack = ""
         self.secondary_expanded = False
         self.secondary_current_height = 0
+        self.caption_server = None
+        # Stream id -> CaptionBuffer, in the order streams first appeared; a sender
+        # captioning a single stream sends no id and gets the lane None.
+        self.caption_lanes = {}
+        self.pending_caption_text = None
+        self.latency_tracker = LatencyTracker()
+        # Stamps of the newest caption received, then of the caption waiting to be painted.
+        self.pending_latency_stamps = None
+        self.unpainted_latency_stamps = None
 
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.setAttribute(Qt.WA_TranslucentBackground, True)
@@ -722,6 +971,17 @@ class OverlayWindow(QWidget):
         self.secondary_animation.valueChanged.connect(self.on_secondary_animation_value)
         self.secondary_animation.finished.connect(self.on_secondary_animation_finished)
 
+        # Captions that arrive while this timer runs are merged into one update per interval.
+        self.caption_coalesce_timer = QTimer(self)
+        self.caption_coalesce_timer.setSingleShot(True)
+        self.caption_coalesce_timer.setInterval(CAPTION_COALESCE_MS)
+        self.caption_coalesce_timer.timeout.connect(self._flush_pending_caption)
+
+        self.latency_refresh_timer = QTimer(self)
+        self.latency_refresh_timer.setInterval(LATENCY_REFRESH_MS)
+        self.latency_refresh_timer.timeout.connect(self._refresh_latency_text)
+        self.primary_panel.caption_label.installEventFilter(self)
+
         self._rebuild_stack()
         self._connect_signals()
         self.primary_panel.set_expanded_icon(self.secondary_expanded)
@@ -729,6 +989,7 @@ class OverlayWindow(QWidget):
 
         app = QApplication.instance()
         if app is not None:
+            app.aboutToQuit.connect(self.preferences_store.stop)
             app.screenAdded.connect(lambda _screen: self._position_window())
             app.screenRemoved.connect(lambda _screen: self._position_window())
 
@@ -736,8 +997,19 @@ class OverlayWindow(QWidget):
         if primary_screen is not None:
             primary_screen.geometryChanged.connect(lambda _rect: self._position_window())
 
+    def _load_preferences(self, preferences):
+        self.caption_box_size = preferences["caption_box_size"]
+        self.overlay_opacity = preferences["opacity_percent"] / 100.0
+        self.show_raw_tokens = preferences["show_raw_tokens"]
+        self.freeze_on_detection_loss = preferences["freeze_on_detection_loss"]
+        self.enable_llm_smoothing = preferences["enable_llm_smoothing"]
+        self.model_selection = preferences["model_selection"]
+        self.show_latency = preferences["show_latency"]
+        self.corner = preferences["corner"]
+        self.sender_settings = {name: preferences[name] for name in SENDER_SETTING_PREFERENCES}
+
     def _write_preferences(self):
-        self.preferences["caption_box_size"] = self.pending_caption_box_size
+        self.preferences["caption_box_size"] = self.caption_box_size
         self.preferences["opacity_percent"] = int(round(self.overlay_opacity * 100))
         self.preferences["show_raw_tokens"] = self.show_raw_tokens
         self.preferences["freeze_on_detection_loss"] = self.freeze_on_detection_loss
@@ -745,7 +1017,8 @@ class OverlayWindow(QWidget):
         self.preferences["model_selection"] = self.model_selection
         self.preferences["show_latency"] = self.show_latency
         self.preferences["corner"] = self.corner
-        save_user_preferences(self.preferences)
+        self.preferences.update(self.sender_settings)
+        self.preferences_store.save(self.preferences)
 
     def _connect_signals(self):
         self.primary_panel.toggle_requested.connect(self.toggle_secondary_panel)
@@ -759,7 +1032,7 @@ class OverlayWindow(QWidget):
         self.secondary_panel.model_combo.currentTextChanged.connect(self.on_model_changed)
         self.secondary_panel.show_latency_checkbox.toggled.connect(self.on_show_latency_toggled)
         self.secondary_panel.corner_combo.currentTextChanged.connect(self.on_corner_changed)
-        self.secondary_panel.restart_button.clicked.connect(self.on_restart_requested)
+        self.secondary_panel.reload_button.clicked.connect(self.on_reload_requested)
         self.secondary_panel.reset_preferences_button.clicked.connect(self.on_reset_preferences_requested)
         self.secondary_panel.crop_clicked.connect(self.on_crop_clicked)
         self.secondary_panel.play_pause_toggled.connect(self.on_play_pause_toggled)
@@ -844,12 +1117,14 @@ class OverlayWindow(QWidget):
             self._position_window()
 
     def apply_state_to_ui(self):
+        # Also used to apply settings in place (reset, reload), so the panel keeps
+        # whatever state it is in and only widgets whose value differs emit signals.
         self.primary_panel.set_caption_text(self.caption_text)
         self.primary_panel.set_caption_font_size(self.caption_font_size)
-        self.primary_panel.set_caption_box_size(self.applied_caption_box_size)
+        self.primary_panel.set_caption_box_size(self.caption_box_size)
         self.setWindowOpacity(self.overlay_opacity)
 
-        self.secondary_panel.caption_box_size_slider.setValue(self.pending_caption_box_size)
+        self.secondary_panel.caption_box_size_slider.setValue(self.caption_box_size)
         self.secondary_panel.opacity_slider.setValue(int(round(self.overlay_opacity * 100)))
         self.secondary_panel.show_raw_tokens_checkbox.setChecked(self.show_raw_tokens)
         self.secondary_panel.freeze_on_loss_checkbox.setChecked(self.freeze_on_detection_loss)
@@ -857,8 +1132,9 @@ class OverlayWindow(QWidget):
         self.secondary_panel.model_combo.setCurrentText(self.model_selection)
         self.secondary_panel.show_latency_checkbox.setChecked(self.show_latency)
         self.secondary_panel.corner_combo.setCurrentText(self.corner)
+        self._apply_show_latency()
 
-        self._set_secondary_height(0, force_hide=True)
+        self._set_secondary_height(self.secondary_current_height, force_hide=not self.secondary_expanded)
         self._refresh_window_geometry(reposition=True)
 
     def on_secondary_animation_value(self, value):
@@ -871,7 +1147,9 @@ class OverlayWindow(QWidget):
             self._update_mask()
 
     def on_caption_box_size_changed(self, value: int):
-        self.pending_caption_box_size = max(PRIMARY_BOX_SIZE_MIN, min(PRIMARY_BOX_SIZE_MAX, int(value)))
+        self.caption_box_size = max(PRIMARY_BOX_SIZE_MIN, min(PRIMARY_BOX_SIZE_MAX, int(value)))
+        if self.primary_panel.set_caption_box_size(self.caption_box_size):
+            self._refresh_window_geometry(reposition=True)
         self._write_preferences()
 
     def on_opacity_changed(self, value: int):
@@ -887,48 +1165,254 @@ class OverlayWindow(QWidget):
     def on_freeze_on_loss_toggled(self, checked: bool):
         self.freeze_on_detection_loss = checked
         self._write_preferences()
+        self._send_control(self._settings_command())
 
     def on_enable_llm_toggled(self, checked: bool):
+        # LLM smoothing is an overlay preference only; the sender has no such setting.
         self.enable_llm_smoothing = checked
         self._write_preferences()
 
     def on_model_changed(self, text: str):
         self.model_selection = text
         self._write_preferences()
+        # The sender loads the model in the background and swaps it in between frames.
+        self._send_control(self._model_command())
 
     def on_show_latency_toggled(self, checked: bool):
         self.show_latency = checked
+        self._apply_show_latency()
+        if self.primary_panel.panel_height is not None:
+            self._refresh_window_geometry(reposition=True)
         self._write_preferences()
 
+    def _apply_show_latency(self):
+        self.pending_latency_stamps = self.unpainted_latency_stamps = None
+        if self.show_latency:
+            self.latency_tracker.reset()
+            self.primary_panel.set_latency_text(format_latency_summary(self.latency_tracker.summary()))
+            self.latency_refresh_timer.start()
+        else:
+            self.latency_refresh_timer.stop()
+        self.primary_panel.set_latency_visible(self.show_latency)
+
+    def _refresh_latency_text(self):
+        if self.primary_panel.set_latency_text(format_latency_summary(self.latency_tracker.summary())):
+            self._refresh_window_geometry(reposition=True)
+
+    def eventFilter(self, watched, event):
+        if (
+            event.type() == QEvent.Paint
+            and self.unpainted_latency_stamps is not None
+            and watched is self.primary_panel.caption_label
+        ):
+            stamps = self.unpainted_latency_stamps
+            self.unpainted_latency_stamps = None
+            stamps.append(time.perf_counter())
+            self.latency_tracker.record(stamps)
+        return super().eventFilter(watched, event)
+
     def on_corner_changed(self, text: str):
         self.corner = text
         self._rebuild_stack()
         self._refresh_window_geometry(reposition=True)
         self._write_preferences()
 
-    def on_restart_requested(self):
+    def on_reload_requested(self):
+        # Picks up user_preferences.json as it is on disk, e.g. after editing it by hand.
+        # A change made moments ago is written first, so reloading does not undo it.
+        self.preferences_store.flush()
+        raw = _read_json(self.preferences_store.path)
+        self.apply_preferences(_sanitize_settings(raw if raw is not None else self.defaults))
+
+    def apply_preferences(self, preferences):
+        # Applies a full set of preferences in place; captions and the sender
+        # connection are left alone.
+        corner = self.corner
+        settings = self._settings_command()
+        self._load_preferences(preferences)
+        if self.corner != corner:
+            self._rebuild_stack()
+        self.apply_state_to_ui()
         self._write_preferences()
-        restart_current_process()
+        if self._settings_command() != settings:
+            self._send_control(self._settings_command())
 
     def on_crop_clicked(self):
-        pass
-
-    def on_play_pause_toggled(self, _is_playing: bool):
-        pass
+        self.roi_enabled = self.secondary_panel.crop_button.isChecked()
+        self._send_control(self._roi_command())
+
+    def _roi_command(self):
+        return {"command": CONTROL_ROI, "enabled": self.roi_enabled}
+
+    def _send_control(self, command, socket=None):
+        # Sends to one sender or all of them; returns how many it reached. The id lets
+        # the sender's acknowledgement be matched to the command and timed.
+        if self.caption_server is None:
+            return 0
+        command_id = self.next_control_id
+        self.next_control_id += 1
+        sent_at = time.perf_counter()
+        command = dict(command, id=command_id)
+        if socket is not None:
+            sent = int(self.caption_server.send(socket, MSG_CONTROL, command))
+        else:
+            sent = self.caption_server.broadcast(MSG_CONTROL, command)
+        if sent:
+            # Acks are handled on this thread too, so none can arrive before this.
+            self.controls_in_flight[command_id] = (command["command"], sent_at)
+            while len(self.controls_in_flight) > CONTROL_IN_FLIGHT_LIMIT:
+                self.controls_in_flight.popitem(last=False)
+        return sent
+
+    def _on_control_ack(self, ack):
+        sent = self.controls_in_flight.pop(ack.get("id"), None)
+        if sent is None:
+            # Unknown, or another sender acknowledged the same broadcast first.
+            return
+        command, sent_at = sent
+        round_trip_ms = (time.perf_counter() - sent_at) * 1000.0
+        if ack.get("ok") is True:
+            text = f"{command} applied in {round_trip_ms:.0f} ms"
+        else:
+            text = f"{command} failed after {round_trip_ms:.0f} ms"
+        if isinstance(ack.get("detail"), str):
+            text = f"{text}: {ack['detail']}"
+        if isinstance(ack.get("ignored"), list):
+            text = f"{text} (not used by the sender: {', '.join(str(name) for name in ack['ignored'])})"
+        self.last_control_ack = text
+        self._show_sender_status()
+
+    def _on_client_ready(self, socket):
+        # Senders that (re)connect pick up the current crop mode, play state and model;
+        # settings follow once their status says which ones they apply.
+        self._send_control(self._roi_command(), socket)
+        self._send_control(self._playback_command(), socket)
+        self._send_control(self._model_command(), socket)
+        self.sender_setting_names = None
+
+    def on_play_pause_toggled(self, is_playing: bool):
+        self.captions_playing = is_playing
+        self._send_control(self._playback_command())
+
+    def _playback_command(self):
+        return {"command": CONTROL_PLAYBACK, "playing": self.captions_playing}
+
+    def _model_command(self):
+        return {"command": CONTROL_MODEL, "name": self.model_selection}
+
+    def _settings_command(self):
+        settings = {"freeze_on_detection_loss": self.freeze_on_detection_loss}
+        settings.update((name, value) for name, value in self.sender_settings.items() if value is not None)
+        if self.sender_setting_names is not None:
+            settings = {name: value for name, value in settings.items() if name in self.sender_setting_names}
+        return {"command": CONTROL_SETTINGS, "settings": settings}
 
     def on_clear_clicked(self):
-        pass
+        # A sender clears its captions and sends the empty text back, so the lanes
+        # stay in step with it; only without one are they cleared here.
+        if self._send_control({"command": CONTROL_CLEAR}):
+            return
+        self.caption_lanes.clear()
+        self.queue_caption_text("")
 
     def on_reset_preferences_requested(self):
         defaults = _read_json(DEFAULT_SETTINGS_PATH)
-        normalized_defaults = _sanitize_settings(defaults if defaults is not None else DEFAULT_SETTINGS)
-        save_user_preferences(normalized_defaults)
-        restart_current_process()
+        self.defaults = _sanitize_settings(defaults if defaults is not None else DEFAULT_SETTINGS)
+        self.apply_preferences(self.defaults)
+
+    def start_caption_server(self, server_name: str = IPC_SERVER_NAME):
+        self.caption_server = OverlayServer(server_name, parent=self)
+        self.caption_server.message_received.connect(self.on_ipc_message)
+        self.caption_server.client_ready.connect(self._on_client_ready)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.caption_server.close)
+        return self.caption_server.listen()
+
+    def on_ipc_message(self, message):
+        if message.type == MSG_CAPTION:
+            self.queue_caption_text(message.payload.decode("utf-8", errors="replace"))
+        elif message.type == MSG_CAPTION_DELTA:
+            received_at = time.perf_counter()
+            delta = decode_json(message.payload)
+            if not isinstance(delta, dict) or not self._caption_lane(delta.get("stream")).apply(delta):
+                return
+            stamps = delta.get("stamps")
+            if self.show_latency and valid_sender_stamps(stamps):
+                stamps.append(received_at)
+                self.pending_latency_stamps = stamps
+            self.queue_caption_text(self._caption_lanes_text())
+        elif message.type == MSG_STATUS:
+            status = decode_json(message.payload)
+            if isinstance(status, dict) and status.get("state") in SENDER_STATUS_LABELS:
+                self.apply_sender_status(status)
+        elif message.type == MSG_CONTROL_ACK:
+            ack = decode_json(message.payload)
+            if isinstance(ack, dict):
+                self._on_control_ack(ack)
+
+    def _caption_lane(self, stream):
+        stream = None if stream is None else str(stream)
+        lane = self.caption_lanes.get(stream)
+        if lane is None:
+            # A sender either names all its streams or none, so a lane of the other
+            # kind is left over from a sender that has been restarted since.
+            for stale in [name for name in self.caption_lanes if (name is None) != (stream is None)]:
+                del self.caption_lanes[stale]
+            lane = self.caption_lanes[stream] = CaptionBuffer()
+        return lane
+
+    def _caption_lanes_text(self):
+        if len(self.caption_lanes) == 1:
+            return next(iter(self.caption_lanes.values())).visible
+        return "\n".join(f"{name}: {lane.visible[-CAPTION_LANE_CHARS:]}" for name, lane in self.caption_lanes.items())
+
+    def apply_sender_status(self, status):
+        self.sender_status = status
+        names = status.get("settings")
+        if isinstance(names, list) and names != self.sender_setting_names:
+            self.sender_setting_names = names
+            self._send_control(self._settings_command())
+        self._show_sender_status()
+
+    def _show_sender_status(self):
+        status = self.sender_status
+        if status is None:
+            return
+        state = status["state"]
+        details = status.get("detail") if isinstance(status.get("detail"), str) else ""
+        if isinstance(status.get("model"), str):
+            details = f"Model: {status['model']}\n{details}" if details else f"Model: {status['model']}"
+        timings = status.get("timings_ms")
+        if isinstance(timings, dict):
+            summary = ", ".join(
+                f"{name} {value:.0f} ms" for name, value in timings.items() if isinstance(value, (int, float))
+            )
+            details = f"{details}\n{summary}" if details else summary
+        if self.last_control_ack:
+            details = f"{details}\n{self.last_control_ack}" if details else self.last_control_ack
+        self.secondary_panel.set_status(SENDER_STATUS_LABELS[state], state == STATUS_READY, details)
+
+    def queue_caption_text(self, text: str):
+        self.pending_caption_text = text
+        if not self.caption_coalesce_timer.isActive():
+            self._flush_pending_caption()
+
+    def _flush_pending_caption(self):
+        if self.pending_caption_text is None:
+            return
+        text = self.pending_caption_text
+        self.pending_caption_text = None
+        if self.pending_latency_stamps is not None:
+            self.unpainted_latency_stamps = self.pending_latency_stamps
+            self.pending_latency_stamps = None
+        self.set_caption_text(text)
+        self.caption_coalesce_timer.start()
 
     def set_caption_text(self, text: str):
         self.caption_text = text or LABEL_DEFAULT_TEXT
-        self.primary_panel.set_caption_text(self.caption_text)
-        self._refresh_window_geometry(reposition=True)
+        if self.primary_panel.set_caption_text(self.caption_text):
+            self._refresh_window_geometry(reposition=True)
 
     def toggle_secondary_panel(self):
         if ENABLE_COLLAPSE_ANIMATION and self.secondary_animation.state() == QAbstractAnimation.Running:
@@ -958,6 +1442,7 @@ def main():
     app.setQuitOnLastWindowClosed(True)
 
     overlay = OverlayWindow(defaults=defaults, preferences=preferences)
+    overlay.start_caption_server()
     overlay.show()
     overlay.raise_()
 
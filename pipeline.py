@@ -0,0 +1,770 @@
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from features import HAND_LANDMARK_COUNT, FeatureWindow, HandFeatureExtractor
+from recording import record_labels
+
+PREDICTION_THRESHOLD = 0.7
+MIN_STABLE_FRAMES_FOR_APPEND = 4
+NO_HAND_FRAMES_TO_RESET_REPEAT_LOCK = 6
+# Evidence-based committing: the time constant of the probability average, the
+# smoothed probability above which a label gains evidence, the evidence (milliseconds
+# at probability 1 above that line) that commits it, and how long the hands must be
+# gone before the same label can be committed again.
+EVIDENCE_SMOOTHING_MS = 10.0
+EVIDENCE_BASELINE = 0.55
+COMMIT_EVIDENCE_MS = 30.0
+NO_HAND_MS_TO_RESET_REPEAT_LOCK = 200.0
+# Settings the overlay can change while the sender runs: name -> (type, lowest,
+# highest). The first two belong to the pipeline, the rest to the committer, and a
+# committer setting is refused when the committer in use does not have it. The
+# threshold only decides what is shown as "Uncertain"; an EvidenceCommitter goes by
+# its baseline, and at one half or above only one label can gain evidence at a time.
+PIPELINE_SETTINGS = ("threshold", "freeze_on_detection_loss")
+RUNTIME_SETTINGS = {
+    "threshold": (float, 0.0, 1.0),
+    "freeze_on_detection_loss": (bool, None, None),
+    "smoothing_ms": (float, 1.0, 2000.0),
+    "baseline": (float, 0.5, 0.99),
+    "commit_ms": (float, 1.0, 5000.0),
+    "reset_ms": (float, 0.0, 60000.0),
+    "min_stable_frames": (int, 1, 300),
+    "reset_frames": (int, 1, 300),
+}
+MAX_NUM_HANDS = 2
+MIN_DETECTION_CONFIDENCE = 0.7
+MIN_TRACKING_CONFIDENCE = 0.7
+# ROI mode: the padded box around the last hands, as a fraction of the box side per
+# edge; the smallest box as a fraction of the frame's shorter side; how much a box
+# grows per frame without hands, and after how many such frames the full frame is used.
+ROI_PADDING = 0.35
+ROI_MIN_SIDE = 0.3
+ROI_GROWTH = 1.5
+ROI_MAX_MISSES = 2
+# Adaptive scheduling: after IDLE_AFTER_NO_HAND_FRAMES frames without hands only every
+# IDLE_DETECT_EVERY-th frame is detected. A frame held back in between is detected
+# after all if some cell of its STILL_THUMBNAIL_SIZE thumbnail differs by more than
+# STILL_FRAME_TOLERANCE gray levels from the last frame detected without hands. A pose
+# whose raw landmarks all stay within STATIC_POSE_TOLERANCE of the last classified
+# pose reuses that classification.
+IDLE_AFTER_NO_HAND_FRAMES = 8
+IDLE_DETECT_EVERY = 3
+STILL_THUMBNAIL_SIZE = (32, 24)
+STILL_FRAME_TOLERANCE = 12
+STATIC_POSE_TOLERANCE = 0.004
+# Detection sees the camera image unmirrored; landmarks and handedness are mirrored
+# afterwards to match the selfie view the model was trained on.
+MIRRORED_HANDEDNESS = {"Right": "Left", "Left": "Right"}
+
+# Stamps in FrameResult.stamps, one per stage; the first four of latency.LATENCY_STAGES.
+PIPELINE_STAGES = ("capture", "detect", "features", "classify")
+
+FrameResult = collections.namedtuple("FrameResult", "frame text committed_label stamps")
+
+
+def create_hands_detector():
+    import mediapipe as mp
+
+    return mp.solutions.hands.Hands(
+        static_image_mode=False,
+        max_num_hands=MAX_NUM_HANDS,
+        min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+        min_tracking_confidence=MIN_TRACKING_CONFIDENCE,
+    )
+
+
+def landmark_drawer():
+    import mediapipe as mp
+
+    draw_landmarks = mp.solutions.drawing_utils.draw_landmarks
+    connections = mp.solutions.hands.HAND_CONNECTIONS
+
+    def draw(frame, multi_hand_landmarks):
+        for hand_landmarks in multi_hand_landmarks:
+            draw_landmarks(frame, hand_landmarks, connections)
+
+    return draw
+
+
+class FramePreprocessor:
+    # Turns a BGR frame (or crop) into the RGB image handed to the detector, shrunk
+    # so its longer side is at most max_side. Both steps write into reused storage,
+    # so the returned array is only valid until the next call.
+    def __init__(self, max_side=None):
+        self.max_side = max_side
+        self._storage = [np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.uint8)]
+
+    def _buffer(self, index, shape):
+        # A contiguous view of the first bytes of a buffer that only ever grows, so
+        # crops of changing size do not reallocate.
+        size = shape[0] * shape[1] * shape[2]
+        if self._storage[index].size < size:
+            self._storage[index] = np.empty(size, dtype=np.uint8)
+        return self._storage[index][:size].reshape(shape)
+
+    def scale(self, width, height):
+        longest = max(width, height)
+        if not self.max_side or longest <= self.max_side:
+            return 1.0
+        return self.max_side / longest
+
+    def prepare(self, bgr):
+        height, width = bgr.shape[:2]
+        scale = self.scale(width, height)
+        if scale < 1.0:
+            size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            resized = self._buffer(0, (size[1], size[0], 3))
+            cv2.resize(bgr, size, dst=resized, interpolation=cv2.INTER_AREA)
+            bgr = resized
+        rgb = self._buffer(1, bgr.shape)
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
+
+
+def validate_setting(name, value):
+    # Returns the value as the setting's type, or raises ValueError.
+    kind, low, high = RUNTIME_SETTINGS[name]
+    if kind is bool:
+        if not isinstance(value, bool):
+            raise ValueError(f"{name} must be true or false")
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or (kind is int and value != int(value)):
+        raise ValueError(f"{name} must be {'an integer' if kind is int else 'a number'}")
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return kind(value)
+
+
+class StableLabelCommitter:
+    # A label is committed once it has been detected for min_stable_frames frames in a
+    # row. The same label is not committed twice until the hand has been gone for
+    # reset_frames frames. update() gets the label above the threshold (None without
+    # one), the frame's Prediction (None without hands) and its capture time; this
+    # committer only counts labels. note_gap() is a frame without hands that leaves
+    # the candidate alone (see freeze_on_detection_loss).
+    def __init__(self, min_stable_frames=MIN_STABLE_FRAMES_FOR_APPEND, reset_frames=NO_HAND_FRAMES_TO_RESET_REPEAT_LOCK):
+        self.min_stable_frames = min_stable_frames
+        self.reset_frames = reset_frames
+        self.reset()
+
+    def reset(self):
+        self.candidate_label = None
+        self.candidate_stable_frames = 0
+        self.last_appended_label = None
+        self.no_hand_frames = 0
+
+    def update(self, detected_label, prediction=None, stamp=None):
+        if not detected_label:
+            self.candidate_label = None
+            self.candidate_stable_frames = 0
+            self.note_gap(stamp)
+            return None
+
+        self.no_hand_frames = 0
+        if detected_label == self.candidate_label:
+            self.candidate_stable_frames += 1
+        else:
+            self.candidate_label = detected_label
+            self.candidate_stable_frames = 1
+
+        if self.candidate_stable_frames >= self.min_stable_frames and detected_label != self.last_appended_label:
+            self.last_appended_label = detected_label
+            self.candidate_label = None
+            self.candidate_stable_frames = 0
+            return detected_label
+        return None
+
+    def note_gap(self, stamp=None):
+        self.no_hand_frames += 1
+        if self.no_hand_frames >= self.reset_frames:
+            self.last_appended_label = None
+
+
+class EvidenceCommitter:
+    # Commits on evidence accumulated over time instead of a count of identical
+    # frames. The whole probability vector is averaged with a time constant of
+    # smoothing_ms, so the frame rate does not change how quickly it reacts. Each
+    # label's evidence grows by (average - baseline) per millisecond and shrinks
+    # while the average is below baseline; the first label to reach commit_ms is
+    # committed and all evidence starts over. A single misread frame costs a few
+    # milliseconds instead of restarting the count, and with baseline at one half or
+    # above only one label can gain at a time. Uncertain frames count with their
+    # probabilities. As with StableLabelCommitter the same label is not committed
+    # twice until the hands have been gone for reset_ms. note_gap() counts a frame
+    # without hands towards that but keeps the average and the evidence, and the gap
+    # earns none.
+    def __init__(
+        self,
+        smoothing_ms=EVIDENCE_SMOOTHING_MS,
+        baseline=EVIDENCE_BASELINE,
+        commit_ms=COMMIT_EVIDENCE_MS,
+        reset_ms=NO_HAND_MS_TO_RESET_REPEAT_LOCK,
+    ):
+        self.smoothing_ms = smoothing_ms
+        self.baseline = baseline
+        self.commit_ms = commit_ms
+        self.reset_ms = reset_ms
+        self.reset()
+
+    def reset(self):
+        self.labels = None
+        self.smoothed = None
+        self.evidence = None
+        self.last_appended_label = None
+        self._average = None
+        self._step = None
+        self._gain = None
+        self._last_stamp = None
+        self._hand_lost_at = None
+
+    def _start(self, prediction):
+        if prediction.labels is not self.labels:
+            self.labels = prediction.labels
+            self._average = np.empty(len(self.labels), dtype=np.float64)
+            self.evidence = np.empty_like(self._average)
+            self._step = np.empty_like(self._average)
+            self._gain = np.empty_like(self._average)
+        self.smoothed = self._average
+        np.copyto(self.smoothed, prediction.probabilities)
+        self.evidence.fill(0.0)
+
+    def update(self, detected_label, prediction=None, stamp=None):
+        if stamp is None:
+            stamp = time.monotonic()
+        if prediction is None:
+            self.note_gap(stamp)
+            # Evidence does not carry over a gap without hands.
+            self.smoothed = None
+            return None
+
+        self._hand_lost_at = None
+        if self.smoothed is None or prediction.labels is not self.labels:
+            # First frame with hands, or a swapped model: nothing has built up yet.
+            self._start(prediction)
+            self._last_stamp = stamp
+            return None
+
+        elapsed_ms = max(0.0, (stamp - self._last_stamp) * 1000.0)
+        self._last_stamp = stamp
+        step, gain = self._step, self._gain
+        np.subtract(prediction.probabilities, self.smoothed, out=step)
+        step *= 1.0 - np.exp(-elapsed_ms / self.smoothing_ms)
+        # Evidence goes by the mean of the old and new average over the interval, so
+        # one misread frame counts for less than its whole interval at low frame rates.
+        np.multiply(step, 0.5, out=gain)
+        gain += self.smoothed
+        gain -= self.baseline
+        gain *= elapsed_ms
+        self.smoothed += step
+        evidence = self.evidence
+        evidence += gain
+        np.clip(evidence, 0.0, self.commit_ms, out=evidence)
+        leader = int(np.argmax(evidence))
+        if evidence[leader] < self.commit_ms:
+            return None
+        evidence.fill(0.0)
+        label = self.labels[leader]
+        if label == self.last_appended_label:
+            return None
+        self.last_appended_label = label
+        return label
+
+    def note_gap(self, stamp=None):
+        if stamp is None:
+            stamp = time.monotonic()
+        if self._hand_lost_at is None:
+            self._hand_lost_at = stamp
+        if (stamp - self._hand_lost_at) * 1000.0 >= self.reset_ms:
+            self.last_appended_label = None
+        if self.smoothed is not None:
+            self._last_stamp = stamp
+
+
+class HandRegionTracker:
+    # Square crop box in pixels around the hands found in the previous frame.
+    def __init__(self, padding=ROI_PADDING, min_side=ROI_MIN_SIDE, growth=ROI_GROWTH, max_misses=ROI_MAX_MISSES):
+        self.padding = padding
+        self.min_side = min_side
+        self.growth = growth
+        self.max_misses = max_misses
+        self.center = None
+        self.side = 0.0
+        self.misses = 0
+
+    def reset(self):
+        self.center = None
+        self.misses = 0
+
+    def region(self, width, height):
+        # (x0, y0, x1, y1) to crop, or None to use the full frame.
+        if self.center is None:
+            return None
+        side = int(round(self.side))
+        if side >= width and side >= height:
+            return None
+        crop_w = min(side, width)
+        crop_h = min(side, height)
+        x0 = min(max(int(round(self.center[0] - crop_w / 2)), 0), width - crop_w)
+        y0 = min(max(int(round(self.center[1] - crop_h / 2)), 0), height - crop_h)
+        return x0, y0, x0 + crop_w, y0 + crop_h
+
+    def update(self, multi_hand_landmarks, width, height):
+        if not multi_hand_landmarks:
+            self.misses += 1
+            if self.center is not None and self.misses <= self.max_misses:
+                self.side *= self.growth
+            else:
+                self.center = None
+            return
+
+        self.misses = 0
+        x_min = y_min = float("inf")
+        x_max = y_max = float("-inf")
+        for hand_landmarks in multi_hand_landmarks:
+            for lm in hand_landmarks.landmark:
+                x_min = min(x_min, lm.x)
+                x_max = max(x_max, lm.x)
+                y_min = min(y_min, lm.y)
+                y_max = max(y_max, lm.y)
+        box_side = max((x_max - x_min) * width, (y_max - y_min) * height)
+        self.center = ((x_min + x_max) / 2 * width, (y_min + y_max) / 2 * height)
+        self.side = max(box_side * (1.0 + 2.0 * self.padding), self.min_side * min(width, height))
+
+
+class DetectionScheduler:
+    # Frames skipped while idle are held back rather than dropped. When the next
+    # frame is due, the held ones that still look like the last frame detected
+    # without hands are passed over; from the first that changed on, the held frames
+    # are detected oldest first and the due frame after them. The detector and the
+    # committer see every frame in order, so commits land on the same frames.
+    # IDLE_DETECT_EVERY stays below MIN_STABLE_FRAMES_FOR_APPEND for that reason.
+    def __init__(
+        self,
+        idle_after=IDLE_AFTER_NO_HAND_FRAMES,
+        idle_every=IDLE_DETECT_EVERY,
+        static_tolerance=STATIC_POSE_TOLERANCE,
+        still_tolerance=STILL_FRAME_TOLERANCE,
+    ):
+        self.idle_after = idle_after
+        self.idle_every = idle_every
+        self.static_tolerance = static_tolerance
+        self.still_tolerance = still_tolerance
+        self.no_hand_frames = 0
+        self.deferred = []
+        self.skipped_detections = 0
+        self.catch_up_detections = 0
+        self.reused_classifications = 0
+        self._still_frame = None
+        self._anchor = np.zeros((2, HAND_LANDMARK_COUNT, 3), dtype=np.float32)
+        self._anchor_hands = None
+        self._difference = np.zeros_like(self._anchor)
+
+    def reset(self):
+        self.no_hand_frames = 0
+        self.deferred = []
+        self._still_frame = None
+        self.forget_pose()
+
+    def forget_pose(self):
+        # The next pose is classified even if it has not moved.
+        self._anchor_hands = None
+
+    @property
+    def idle(self):
+        return self.no_hand_frames >= self.idle_after
+
+    def defer(self, item):
+        if not self.idle or len(self.deferred) + 1 >= self.idle_every:
+            return False
+        self.deferred.append(item)
+        return True
+
+    def take_deferred(self, still):
+        # The first `still` held items cannot show hands and are not detected.
+        deferred, self.deferred = self.deferred, []
+        self.skipped_detections += still
+        self.catch_up_detections += len(deferred) - still
+        return deferred
+
+    def note_detected(self, frame, has_hands):
+        self._still_frame = None if has_hands else frame
+
+    def still_frames(self, frames):
+        # How many of the frames, from the first, look like the last frame detected
+        # without hands; a hand cannot have appeared in those.
+        if self._still_frame is None:
+            return 0
+        reference = _still_thumbnail(self._still_frame)
+        for index, frame in enumerate(frames):
+            if np.abs(_still_thumbnail(frame) - reference).max() > self.still_tolerance:
+                return index
+        return len(frames)
+
+    def observe(self, has_hands):
+        self.no_hand_frames = 0 if has_hands else self.no_hand_frames + 1
+        if not has_hands:
+            self._anchor_hands = None
+
+    def is_static(self, landmarks, hands_loaded):
+        # Compares raw landmarks with the last classified pose; a moved pose becomes the new anchor.
+        if hands_loaded == self._anchor_hands:
+            np.subtract(landmarks, self._anchor, out=self._difference)
+            np.abs(self._difference, out=self._difference)
+            if self._difference.max() <= self.static_tolerance:
+                self.reused_classifications += 1
+                return True
+        np.copyto(self._anchor, landmarks)
+        self._anchor_hands = hands_loaded
+        return False
+
+    def stats(self):
+        return {
+            "skipped_detections": self.skipped_detections,
+            "catch_up_detections": self.catch_up_detections,
+            "reused_classifications": self.reused_classifications,
+        }
+
+
+def _still_thumbnail(frame):
+    thumbnail = cv2.resize(frame, STILL_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    if thumbnail.ndim == 3:
+        thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+    return thumbnail.astype(np.int16)
+
+
+def remap_landmarks(multi_hand_landmarks, region, width, height):
+    # Converts landmarks normalized to a crop back to full-frame normalized coordinates.
+    # MediaPipe scales z like x, so it follows the horizontal scale.
+    x0, y0, x1, y1 = region
+    scale_x = (x1 - x0) / width
+    scale_y = (y1 - y0) / height
+    offset_x = x0 / width
+    offset_y = y0 / height
+    for hand_landmarks in multi_hand_landmarks:
+        for lm in hand_landmarks.landmark:
+            lm.x = offset_x + lm.x * scale_x
+            lm.y = offset_y + lm.y * scale_y
+            lm.z = lm.z * scale_x
+
+
+def mirror_landmarks(multi_hand_landmarks, multi_handedness):
+    # What detection on a horizontally flipped frame would report, without flipping pixels.
+    for hand_landmarks in multi_hand_landmarks:
+        for lm in hand_landmarks.landmark:
+            lm.x = 1.0 - lm.x
+    for handedness in multi_handedness or ():
+        for category in handedness.classification:
+            category.label = MIRRORED_HANDEDNESS.get(category.label, category.label)
+
+
+class RecognitionPipeline:
+    # The per-frame work of the sender: detect hands, mirror them, extract features,
+    # classify and decide whether a label is committed. The detector only needs a
+    # MediaPipe-style process(rgb) method, so tests and benchmarks can swap it out.
+    # In ROI mode detection runs on a crop around the previous frame's hands and the
+    # landmarks are mapped back, so everything after detection sees full-frame values.
+    # With a DetectionScheduler, idle frames may be held back: process() then returns
+    # a "No Hand" result and the frame reaches the committer with a later call.
+    # Frames are never copied unless draw_landmarks is set, in which case the result
+    # carries a mirrored preview with the landmarks drawn on it.
+    # A windowed engine (motion signs) is fed from a FeatureWindow instead of single
+    # frames; losing the hands starts a new window. With freeze_on_detection_loss
+    # frames without hands reach the committer only as note_gap(), so a dropout does
+    # not lose the sign being built up, while a long one still unlocks a repeat.
+    # Other threads change the pipeline through call_between_frames(): engine
+    # swaps, settings and commit resets run on the recognition thread before the
+    # next frame, so capture never waits for them. When no frame is coming, e.g.
+    # while paused, run_between_frames() runs them on the calling thread instead.
+    def __init__(
+        self,
+        detector,
+        engine,
+        extractor=None,
+        committer=None,
+        threshold=PREDICTION_THRESHOLD,
+        draw_landmarks=None,
+        recorder=None,
+        roi_enabled=False,
+        scheduler=None,
+        preprocessor=None,
+        clock=time.perf_counter,
+    ):
+        self.detector = detector
+        self.engine = engine
+        self.extractor = extractor if extractor is not None else HandFeatureExtractor()
+        self.committer = committer if committer is not None else EvidenceCommitter()
+        self.threshold = threshold
+        self.freeze_on_detection_loss = False
+        self.draw_landmarks = draw_landmarks
+        self.recorder = recorder
+        self.roi_enabled = roi_enabled
+        self.region_tracker = HandRegionTracker()
+        self.region = None
+        self.scheduler = scheduler
+        self.preprocessor = preprocessor if preprocessor is not None else FramePreprocessor()
+        self.window = FeatureWindow()
+        self.clock = clock
+        self._last_text = "No Hand"
+        self._last_label = None
+        self._last_prediction = None
+        self._pending_calls = []
+        self._pending_lock = threading.Lock()
+        # Held while a frame is recognized.
+        self._frame_lock = threading.Lock()
+
+    def reset(self):
+        # Forgets everything carried between frames, e.g. when capture resumes after a pause.
+        self.committer.reset()
+        self.region_tracker.reset()
+        if self.scheduler is not None:
+            self.scheduler.reset()
+        self.window.clear()
+        self._last_text = "No Hand"
+        self._last_label = None
+        self._last_prediction = None
+
+    def call_between_frames(self, fn):
+        # May be called from another thread; fn() runs on the recognition thread
+        # before the next frame. Calls run in the order they were made.
+        with self._pending_lock:
+            self._pending_calls.append(fn)
+
+    def _run_pending_calls(self):
+        with self._pending_lock:
+            calls, self._pending_calls = self._pending_calls, []
+        for fn in calls:
+            fn()
+
+    def run_between_frames(self):
+        # Runs the queued calls now, once a frame being recognized has finished.
+        with self._frame_lock:
+            self._run_pending_calls()
+
+    def swap_engine(self, engine):
+        # May be called from another thread; the next frame is classified with `engine`.
+        self.call_between_frames(lambda: self._apply_engine_swap(engine))
+
+    def _apply_engine_swap(self, engine):
+        self.engine = engine
+        # A held pose must not keep the previous model's label.
+        if self.scheduler is not None:
+            self.scheduler.forget_pose()
+        self.window.clear()
+
+    def set_roi_enabled(self, enabled):
+        # May be called from another thread; process() picks it up on the next frame.
+        self.roi_enabled = bool(enabled)
+
+    def _setting_owner(self, name):
+        # The object a known setting is written to.
+        return self if name in PIPELINE_SETTINGS else self.committer
+
+    def setting_names(self):
+        # The RUNTIME_SETTINGS that update_settings() applies with the committer in use.
+        return [name for name in RUNTIME_SETTINGS if hasattr(self._setting_owner(name), name)]
+
+    def update_settings(self, settings, on_applied=None):
+        # May be called from another thread. Validates settings (see RUNTIME_SETTINGS)
+        # right away, raising ValueError, and applies them before the next frame, then
+        # calls on_applied(ignored). Returns ignored: the names the sender does not know.
+        values, ignored = [], []
+        for name, value in settings.items():
+            if name not in RUNTIME_SETTINGS:
+                ignored.append(name)
+                continue
+            value = validate_setting(name, value)
+            owner = self._setting_owner(name)
+            if not hasattr(owner, name):
+                raise ValueError(f"{name} does not apply to {type(owner).__name__}")
+            values.append((owner, name, value))
+
+        def apply():
+            for owner, name, value in values:
+                setattr(owner, name, value)
+            if on_applied is not None:
+                on_applied(ignored)
+
+        self.call_between_frames(apply)
+        return ignored
+
+    def reset_commits(self, on_reset=None, on_applied=None):
+        # May be called from another thread, e.g. when the captions are cleared: the
+        # committer forgets what it was building up and which label it committed last.
+        # on_reset() runs in the same step, so no label is committed in between, and
+        # on_applied() after it.
+        def apply():
+            self.committer.reset()
+            if on_reset is not None:
+                on_reset()
+            if on_applied is not None:
+                on_applied()
+
+        self.call_between_frames(apply)
+
+    def _detect(self, frame):
+        height, width = frame.shape[:2]
+        roi_enabled = self.roi_enabled
+        if not roi_enabled:
+            self.region_tracker.reset()
+        region = self.region = self.region_tracker.region(width, height) if roi_enabled else None
+        source = frame if region is None else frame[region[1]:region[3], region[0]:region[2]]
+        results = self.detector.process(self.preprocessor.prepare(source))
+        hands = results.multi_hand_landmarks
+        if region is not None and hands:
+            remap_landmarks(hands, region, width, height)
+        # The region tracker works in camera pixels, so it sees the landmarks before mirroring.
+        if roi_enabled:
+            self.region_tracker.update(hands, width, height)
+        if hands:
+            mirror_landmarks(hands, results.multi_handedness)
+        return results
+
+    def _deferred_result(self, frame, captured_at):
+        if frame is not None and self.draw_landmarks is not None:
+            frame = cv2.flip(frame, 1)
+        return FrameResult(frame, "No Hand", None, (captured_at, captured_at, captured_at, captured_at))
+
+    def process(self, frame, captured_at):
+        with self._frame_lock:
+            return self._process(frame, captured_at)
+
+    def _process(self, frame, captured_at):
+        if self._pending_calls:
+            self._run_pending_calls()
+        scheduler = self.scheduler
+        if scheduler is not None and scheduler.defer((frame, captured_at)):
+            return self._deferred_result(frame, captured_at)
+
+        committed_label = None
+        if scheduler is not None and scheduler.deferred:
+            still = scheduler.still_frames([held_frame for held_frame, _captured_at in scheduler.deferred])
+            for index, (held_frame, held_captured_at) in enumerate(scheduler.take_deferred(still)):
+                held_results = None
+                if index >= still:
+                    held_results = self._detect(held_frame)
+                    scheduler.note_detected(held_frame, bool(held_results.multi_hand_landmarks))
+                held = self._recognize_results(held_frame, held_results, held_captured_at, self.clock())
+                committed_label = held.committed_label or committed_label
+
+        results = self._detect(frame)
+        detected_at = self.clock()
+        if scheduler is not None:
+            scheduler.note_detected(frame, bool(results.multi_hand_landmarks))
+
+        result = self._recognize_results(frame, results, captured_at, detected_at)
+        if committed_label and not result.committed_label:
+            result = result._replace(committed_label=committed_label)
+        return result
+
+    def process_record(self, record):
+        # Replays one recorded frame: no camera and no detector. Latency stamps use
+        # the replay clock; the committer and the feature window go by the recorded
+        # capture time, so captions do not depend on the replay speed.
+        # The scheduler holds frames back exactly as it would live.
+        with self._frame_lock:
+            return self._process_record(record)
+
+    def _process_record(self, record):
+        if self._pending_calls:
+            self._run_pending_calls()
+        scheduler = self.scheduler
+        now = self.clock()
+        if scheduler is not None and scheduler.defer(record):
+            return self._deferred_result(None, now)
+
+        committed_label = None
+        if scheduler is not None and scheduler.deferred:
+            # A recording holds what detection found, so it is replayed as if only
+            # hands changed the picture: held records up to the first with hands are
+            # the ones a live run would pass over.
+            still = next(
+                (index for index, held_record in enumerate(scheduler.deferred) if held_record["hand_count"]),
+                len(scheduler.deferred),
+            )
+            for held_record in scheduler.take_deferred(still):
+                held = self._recognize_record(held_record, now, now)
+                committed_label = held.committed_label or committed_label
+
+        result = self._recognize_record(record, now, now)
+        if committed_label and not result.committed_label:
+            result = result._replace(committed_label=committed_label)
+        return result
+
+    def process_detected(self, record, detected_at):
+        # Recognizes a frame some other process already ran detection on (see
+        # workers.DetectionPool). Records must arrive in frame order; landmarks are
+        # already mirrored. Detection has happened, so nothing is held back.
+        with self._frame_lock:
+            if self._pending_calls:
+                self._run_pending_calls()
+            if self.recorder is not None:
+                self.recorder.append(record)
+            return self._recognize_record(record, float(record["captured_at"]), detected_at)
+
+    def _recognize_results(self, frame, results, captured_at, detected_at):
+        hands = results.multi_hand_landmarks if results is not None else None
+        handedness = results.multi_handedness if results is not None else None
+        if self.recorder is not None:
+            self.recorder.record(captured_at, hands, handedness)
+        if self.draw_landmarks is not None:
+            frame = cv2.flip(frame, 1)
+            if hands:
+                self.draw_landmarks(frame, hands)
+        if not hands:
+            return self._recognize(frame, False, captured_at, detected_at, captured_at)
+        self.extractor.load(hands, handedness)
+        return self._recognize(frame, True, captured_at, detected_at, captured_at)
+
+    def _recognize_record(self, record, captured_at, detected_at):
+        frame_time = float(record["captured_at"])
+        if not record["hand_count"]:
+            return self._recognize(None, False, captured_at, detected_at, frame_time)
+        self.extractor.load_points(record["landmarks"], record_labels(record))
+        return self._recognize(None, True, captured_at, detected_at, frame_time)
+
+    def _recognize(self, frame, hands_loaded, captured_at, detected_at, frame_time):
+        # Classifies the landmarks already loaded into the extractor and updates the committer.
+        extracted_at = classified_at = self.clock()
+        text = "No Hand"
+        detected_label = None
+        prediction = None
+        scheduler = self.scheduler
+        if hands_loaded:
+            extractor = self.extractor
+            # A held pose may still be part of a motion, so windowed engines see every frame.
+            windowed = self.engine.windowed
+            if not windowed and scheduler is not None and scheduler.is_static(extractor.landmarks, extractor.hands_loaded):
+                text = self._last_text
+                detected_label = self._last_label
+                prediction = self._last_prediction
+            else:
+                features = extractor.compute()
+                if windowed:
+                    features = self.window.push(features, extractor.wrists, frame_time)
+                extracted_at = self.clock()
+                prediction = self.engine.classify(features)
+                classified_at = self.clock()
+
+                if prediction.probability > self.threshold:
+                    detected_label = prediction.label
+                    text = detected_label
+                else:
+                    text = "Uncertain"
+                self._last_text = text
+                self._last_label = detected_label
+                self._last_prediction = prediction
+        elif self.window.count:
+            self.window.clear()
+
+        if scheduler is not None:
+            scheduler.observe(hands_loaded)
+        if hands_loaded or not self.freeze_on_detection_loss:
+            committed_label = self.committer.update(detected_label, prediction, frame_time)
+        else:
+            self.committer.note_gap(frame_time)
+            committed_label = None
+        return FrameResult(frame, text, committed_label, (captured_at, detected_at, extracted_at, classified_at))
@@ -1,204 +1,494 @@
-﻿import os
+﻿import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
-import joblib
-import mediapipe as mp
 import numpy as np
-from PyQt5.QtNetwork import QLocalSocket
-
-BASE_DIR = os.path.dirname(__file__)
-MODEL_NAME = "model.pkl"
-MODEL_PATH = os.path.join(BASE_DIR, "models", MODEL_NAME)
-
-IPC_SERVER_NAME = "signflow_overlay_ipc_v2"
-CONNECT_TIMEOUT_MS = 500
-WRITE_TIMEOUT_MS = 500
-DISCONNECT_TIMEOUT_MS = 200
-MESSAGE_DELIMITER = "\n"
-PREDICTION_THRESHOLD = 0.7
-MIN_STABLE_FRAMES_FOR_APPEND = 4
-NO_HAND_FRAMES_TO_RESET_REPEAT_LOCK = 6
-
-model = joblib.load(MODEL_PATH)
-
-mp_hands = mp.solutions.hands
-mp_draw = mp.solutions.drawing_utils
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=2,
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.7,
-)
-
-cap = cv2.VideoCapture(0)
-
-
-def send_caption(caption_text):
-    socket = QLocalSocket()
-    socket.connectToServer(IPC_SERVER_NAME)
-
-    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
-        return False
-
-    payload = (caption_text + MESSAGE_DELIMITER).encode("utf-8")
-    if socket.write(payload) < 0:
-        return False
-
-    if not socket.waitForBytesWritten(WRITE_TIMEOUT_MS):
-        return False
-
-    socket.disconnectFromServer()
-    if socket.state() != QLocalSocket.UnconnectedState:
-        socket.waitForDisconnected(DISCONNECT_TIMEOUT_MS)
-
-    return True
-
-
-def normalize_landmarks(landmarks):
-    lm = np.array([[lm.x, lm.y, lm.z] for lm in landmarks], dtype=np.float32)
-    base = lm[0]
-    lm = lm - base
-    scale = np.linalg.norm(lm[9]) if lm.shape[0] > 9 else 0.0
-    if scale < 1e-6:
-        scale = 1.0
-    return lm / scale
-
-
-def angle_at(a, b, c):
-    ba = a - b
-    bc = c - b
-    denom = np.linalg.norm(ba) * np.linalg.norm(bc)
-    if denom < 1e-6:
-        return 0.0
-    cos = float(np.dot(ba, bc) / denom)
-    cos = max(-1.0, min(1.0, cos))
-    return float(np.arccos(cos))
-
-
-def compute_angles(lm):
-    idx = lambda i: lm[i]
-    return [
-        angle_at(idx(1), idx(2), idx(3)),
-        angle_at(idx(2), idx(3), idx(4)),
-        angle_at(idx(5), idx(6), idx(7)),
-        angle_at(idx(6), idx(7), idx(8)),
-        angle_at(idx(9), idx(10), idx(11)),
-        angle_at(idx(10), idx(11), idx(12)),
-        angle_at(idx(13), idx(14), idx(15)),
-        angle_at(idx(14), idx(15), idx(16)),
-        angle_at(idx(17), idx(18), idx(19)),
-        angle_at(idx(18), idx(19), idx(20)),
-    ]
-
-
-def build_hand_features(landmarks):
-    norm = normalize_landmarks(landmarks)
-    coords = norm.flatten().tolist()
-    angles = compute_angles(norm)
-    return coords + angles
-
-
-def zero_hand_features():
-    return [0.0] * 73
-
-
-current_char = "INITIALIZED / WAITING..."
-current_sentence = ""
-last_sent_sentence = None
-candidate_label = None
-candidate_stable_frames = 0
-last_appended_label = None
-no_hand_frames = 0
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
 
-    frame = cv2.flip(frame, 1)
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = hands.process(rgb)
-
-    prediction_text = "No Hand"
-    detected_label = None
-
-    if results.multi_hand_landmarks:
-        right_features = None
-        left_features = None
-        unknown_features = []
-
-        for idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
-            mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-            features = build_hand_features(hand_landmarks.landmark)
-            label = None
-            if results.multi_handedness and len(results.multi_handedness) > idx:
-                classification = results.multi_handedness[idx].classification
-                if classification:
-                    label = classification[0].label
-
-            if label == "Right":
-                right_features = features
-            elif label == "Left":
-                left_features = features
+from capture import (
+    best_probe,
+    camera_mode,
+    load_camera_settings,
+    open_camera,
+    probe_camera,
+    probe_candidates,
+    save_camera_settings,
+)
+from ipc import (
+    CONTROL_CLEAR,
+    CONTROL_MODEL,
+    CONTROL_PLAYBACK,
+    CONTROL_ROI,
+    CONTROL_SETTINGS,
+    MSG_CAPTION_DELTA,
+    MSG_CONTROL,
+    MSG_STATUS,
+    STATUS_ERROR,
+    STATUS_READY,
+    STATUS_STARTING,
+    Outbox,
+    decode_json,
+)
+from pipeline import (
+    DetectionScheduler,
+    FramePreprocessor,
+    RecognitionPipeline,
+    create_hands_detector,
+    landmark_drawer,
+)
+from recording import LandmarkRecorder, load_recording
+from registry import ModelSwitcher, find_artifact, load_engine, load_registry, selected_model_name, warm_up_engine
+from streams import CaptionStream, FrameSource, PacedCapture, PooledFrameSource, RecordingSource, StreamScheduler
+from workers import DetectionPool
+
+COMPILE_MODEL = True
+ADAPTIVE_DETECTION = True
+# Longest side of the image handed to the hand detector; None detects at camera resolution.
+DETECTION_MAX_SIDE = 640
+# Opens a mirrored preview window with the landmarks drawn in.
+SHOW_PREVIEW = False
+DEFAULT_REPLAY_SPEED = 1.0
+# Hand detection processes; 0 detects in the sender process itself.
+DETECTION_WORKERS = 0
+# Kinds of --source/--replay streams in multi-stream mode.
+STREAM_FRAMES = "frames"
+STREAM_REPLAY = "replay"
+# Blank frame the detector processes once at startup, so the first camera frame does
+# not pay for graph and model initialization.
+WARMUP_FRAME_SHAPE = (480, 640, 3)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SignFlow recognition sender")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--record", help="append each frame's hand landmarks to this recording file")
+    source.add_argument(
+        "--replay",
+        action="append",
+        help="replay a landmark recording instead of using the camera; repeat to replay several as separate streams",
+    )
+    source.add_argument(
+        "--probe-camera",
+        action="store_true",
+        help="try each capture backend, format and buffer depth and report delivered FPS and frame age",
+    )
+    parser.add_argument(
+        "--save-camera-settings",
+        action="store_true",
+        help="with --probe-camera, keep the combination with the freshest frames in camera_settings.json",
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        help="caption this camera index or video file as its own stream, optionally named NAME=SOURCE; repeatable",
+    )
+    parser.add_argument(
+        "--stream-threads",
+        type=int,
+        default=0,
+        help="threads recognizing --source/--replay streams; 0 uses one per stream, up to the CPU count",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DETECTION_WORKERS,
+        help="run hand detection in this many worker processes; 0 detects in-process",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=DEFAULT_REPLAY_SPEED,
+        help="playback speed relative to the recording; 0 replays as fast as possible",
+    )
+    args = parser.parse_args()
+    if (args.source or len(args.replay or ()) > 1) and (args.record or args.workers > 0):
+        parser.error("--record and --workers need a single camera, not several streams")
+    return args
+
+
+def stream_specs(args):
+    # (stream id, kind, camera index or path) per caption lane; empty for the
+    # single-camera or single-replay sender, whose captions carry no stream id.
+    replays = args.replay or []
+    if not args.source and len(replays) <= 1:
+        return []
+    specs = []
+    for kind, values in ((STREAM_FRAMES, args.source or []), (STREAM_REPLAY, replays)):
+        for value in values:
+            name, named, location = value.partition("=")
+            if not named:
+                name, location = str(len(specs) + 1), value
+            if any(name == spec[0] for spec in specs):
+                raise SystemExit(f"stream {name!r} is given twice")
+            specs.append((name, kind, location))
+    return specs
+
+
+class Playback:
+    # Play/pause state shared between the outbox thread, which receives the overlay's
+    # commands, and the capture loop. Pausing a camera keeps it open; see
+    # LatestFrameGrabber.pause().
+    def __init__(self):
+        self.grabbers = []
+        self.pauses = 0
+        self._lock = threading.Lock()
+        self._playing = threading.Event()
+        self._playing.set()
+
+    @property
+    def playing(self):
+        return self._playing.is_set()
+
+    def attach(self, grabber):
+        # The overlay may have sent "paused" before the camera was opened.
+        with self._lock:
+            self.grabbers.append(grabber)
+            if not self.playing:
+                grabber.pause()
+
+    def set_playing(self, playing):
+        with self._lock:
+            if playing == self.playing:
+                return
+            if playing:
+                self._playing.set()
+                for grabber in self.grabbers:
+                    grabber.resume()
             else:
-                unknown_features.append(features)
-
-        if right_features is None and unknown_features:
-            right_features = unknown_features.pop(0)
-        if left_features is None and unknown_features:
-            left_features = unknown_features.pop(0)
-
-        primary = right_features if right_features is not None else zero_hand_features()
-        secondary = left_features if left_features is not None else zero_hand_features()
-        only_primary_hand = 1 if right_features is not None and left_features is None else 0
-
-        features = [only_primary_hand] + primary + secondary
-        features = np.array(features).reshape(1, -1)
-
-        probs = model.predict_proba(features)[0]
-        max_prob = np.max(probs)
-
-        if max_prob > PREDICTION_THRESHOLD:
-            detected_label = str(model.predict(features)[0]).strip()
-            prediction_text = detected_label
-        else:
-            prediction_text = "Uncertain"
-
-    current_char = str(prediction_text)
-
-    if detected_label:
-        no_hand_frames = 0
-        if detected_label == candidate_label:
-            candidate_stable_frames += 1
+                self.pauses += 1
+                self._playing.clear()
+                for grabber in self.grabbers:
+                    grabber.pause()
+
+    def wait(self, timeout=None):
+        return self._playing.wait(timeout)
+
+
+def new_pipeline():
+    return RecognitionPipeline(
+        None,
+        None,
+        scheduler=DetectionScheduler() if ADAPTIVE_DETECTION else None,
+        preprocessor=FramePreprocessor(DETECTION_MAX_SIDE),
+    )
+
+
+def warm_up_detector(detector):
+    detector.process(np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8))
+
+
+def open_checked_camera(settings):
+    cap = open_camera(settings)
+    if not cap.isOpened():
+        raise RuntimeError(f"camera {settings['camera_index']} could not be opened")
+    return cap
+
+
+def open_stream_capture(location, settings):
+    # A camera index opens with the saved camera settings; anything else is a video file.
+    if location.isdigit():
+        return open_checked_camera(dict(settings, camera_index=int(location)))
+    cap = cv2.VideoCapture(location)
+    if not cap.isOpened():
+        raise RuntimeError(f"{location} could not be opened")
+    return PacedCapture(cap)
+
+
+def warm_up_camera(cap):
+    # The first read starts streaming, which can take as long as opening the device.
+    if not cap.read()[0]:
+        raise RuntimeError("camera opened but delivered no frames")
+
+
+def _start_component(load, warm_up):
+    started_at = time.perf_counter()
+    component = load()
+    loaded_at = time.perf_counter()
+    if warm_up is not None:
+        warm_up(component)
+    return component, loaded_at - started_at, time.perf_counter() - loaded_at
+
+
+def start_components(tasks, parallel=True):
+    # Loads and warms up each component, given as name -> (load, warm_up). Model
+    # unpickling, MediaPipe graph setup and camera drivers mostly wait on I/O or
+    # native code, so running them side by side makes startup about as long as the
+    # slowest one. Returns the components that came up, each component's
+    # (load, warm-up) seconds and the error of each one that failed.
+    components, timings, errors = {}, {}, {}
+    with ThreadPoolExecutor(max_workers=len(tasks) if parallel else 1, thread_name_prefix="signflow-startup") as pool:
+        futures = {name: pool.submit(_start_component, load, warm_up) for name, (load, warm_up) in tasks.items()}
+        for name, future in futures.items():
+            try:
+                components[name], load_s, warm_up_s = future.result()
+            except Exception as exc:
+                errors[name] = str(exc) or type(exc).__name__
+                continue
+            timings[name] = (load_s, warm_up_s)
+    return components, timings, errors
+
+
+def startup_status(timings, errors, ready_s):
+    timings_ms = {}
+    for name, (load_s, warm_up_s) in timings.items():
+        timings_ms[name] = round(load_s * 1000.0, 1)
+        timings_ms[f"{name}_warmup"] = round(warm_up_s * 1000.0, 1)
+    timings_ms["ready"] = round(ready_s * 1000.0, 1)
+    if errors:
+        detail = "; ".join(f"{name}: {error}" for name, error in errors.items())
+        return {"state": STATUS_ERROR, "detail": detail, "timings_ms": timings_ms}
+    return {"state": STATUS_READY, "timings_ms": timings_ms}
+
+
+def format_startup(timings, errors, ready_s):
+    parts = [
+        f"{name} {load_s * 1000.0:.0f} ms (+{warm_up_s * 1000.0:.0f} ms warm-up)"
+        for name, (load_s, warm_up_s) in timings.items()
+    ]
+    parts += [f"{name} failed: {error}" for name, error in errors.items()]
+    return f"Startup in {ready_s * 1000.0:.0f} ms: " + ", ".join(parts)
+
+
+def run_probe(settings, save):
+    size = f"{settings['width']}x{settings['height']}" if settings["width"] and settings["height"] else "default size"
+    print(f"Probing camera {settings['camera_index']} at {size}, {settings['fps'] or 'default'} FPS")
+    print(f"{'backend':<12}{'format':<8}{'buffer':>7}{'size':>12}{'fps':>8}{'queued':>8}{'age ms':>8}")
+    results = []
+    for candidate in probe_candidates(settings):
+        result = probe_camera(candidate)
+        results.append((candidate, result))
+        buffer_size = candidate["buffer_size"] or "default"
+        if result is None:
+            print(f"{candidate['backend']:<12}{candidate['fourcc']:<8}{buffer_size:>7}  unavailable")
+            continue
+        size = f"{result['width']}x{result['height']}"
+        print(
+            f"{candidate['backend']:<12}{result['fourcc']:<8}{buffer_size:>7}{size:>12}"
+            f"{result['delivered_fps']:>8.1f}{result['queued_frames']:>8.1f}{result['frame_age_ms']:>8.0f}"
+        )
+
+    best = best_probe(results)
+    if best is None:
+        print("No combination delivered frames")
+        return
+    print(f"Freshest frames: {best['backend']} {best['fourcc']}, buffer {best['buffer_size'] or 'default'}")
+    if save:
+        save_camera_settings(best)
+        print("Saved to camera_settings.json")
+
+
+def attach_sources(streams, specs, components, replay_speed):
+    for stream, (name, kind, location) in zip(streams, specs):
+        if kind == STREAM_REPLAY:
+            stream.source = RecordingSource(load_recording(location), replay_speed)
         else:
-            candidate_label = detected_label
-            candidate_stable_frames = 1
-
-        if (
-            candidate_stable_frames >= MIN_STABLE_FRAMES_FOR_APPEND
-            and detected_label != last_appended_label
-        ):
-            current_sentence += detected_label
-            last_appended_label = detected_label
-            candidate_label = None
-            candidate_stable_frames = 0
-
-            if current_sentence != last_sent_sentence and send_caption(current_sentence):
-                last_sent_sentence = current_sentence
-    else:
-        candidate_label = None
-        candidate_stable_frames = 0
-        no_hand_frames += 1
-        if no_hand_frames >= NO_HAND_FRAMES_TO_RESET_REPEAT_LOCK:
-            last_appended_label = None
+            stream.pipeline.detector = components[f"detector {name}"]
+            stream.source = FrameSource(components[f"camera {name}"])
 
-    # cv2.putText(frame, current_char, (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    # cv2.putText(frame, f"Sentence: {current_sentence}", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 220, 255), 2)
-    # cv2.imshow("ASL Prediction", frame)
 
+def show_preview(stream, result):
+    cv2.putText(result.frame, str(result.text), (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    cv2.imshow("ASL Prediction", result.frame)
     if cv2.waitKey(1) & 0xFF == 27:
-        break
+        # The stream ends like a camera that stopped delivering frames.
+        stream.source.grabber.stop()
+
+
+def run_streams(scheduler):
+    scheduler.start()
+    try:
+        while not scheduler.wait(0.5):
+            pass
+    finally:
+        scheduler.stop()
+    if scheduler.error is not None:
+        raise RuntimeError(scheduler.error)
+
+
+def handle_control(pipeline, playback, models, clear_captions, reply, message):
+    # Runs on the outbox thread. A command with an "id" is acknowledged through
+    # reply(ack) once it has taken effect: roi and playback right away, settings and
+    # clear before the next frame is recognized (or right away while paused), a
+    # model once it is loaded.
+    if message.type != MSG_CONTROL:
+        return
+    command = decode_json(message.payload)
+    if not isinstance(command, dict):
+        return
+    name = command.get("command")
+    command_id = command.get("id")
+    received_at = time.perf_counter()
+
+    def ack(ok=True, detail=None, ignored=None):
+        if command_id is None:
+            return
+        payload = {"id": command_id, "command": name, "ok": ok}
+        payload["applied_ms"] = round((time.perf_counter() - received_at) * 1000.0, 2)
+        if detail:
+            payload["detail"] = detail
+        if ignored:
+            payload["ignored"] = list(ignored)
+        reply(payload)
+
+    if name == CONTROL_ROI:
+        pipeline.set_roi_enabled(command.get("enabled") is True)
+        ack()
+    elif name == CONTROL_PLAYBACK:
+        playback.set_playing(command.get("playing") is not False)
+        ack()
+    elif name == CONTROL_MODEL and isinstance(command.get("name"), str):
+        models.request(command["name"], on_done=ack)
+    elif name == CONTROL_SETTINGS and isinstance(command.get("settings"), dict):
+        try:
+            pipeline.update_settings(command["settings"], lambda ignored: ack(ignored=ignored))
+        except ValueError as exc:
+            ack(False, str(exc))
+    elif name == CONTROL_CLEAR:
+        pipeline.reset_commits(clear_captions, ack)
+    else:
+        ack(False, f"unknown command {name!r}")
+    if not playback.playing:
+        # No frame is coming to run queued changes before.
+        pipeline.run_between_frames()
+
+
+def main():
+    args = parse_args()
+    if args.probe_camera:
+        run_probe(load_camera_settings(), args.save_camera_settings)
+        return
+
+    specs = stream_specs(args)
+    # The single-camera or single-replay sender is one stream without a stream id.
+    streams = [CaptionStream(name, None, new_pipeline()) for name, _kind, _location in specs] or [
+        CaptionStream(None, None, new_pipeline())
+    ]
 
-cap.release()
-hands.close()
-cv2.destroyAllWindows()
+    def publish(stream, result):
+        if result.committed_label:
+            delta = stream.append(result.committed_label)
+            delta["stamps"] = list(result.stamps) + [time.perf_counter()]
+            outbox.post_caption_delta(delta)
+        if SHOW_PREVIEW and result.frame is not None:
+            show_preview(stream, result)
+
+    playback = Playback()
+    threads = args.stream_threads or min(len(streams), os.cpu_count() or 1)
+    # Control commands and model swaps apply to every stream through the scheduler.
+    scheduler = StreamScheduler(streams, threads, publish, playback)
+    registry = load_registry()
+    model_name = selected_model_name(registry)
+
+    def on_model_swapped(name, load_s):
+        timings_ms = dict(status.get("timings_ms", {}), model_swap=round(load_s * 1000.0, 1))
+        post_status({"state": STATUS_READY, "model": name, "timings_ms": timings_ms})
+
+    def on_model_failed(name, error):
+        post_status(dict(status, detail=f"{name} could not be loaded: {error}"))
+
+    # Started once the first model is up; earlier requests from the overlay wait until then.
+    models = ModelSwitcher(
+        scheduler,
+        registry,
+        current=model_name,
+        compiled=COMPILE_MODEL,
+        on_swapped=on_model_swapped,
+        on_failed=on_model_failed,
+    )
+
+    # Statuses list the settings the pipeline applies, so the overlay sends only those.
+    status = {"state": STATUS_STARTING, "model": model_name, "settings": scheduler.setting_names()}
+
+    def caption_keyframes():
+        return [(MSG_CAPTION_DELTA, stream.keyframe()) for stream in streams]
+
+    def clear_captions(stream):
+        outbox.post_caption_delta(stream.clear())
+
+    outbox = Outbox(
+        # A fresh connection (e.g. after an overlay restart) starts with the current
+        # status and caption window of every stream.
+        on_connect=lambda: [(MSG_STATUS, status)] + caption_keyframes(),
+        on_message=lambda message: handle_control(
+            scheduler, playback, models, clear_captions, outbox.post_control_ack, message
+        ),
+    ).start()
+
+    def post_status(new_status):
+        nonlocal status
+        status = dict(new_status, settings=scheduler.setting_names())
+        outbox.post_status(status)
+
+    tasks = {"model": (lambda: load_engine(find_artifact(registry, model_name), COMPILE_MODEL), warm_up_engine)}
+    if specs:
+        camera_settings = load_camera_settings()
+        for name, kind, location in specs:
+            if kind == STREAM_FRAMES:
+                # Each stream tracks its own hands, so it needs its own detector.
+                tasks[f"detector {name}"] = (create_hands_detector, warm_up_detector)
+                tasks[f"camera {name}"] = (
+                    lambda location=location: open_stream_capture(location, camera_settings),
+                    warm_up_camera,
+                )
+    elif not args.replay:
+        camera_settings = load_camera_settings()
+        if args.workers > 0:
+            tasks["detector"] = (
+                lambda: DetectionPool(args.workers, max_side=DETECTION_MAX_SIDE, warm_up_shape=WARMUP_FRAME_SHAPE).start(),
+                DetectionPool.wait_ready,
+            )
+        else:
+            tasks["detector"] = (create_hands_detector, warm_up_detector)
+        tasks["camera"] = (lambda: open_checked_camera(camera_settings), warm_up_camera)
+
+    started_at = time.perf_counter()
+    components, timings, errors = start_components(tasks)
+    ready_s = time.perf_counter() - started_at
+    print(format_startup(timings, errors, ready_s))
+    post_status(dict(startup_status(timings, errors, ready_s), model=model_name))
+
+    hands = components.get("detector")
+    cap = components.get("camera")
+    recorder = None
+    try:
+        if errors:
+            raise SystemExit(1)
+        for stream in streams:
+            stream.pipeline.engine = components["model"]
+        models.start()
+        if specs:
+            attach_sources(streams, specs, components, args.replay_speed)
+            print(f"Captioning {len(specs)} streams on {threads} threads: " + ", ".join(spec[0] for spec in specs))
+        elif args.replay:
+            streams[0].source = RecordingSource(load_recording(args.replay[0]), args.replay_speed)
+        else:
+            print("Camera: " + ", ".join(f"{key} {value}" for key, value in camera_mode(cap).items()))
+            pipeline = streams[0].pipeline
+            recorder = pipeline.recorder = LandmarkRecorder(args.record) if args.record else None
+            if args.workers > 0:
+                # Frames stay in the workers' shared memory, so there is no preview.
+                streams[0].source = PooledFrameSource(cap, hands)
+            else:
+                pipeline.detector = hands
+                pipeline.draw_landmarks = landmark_drawer() if SHOW_PREVIEW else None
+                streams[0].source = FrameSource(cap)
+        try:
+            run_streams(scheduler)
+        finally:
+            cv2.destroyAllWindows()
+            if recorder is not None:
+                recorder.close()
+    finally:
+        models.stop()
+        for name, component in components.items():
+            if name.startswith("camera"):
+                component.release()
+            elif name.startswith("detector"):
+                component.close()
+        outbox.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from features import HAND_LANDMARK_COUNT, handedness_label
+
+RECORDING_MAGIC = b"SFLR"
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct("<4sHH8x")
+RECORDED_HANDS = 2
+
+HANDEDNESS_NONE = 0
+HANDEDNESS_RIGHT = 1
+HANDEDNESS_LEFT = 2
+HANDEDNESS_OTHER = 3
+HANDEDNESS_CODES = {"Right": HANDEDNESS_RIGHT, "Left": HANDEDNESS_LEFT}
+HANDEDNESS_LABELS = (None, "Right", "Left", "Unknown")
+
+# One fixed-size record per processed frame, hands in detection order. Aligned so
+# the file can be memory-mapped directly as an array of this dtype.
+RECORD_DTYPE = np.dtype(
+    [
+        ("captured_at", np.float64),
+        ("landmarks", np.float32, (RECORDED_HANDS, HAND_LANDMARK_COUNT, 3)),
+        ("hand_count", np.uint8),
+        ("handedness", np.uint8, (RECORDED_HANDS,)),
+    ],
+    align=True,
+)
+
+
+def fill_record(record, captured_at, multi_hand_landmarks, multi_handedness):
+    # Packs one frame's detection results into a RECORD_DTYPE record in place.
+    record["captured_at"] = captured_at
+    record["landmarks"] = 0.0
+    record["handedness"] = HANDEDNESS_NONE
+    hand_count = 0
+    for idx, hand_landmarks in enumerate(multi_hand_landmarks or ()):
+        if idx >= RECORDED_HANDS:
+            break
+        points = record["landmarks"][idx]
+        for i, lm in enumerate(hand_landmarks.landmark):
+            points[i] = (lm.x, lm.y, lm.z)
+        label = handedness_label(multi_handedness, idx)
+        record["handedness"][idx] = HANDEDNESS_CODES.get(label, HANDEDNESS_NONE if label is None else HANDEDNESS_OTHER)
+        hand_count += 1
+    record["hand_count"] = hand_count
+
+
+class LandmarkRecorder:
+    # Appends one record per frame to an existing recording or starts a new one.
+    # Records are written whole, so a crash can at most leave a partial last
+    # record, which load_recording ignores and reopening truncates away.
+    def __init__(self, path):
+        self.path = Path(path)
+        self.frames = 0
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size >= RECORDING_HEADER.size:
+            _check_header(self.path)
+            self._file = open(self.path, "r+b")
+            # Appending after a partial record would shift every later record.
+            whole = (size - RECORDING_HEADER.size) // RECORD_DTYPE.itemsize
+            self._file.truncate(RECORDING_HEADER.size + whole * RECORD_DTYPE.itemsize)
+            self._file.seek(0, 2)
+        else:
+            self._file = open(self.path, "wb")
+            self._file.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, RECORD_DTYPE.itemsize))
+
+    def record(self, captured_at, multi_hand_landmarks, multi_handedness):
+        fill_record(self._record[0], captured_at, multi_hand_landmarks, multi_handedness)
+        self.append(self._record)
+
+    def append(self, record):
+        # Writes a record that is already packed, e.g. by a detection worker.
+        self._file.write(record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+
+def _check_header(path):
+    with open(path, "rb") as handle:
+        header = handle.read(RECORDING_HEADER.size)
+    if len(header) < RECORDING_HEADER.size:
+        raise ValueError(f"{path} is not a landmark recording")
+    magic, version, record_size = RECORDING_HEADER.unpack(header)
+    if magic != RECORDING_MAGIC or version != RECORDING_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a version {RECORDING_VERSION} landmark recording")
+
+
+def load_recording(path):
+    # Returns a read-only memory-mapped array of RECORD_DTYPE records.
+    path = Path(path)
+    _check_header(path)
+    count = (path.stat().st_size - RECORDING_HEADER.size) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=RECORDING_HEADER.size, shape=(count,))
+
+
+def record_labels(record):
+    return [HANDEDNESS_LABELS[code] for code in record["handedness"][:record["hand_count"]]]
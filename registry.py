@@ -0,0 +1,191 @@
+import collections
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from features import FEATURE_LAYOUT_VERSION, FEATURE_VECTOR_SIZE, WINDOWED_FEATURE_VECTOR_SIZE
+from inference import ClassificationEngine
+
+BASE_DIR = Path(__file__).resolve().parent
+MODELS_DIR = BASE_DIR / "models"
+REGISTRY_PATH = MODELS_DIR / "registry.json"
+# Written by the overlay; the sender only reads the model selection from it.
+USER_PREFERENCES_PATH = BASE_DIR / "user_preferences.json"
+
+DEFAULT_MODEL_NAME = "Local Small"
+# Used when models/registry.json does not exist. Keys are the overlay's model options.
+DEFAULT_REGISTRY = {
+    "Local Small": {"path": "model.pkl", "feature_layout": FEATURE_LAYOUT_VERSION},
+    "Local Medium": {"path": "model_medium.pkl", "feature_layout": FEATURE_LAYOUT_VERSION},
+}
+
+# One model option. classes, when given, is the label list the model must have.
+ModelArtifact = collections.namedtuple("ModelArtifact", "name path feature_layout classes")
+
+
+def load_registry(path=REGISTRY_PATH):
+    # Maps each model option to its artifact. Paths are relative to the registry file.
+    path = Path(path)
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        raw = None
+    if not isinstance(raw, dict):
+        raw = DEFAULT_REGISTRY
+
+    registry = {}
+    for name, entry in raw.items():
+        if not isinstance(entry, dict) or not isinstance(entry.get("path"), str):
+            continue
+        classes = entry.get("classes")
+        registry[name] = ModelArtifact(
+            name,
+            path.parent / entry["path"],
+            entry.get("feature_layout", FEATURE_LAYOUT_VERSION),
+            [str(label) for label in classes] if isinstance(classes, list) else None,
+        )
+    return registry
+
+
+def save_registry(registry, path=REGISTRY_PATH):
+    path = Path(path)
+    payload = {}
+    for name, artifact in registry.items():
+        entry = {"path": str(Path(artifact.path).relative_to(path.parent)), "feature_layout": artifact.feature_layout}
+        if artifact.classes is not None:
+            entry["classes"] = list(artifact.classes)
+        payload[name] = entry
+    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
+def selected_model_name(registry, preferences_path=USER_PREFERENCES_PATH):
+    try:
+        selection = json.loads(Path(preferences_path).read_text(encoding="utf-8")).get("model_selection")
+    except (OSError, json.JSONDecodeError, AttributeError):
+        selection = None
+    if selection in registry or not registry:
+        return selection if selection in registry else DEFAULT_MODEL_NAME
+    return DEFAULT_MODEL_NAME if DEFAULT_MODEL_NAME in registry else next(iter(registry))
+
+
+def find_artifact(registry, name):
+    artifact = registry.get(name)
+    if artifact is None:
+        raise KeyError(f"no model registered as {name!r}")
+    return artifact
+
+
+def _load_model(path):
+    import joblib
+
+    # Memory-mapping leaves large arrays in the page cache instead of copying them
+    # into the heap. joblib warns about compressed artifacts and loads them normally.
+    return joblib.load(path, mmap_mode="r")
+
+
+def load_engine(artifact, compiled=False):
+    if artifact.feature_layout != FEATURE_LAYOUT_VERSION:
+        raise ValueError(
+            f"{artifact.name} expects feature layout {artifact.feature_layout}, features are version {FEATURE_LAYOUT_VERSION}"
+        )
+    model = _load_model(artifact.path)
+    engine = ClassificationEngine(model, compiled=compiled)
+    if engine.n_features not in (FEATURE_VECTOR_SIZE, WINDOWED_FEATURE_VECTOR_SIZE):
+        raise ValueError(
+            f"{artifact.name} takes {engine.n_features} features, not {FEATURE_VECTOR_SIZE} per frame"
+            f" or {WINDOWED_FEATURE_VECTOR_SIZE} windowed"
+        )
+    if artifact.classes is not None and engine.labels != [label.strip() for label in artifact.classes]:
+        raise ValueError(f"{artifact.name} classes do not match the registry")
+    return engine
+
+
+def warm_up_engine(engine):
+    engine.classify(np.zeros((1, engine.n_features), dtype=np.float32))
+
+
+class ModelSwitcher:
+    # Loads the requested model on its own thread and hands it to the pipeline, which
+    # swaps engines between frames; capture and recognition keep running meanwhile.
+    # Requests made during a load are coalesced: only the latest one is loaded next.
+    # A request's on_done(ok, detail) is called on the loader thread once it has been
+    # served: loaded, already current, failed, or superseded by a later request.
+    def __init__(self, pipeline, registry, current=None, compiled=False, on_swapped=None, on_failed=None):
+        self.pipeline = pipeline
+        self.registry = registry
+        self.current = current
+        self.compiled = compiled
+        self.on_swapped = on_swapped
+        self.on_failed = on_failed
+        self.swaps = 0
+        self.last_load_s = None
+
+        self._requested = None
+        self._waiters = []
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="signflow-model-loader", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def request(self, name, on_done=None):
+        with self._cond:
+            self._requested = name
+            if on_done is not None:
+                self._waiters.append((name, on_done))
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._requested is not None or not self._running)
+                if not self._running:
+                    return
+                name, self._requested = self._requested, None
+                waiters, self._waiters = self._waiters, []
+            if name == self.current:
+                self._served(waiters, name, True, "already loaded")
+                continue
+
+            started_at = time.perf_counter()
+            try:
+                engine = load_engine(find_artifact(self.registry, name), self.compiled)
+                warm_up_engine(engine)
+            except Exception as exc:
+                error = str(exc) or type(exc).__name__
+                if self.on_failed is not None:
+                    self.on_failed(name, error)
+                self._served(waiters, name, False, error)
+                continue
+            self.last_load_s = time.perf_counter() - started_at
+            self.pipeline.swap_engine(engine)
+            self.current = name
+            self.swaps += 1
+            if self.on_swapped is not None:
+                self.on_swapped(name, self.last_load_s)
+            self._served(waiters, name, True, f"loaded in {self.last_load_s * 1000.0:.0f} ms")
+
+    @staticmethod
+    def _served(waiters, name, ok, detail):
+        for requested, on_done in waiters:
+            if requested == name:
+                on_done(ok, detail)
+            else:
+                on_done(False, f"superseded by {name}")
@@ -0,0 +1,402 @@
+import queue
+import threading
+import time
+
+from captions import CaptionBuffer
+from capture import LatestFrameGrabber
+
+# Recorded frames a replay stream reads ahead of recognition.
+REPLAY_READ_AHEAD = 8
+# Video files that do not report a frame rate are played at this one.
+DEFAULT_VIDEO_FPS = 30.0
+SOURCE_STOP_POLL_S = 0.1
+
+
+class PacedCapture:
+    # Delivers a video file's frames at the file's own rate, the way a camera would,
+    # instead of as fast as they decode. Anything else goes to the wrapped capture.
+    def __init__(self, cap, fps=None, clock=time.monotonic):
+        import cv2
+
+        self.cap = cap
+        self.clock = clock
+        self.interval = 1.0 / (fps or cap.get(cv2.CAP_PROP_FPS) or DEFAULT_VIDEO_FPS)
+        self._due = None
+
+    def _wait(self):
+        now = self.clock()
+        if self._due is None or now - self._due > self.interval:
+            # First frame, or recognition fell behind: do not catch up in a burst.
+            self._due = now
+        elif self._due > now:
+            time.sleep(self._due - now)
+        self._due += self.interval
+
+    def read(self):
+        self._wait()
+        return self.cap.read()
+
+    def grab(self):
+        self._wait()
+        return self.cap.grab()
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+class FrameSource:
+    # Camera or video frames through a LatestFrameGrabber: as with the single-camera
+    # sender only the newest frame waits, so a stream that falls behind drops frames
+    # instead of building up latency.
+    def __init__(self, cap):
+        self.cap = cap
+        self.grabber = LatestFrameGrabber(cap)
+
+    @property
+    def ended(self):
+        return self.grabber.ended
+
+    def start(self, on_ready, playback=None):
+        self.grabber.on_ready = on_ready
+        if playback is not None:
+            playback.attach(self.grabber)
+        self.grabber.start()
+
+    def poll(self):
+        ret, frame, captured_at = self.grabber.read(timeout=0)
+        return (frame, captured_at) if ret else None
+
+    def recognize(self, pipeline, item):
+        return pipeline.process(*item)
+
+    def stop(self):
+        self.grabber.stop()
+        self.cap.release()
+
+
+class RecordingSource:
+    # Replays a landmark recording at `speed` times its recorded pace (0 as fast as
+    # recognition keeps up). Unlike camera frames, records are never dropped.
+    def __init__(self, records, speed):
+        self.records = records
+        self.speed = speed
+        self._queue = queue.Queue(maxsize=REPLAY_READ_AHEAD)
+        self._fed = False
+        self._running = False
+        self._thread = None
+
+    @property
+    def ended(self):
+        return self._fed and self._queue.empty()
+
+    def start(self, on_ready, playback=None):
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._feed, args=(on_ready, playback), name="signflow-replay-feed", daemon=True
+        )
+        self._thread.start()
+
+    def _feed(self, on_ready, playback):
+        records = self.records
+        started_at = time.monotonic()
+        first_captured_at = records[0]["captured_at"] if len(records) else 0.0
+        for record in records:
+            if playback is not None and not playback.playing:
+                paused_at = time.monotonic()
+                while not playback.wait(SOURCE_STOP_POLL_S):
+                    if not self._running:
+                        return
+                # Resume where playback stopped rather than skipping the paused stretch.
+                started_at += time.monotonic() - paused_at
+            if self.speed > 0:
+                delay = started_at + (record["captured_at"] - first_captured_at) / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            while self._running:
+                try:
+                    self._queue.put(record, timeout=SOURCE_STOP_POLL_S)
+                    break
+                except queue.Full:
+                    continue
+            if not self._running:
+                return
+            on_ready()
+        self._fed = True
+        on_ready()
+
+    def poll(self):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def recognize(self, pipeline, record):
+        return pipeline.process_record(record)
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class PooledFrameSource:
+    # Camera frames whose hands a DetectionPool detects in worker processes. One
+    # thread hands the newest frame to the pool, another collects the records, which
+    # come back in frame order, for RecognitionPipeline.process_detected. The pool is
+    # closed once the camera ends, after the frames already submitted are back.
+    def __init__(self, cap, pool):
+        self.cap = cap
+        self.pool = pool
+        self.grabber = LatestFrameGrabber(cap)
+        self._results = queue.Queue()
+        self._collected = False
+        self._threads = []
+
+    @property
+    def ended(self):
+        return self._collected and self._results.empty()
+
+    def start(self, on_ready, playback=None):
+        if playback is not None:
+            playback.attach(self.grabber)
+        self.grabber.start()
+        self._threads = [
+            threading.Thread(target=self._submit, name="signflow-detect-submit", daemon=True),
+            threading.Thread(target=self._collect, args=(on_ready,), name="signflow-detect-collect", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _submit(self):
+        try:
+            while self.pool.error is None:
+                ret, frame, captured_at = self.grabber.read()
+                if not ret:
+                    break
+                self.pool.submit(frame, captured_at)
+        except RuntimeError:
+            # The pool failed; poll() reports pool.error.
+            pass
+        finally:
+            self.pool.close()
+
+    def _collect(self, on_ready):
+        try:
+            for item in self.pool.results():
+                self._results.put(item)
+                on_ready()
+        except RuntimeError:
+            pass
+        self._collected = True
+        on_ready()
+
+    def poll(self):
+        try:
+            return self._results.get_nowait()
+        except queue.Empty:
+            if self.pool.error is not None:
+                raise RuntimeError(self.pool.error) from None
+            return None
+
+    def recognize(self, pipeline, item):
+        return pipeline.process_detected(*item)
+
+    def stop(self):
+        self.grabber.stop()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.cap.release()
+
+
+class CaptionStream:
+    # One signer's captions: a frame source, a RecognitionPipeline of its own (the
+    # detector's tracking, the committer and the scheduler all carry state between
+    # frames) and a CaptionBuffer whose deltas carry stream_id, so the overlay can
+    # give every stream its own lane. The single-camera or single-replay sender is
+    # one stream whose stream_id is None, and its deltas carry none.
+    def __init__(self, stream_id, source, pipeline):
+        self.stream_id = stream_id
+        self.source = source
+        self.pipeline = pipeline
+        self.captions = CaptionBuffer()
+        self.frames = 0
+        self.finished = False
+        self.pauses_seen = 0
+
+    def _tagged(self, delta):
+        if self.stream_id is not None:
+            delta["stream"] = self.stream_id
+        return delta
+
+    def append(self, label):
+        return self._tagged(self.captions.append(label))
+
+    def keyframe(self):
+        return self._tagged(self.captions.keyframe())
+
+    def clear(self):
+        return self._tagged(self.captions.clear())
+
+
+class StreamScheduler:
+    # Recognizes one or several streams on a fixed pool of threads. A stream is queued when
+    # its source has something new, and only one thread handles it at a time, so each
+    # stream's frames are recognized in order while different streams run side by
+    # side. A thread recognizes one frame and puts the stream back at the end of the
+    # queue, so a stream that cannot keep up does not starve the others. MediaPipe
+    # and OpenCV release the GIL for most of a frame, which is what threads overlap.
+    # publish(stream, result) is called on the pool thread. swap_engine(),
+    # set_roi_enabled(), update_settings(), reset_commits() and run_between_frames()
+    # apply to every stream, so the scheduler can stand in for a single
+    # RecognitionPipeline in ModelSwitcher and control handling; on_applied is called
+    # once every running stream has applied the change.
+    def __init__(self, streams, threads, publish, playback=None):
+        self.streams = streams
+        self.threads = max(1, threads)
+        self.publish = publish
+        self.playback = playback
+        self.error = None
+        self._ready = queue.Queue()
+        self._lock = threading.Lock()
+        # Streams waiting in _ready or being recognized, and those among them that got
+        # new work meanwhile.
+        self._queued = set()
+        self._pending = set()
+        self._remaining = len(streams)
+        self._done = threading.Event()
+        self._workers = []
+
+    def start(self):
+        if not self.streams:
+            self._done.set()
+        for index in range(self.threads):
+            worker = threading.Thread(target=self._work, name=f"signflow-stream-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        for stream in self.streams:
+            stream.source.start(lambda stream=stream: self.notify(stream), self.playback)
+        return self
+
+    def notify(self, stream):
+        with self._lock:
+            if stream in self._queued:
+                self._pending.add(stream)
+                return
+            self._queued.add(stream)
+        self._ready.put(stream)
+
+    def _work(self):
+        while True:
+            stream = self._ready.get()
+            if stream is None:
+                return
+            try:
+                busy = self._step(stream)
+            except Exception as exc:
+                error = str(exc) or type(exc).__name__
+                self.error = error if stream.stream_id is None else f"stream {stream.stream_id}: {error}"
+                self._done.set()
+                return
+            with self._lock:
+                requeue = busy or stream in self._pending
+                self._pending.discard(stream)
+                if not requeue:
+                    self._queued.discard(stream)
+            if requeue:
+                self._ready.put(stream)
+
+    def _step(self, stream):
+        item = stream.source.poll()
+        if item is None:
+            if stream.source.ended and not stream.finished:
+                stream.finished = True
+                with self._lock:
+                    self._remaining -= 1
+                    if not self._remaining:
+                        self._done.set()
+            return False
+        if self.playback is not None and self.playback.pauses != stream.pauses_seen:
+            # Whatever was half-recognized before the pause is stale now.
+            stream.pauses_seen = self.playback.pauses
+            stream.pipeline.reset()
+        self.publish(stream, stream.source.recognize(stream.pipeline, item))
+        stream.frames += 1
+        return True
+
+    def wait(self, timeout=None):
+        # True once every source has ended or a stream failed.
+        return self._done.wait(timeout)
+
+    def stop(self):
+        for stream in self.streams:
+            stream.source.stop()
+        for _worker in self._workers:
+            self._ready.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def swap_engine(self, engine):
+        for stream in self.streams:
+            stream.pipeline.swap_engine(engine)
+
+    def set_roi_enabled(self, enabled):
+        for stream in self.streams:
+            stream.pipeline.set_roi_enabled(enabled)
+
+    def _when_all_applied(self, on_applied):
+        # A callback for each running stream that calls on_applied() after the last
+        # of them, or None if no stream is running any more.
+        running = sum(not stream.finished for stream in self.streams)
+        if on_applied is None or not running:
+            return None
+        remaining = [running]
+        lock = threading.Lock()
+
+        def applied(*args):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                on_applied(*args)
+
+        return applied
+
+    def setting_names(self):
+        names = [stream.pipeline.setting_names() for stream in self.streams]
+        return [name for name in names[0] if all(name in other for other in names[1:])]
+
+    def update_settings(self, settings, on_applied=None):
+        applied = self._when_all_applied(on_applied)
+        ignored = []
+        for stream in self.streams:
+            ignored = stream.pipeline.update_settings(settings, None if stream.finished else applied)
+        if applied is None and on_applied is not None:
+            on_applied(ignored)
+        return ignored
+
+    def reset_commits(self, on_reset=None, on_applied=None):
+        # on_reset(stream) runs in the same step as each stream's reset, right away
+        # for streams that have finished; on_applied() once every stream is reset.
+        applied = self._when_all_applied(on_applied)
+        for stream in self.streams:
+            if stream.finished:
+                if on_reset is not None:
+                    on_reset(stream)
+                continue
+
+            def reset(stream=stream):
+                if on_reset is not None:
+                    on_reset(stream)
+                if applied is not None:
+                    applied()
+
+            stream.pipeline.reset_commits(reset)
+        if applied is None and on_applied is not None:
+            on_applied()
+
+    def run_between_frames(self):
+        for stream in self.streams:
+            stream.pipeline.run_between_frames()
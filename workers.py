@@ -0,0 +1,203 @@
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pipeline import FramePreprocessor, create_hands_detector, mirror_landmarks
+from recording import RECORD_DTYPE, fill_record
+
+# Frames in flight per worker: one being detected and one queued behind it, so a
+# worker never waits for the capture loop to hand over the next frame.
+RING_SLOTS_PER_WORKER = 2
+# How long results() waits for a worker before checking that they are all alive.
+RESULT_POLL_S = 0.2
+WORKER_START_TIMEOUT_S = 60.0
+
+WORKER_READY = "ready"
+WORKER_FAILED = "failed"
+WORKER_FRAME = "frame"
+
+
+class FrameRing:
+    # Fixed-size uint8 frame slots in one shared memory block. The capture side
+    # creates it; workers attach by name and read the slots in place.
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=slots * int(np.prod(self.shape)))
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self._memory.buf)
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    def close(self, unlink=False):
+        # The array has to go first: the block cannot be closed while it is exported.
+        self.frames = None
+        self._memory.close()
+        if unlink:
+            self._memory.unlink()
+
+
+def _detection_worker(tasks, results, detector_factory, max_side, warm_up_shape):
+    try:
+        detector = detector_factory()
+        preprocessor = FramePreprocessor(max_side)
+        if warm_up_shape is not None:
+            detector.process(preprocessor.prepare(np.zeros(warm_up_shape, dtype=np.uint8)))
+    except Exception as exc:
+        results.put((WORKER_FAILED, str(exc) or type(exc).__name__))
+        return
+    results.put((WORKER_READY, None))
+
+    ring = None
+    record = np.zeros(1, dtype=RECORD_DTYPE)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            frame_id, slot, captured_at, (ring_name, shape, slots) = task
+            if ring is None or ring.name != ring_name:
+                if ring is not None:
+                    ring.close()
+                ring = FrameRing(shape, slots, name=ring_name)
+
+            error = None
+            try:
+                detected = detector.process(preprocessor.prepare(ring.frames[slot]))
+                hands = detected.multi_hand_landmarks
+                if hands:
+                    mirror_landmarks(hands, detected.multi_handedness)
+                fill_record(record[0], captured_at, hands, detected.multi_handedness)
+            except Exception as exc:
+                error = str(exc) or type(exc).__name__
+            results.put((WORKER_FRAME, (frame_id, slot, record.tobytes(), time.perf_counter(), error)))
+    finally:
+        if ring is not None:
+            ring.close()
+        detector.close()
+
+
+class DetectionPool:
+    # Runs hand detection in worker processes, so MediaPipe is not held to the one
+    # core the GIL leaves the sender. submit() copies each camera frame into a free
+    # slot of a shared-memory FrameRing and queues only the slot index; a worker
+    # detects on the slot in place, mirrors the landmarks and sends back a
+    # RECORD_DTYPE record. results() yields the records in frame order for
+    # RecognitionPipeline.process_detected, which classifies and commits in this
+    # process. Each worker sees only some of the frames, so MediaPipe tracks hands
+    # between frames less well than in-process, and ROI cropping is not used.
+    # Workers are spawned rather than forked: the sender already runs threads.
+    def __init__(self, workers, detector_factory=create_hands_detector, max_side=None, warm_up_shape=None, slots=None):
+        self.workers = workers
+        self.slots = slots or workers * RING_SLOTS_PER_WORKER
+        self.ring = None
+        self.frames = 0
+        self.error = None
+        context = multiprocessing.get_context("spawn")
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(
+                target=_detection_worker,
+                args=(self._tasks, self._results, detector_factory, max_side, warm_up_shape),
+                name=f"signflow-detect-{index}",
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        self._ring_key = None
+        self._free = queue.Queue()
+        self._closing = threading.Event()
+
+    def start(self):
+        for process in self._processes:
+            process.start()
+        return self
+
+    def wait_ready(self, timeout=WORKER_START_TIMEOUT_S):
+        # Each worker reports once its detector is loaded and warmed up.
+        deadline = time.monotonic() + timeout
+        for _process in self._processes:
+            try:
+                kind, detail = self._results.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise RuntimeError(f"detection workers not ready after {timeout:.0f} s") from None
+            if kind == WORKER_FAILED:
+                raise RuntimeError(f"detection worker failed to start: {detail}")
+
+    def _replace_ring(self, shape):
+        if self.ring is not None:
+            # Workers may still be reading the old ring until every slot is back.
+            for _slot in range(self.slots):
+                self._take_slot()
+            self.ring.close(unlink=True)
+        self.ring = FrameRing(shape, self.slots)
+        self._ring_key = (self.ring.name, self.ring.shape, self.slots)
+        for slot in range(self.slots):
+            self._free.put(slot)
+
+    def _take_slot(self):
+        while True:
+            if self.error is not None:
+                raise RuntimeError(self.error)
+            try:
+                return self._free.get(timeout=RESULT_POLL_S)
+            except queue.Empty:
+                continue
+
+    def submit(self, frame, captured_at):
+        # Blocks while every slot is in flight. Not thread-safe: one capture loop submits.
+        if self.ring is None or self.ring.shape != frame.shape:
+            self._replace_ring(frame.shape)
+        slot = self._take_slot()
+        np.copyto(self.ring.frames[slot], frame)
+        self._tasks.put((self.frames, slot, captured_at, self._ring_key))
+        self.frames += 1
+
+    def results(self):
+        # Yields (record, detected_at) in submission order, on one consumer thread,
+        # until close() has been called and every submitted frame is back.
+        pending = {}
+        next_id = 0
+        while not (self._closing.is_set() and next_id >= self.frames):
+            try:
+                kind, payload = self._results.get(timeout=RESULT_POLL_S)
+            except queue.Empty:
+                if all(process.is_alive() for process in self._processes):
+                    continue
+                if self._closing.is_set():
+                    return
+                self.error = "a detection worker exited"
+                raise RuntimeError(self.error)
+            if kind != WORKER_FRAME:
+                continue
+            frame_id, slot, data, detected_at, error = payload
+            self._free.put(slot)
+            if error is not None:
+                self.error = f"detection failed on frame {frame_id}: {error}"
+                raise RuntimeError(self.error)
+            pending[frame_id] = (np.frombuffer(data, dtype=RECORD_DTYPE)[0], detected_at)
+            while next_id in pending:
+                yield pending.pop(next_id)
+                next_id += 1
+
+    def close(self, timeout=2.0):
+        # Workers finish the frames already queued before they see the stop marker.
+        self._closing.set()
+        for _process in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self.ring is not None:
+            self.ring.close(unlink=True)
+            self.ring = None